@@ -13,6 +13,7 @@ from pathlib import Path
 from typing import Any, Callable
 
 import websockets
+from websockets.protocol import State
 from dotenv import load_dotenv
 from google import genai
 
@@ -22,6 +23,8 @@ SAMPLE_WIDTH = 2  # int16
 FRAME_MS = 20
 FRAME_BYTES = int(SAMPLE_RATE * (FRAME_MS / 1000.0)) * SAMPLE_WIDTH
 ELEVENLABS_MODEL_ID = "eleven_flash_v2_5"
+# Seconds without text before ElevenLabs closes a TTS socket (180 is the maximum allowed).
+TTS_INACTIVITY_TIMEOUT = 180
 DEFAULT_GEMINI_MODEL = "gemini-3-flash-preview"
 
 
@@ -178,43 +181,183 @@ class GeminiClient:
         return ""
 
 
-class ElevenLabsStreamer:
-    def __init__(self, api_key: str, voice_id: str):
-        self.api_key = api_key
-        self.voice_id = voice_id
+class TtsSocketPool:
+    """Warm multi-stream-input sockets per voice, so a turn never waits on a handshake.
 
-    async def stream_turn(self, text: str, context_id: str, output_queue: asyncio.Queue[bytes]) -> None:
-        uri = (
-            f"wss://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}/multi-stream-input"
+    Each voice keeps `spares` open sockets. A socket goes back to the pool
+    after a turn (contexts are per turn, so it is reusable) and a background
+    task replaces spares the server closed or that failed keepalive pings,
+    and retires spares shortly before ElevenLabs' inactivity timeout,
+    connecting the replacement first.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        spares: int = 1,
+        inactivity_timeout: int = TTS_INACTIVITY_TIMEOUT,
+        refresh_margin: float = 30.0,
+    ):
+        self.api_key = api_key
+        self.spares = spares
+        self.inactivity_timeout = inactivity_timeout
+        self.refresh_after = max(1.0, inactivity_timeout - refresh_margin)
+        # voice_id -> [(socket, last used)], oldest first
+        self._spares: dict[str, list[tuple[Any, float]]] = {}
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._backoff: dict[str, float] = {}
+        self._retry_at: dict[str, float] = {}
+        self.warm = 0
+        self.cold = 0
+        self.handshakes = 0
+
+    def uri(self, voice_id: str) -> str:
+        return (
+            f"wss://api.elevenlabs.io/v1/text-to-speech/{voice_id}/multi-stream-input"
             f"?model_id={ELEVENLABS_MODEL_ID}&output_format=pcm_16000"
+            f"&inactivity_timeout={self.inactivity_timeout}"
         )
 
-        last_error: Exception | None = None
-        for attempt in range(3):
+    async def _connect(self, voice_id: str) -> Any:
+        ws = await websockets.connect(
+            self.uri(voice_id),
+            additional_headers={"xi-api-key": self.api_key},
+            max_size=16 * 1024 * 1024,
+            open_timeout=20,
+            close_timeout=10,
+            ping_interval=10,
+            ping_timeout=10,
+        )
+        self.handshakes += 1
+        return ws
+
+    def prewarm(self, voice_id: str) -> None:
+        self._spares.setdefault(voice_id, [])
+        self._wake.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def acquire(self, voice_id: str) -> Any:
+        self.prewarm(voice_id)
+        spares = self._spares[voice_id]
+        while spares:
+            ws, _ = spares.pop()
+            if ws.state is State.OPEN:
+                self.warm += 1
+                return ws
+            print(f"[TTS] spare socket for {voice_id} closed by server ({ws.close_code})", flush=True)
+        self.cold += 1
+        return await self._connect(voice_id)
+
+    async def release(self, voice_id: str, ws: Any) -> None:
+        """Return a healthy socket after a turn; it becomes the freshest spare."""
+        if ws.state is not State.OPEN:
+            return
+        spares = self._spares.setdefault(voice_id, [])
+        spares.append((ws, time.monotonic()))
+        while len(spares) > self.spares:
+            old, _ = spares.pop(0)
+            await self.discard(old)
+
+    async def discard(self, ws: Any) -> None:
+        try:
+            await ws.close()
+        except Exception:  # noqa: BLE001
+            pass
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for spares in self._spares.values():
+            for ws, _ in spares:
+                await self.discard(ws)
+        self._spares.clear()
+
+    async def _maintain(self) -> None:
+        while True:
             try:
-                async with websockets.connect(
-                    uri,
-                    additional_headers={"xi-api-key": self.api_key},
-                    max_size=16 * 1024 * 1024,
-                    open_timeout=20,
-                    close_timeout=10,
-                ) as ws:
-                    await ws.send(json.dumps({"context_id": context_id, "text": text}))
-                    await ws.send(json.dumps({"context_id": context_id, "flush": True}))
+                await asyncio.wait_for(self._wake.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # prewarm() can add voices while a connect below is awaited.
+            for voice_id, spares in list(self._spares.items()):
+                try:
+                    await self._top_up(voice_id, spares)
+                except Exception as err:  # noqa: BLE001 - one bad pass must not stop the pool task
+                    print(f"[TTS] spare upkeep for {voice_id} failed: {err!r}", flush=True)
+
+    async def _top_up(self, voice_id: str, spares: list[tuple[Any, float]]) -> None:
+        """Drop closed spares, then connect one replacement if fresh ones are missing."""
+        spares[:] = [(ws, used) for ws, used in spares if ws.state is State.OPEN]
+        now = time.monotonic()
+        fresh = sum(1 for _, used in spares if now - used < self.refresh_after)
+        if fresh >= self.spares or now < self._retry_at.get(voice_id, 0.0):
+            return
+        try:
+            ws = await self._connect(voice_id)
+        except Exception as err:  # noqa: BLE001
+            backoff = min(30.0, self._backoff.get(voice_id, 0.5) * 2)
+            self._backoff[voice_id] = backoff
+            self._retry_at[voice_id] = time.monotonic() + backoff
+            print(f"[TTS] pre-connect for {voice_id} failed: {err} (retry in {backoff:.0f}s)", flush=True)
+            return
+        self._backoff.pop(voice_id, None)
+        self._retry_at.pop(voice_id, None)
+        spares.append((ws, time.monotonic()))
+        stale = [item for item in spares if time.monotonic() - item[1] >= self.refresh_after]
+        if stale:
+            spares.remove(stale[0])
+            await self.discard(stale[0][0])
+
+    def summary(self) -> str:
+        return f"{self.warm}/{self.warm + self.cold} turns on a warm socket, {self.handshakes} handshakes"
 
-                    async for raw_message in ws:
-                        data = json.loads(raw_message)
-                        audio = data.get("audio")
-                        if audio:
-                            await output_queue.put(base64.b64decode(audio))
 
-                        is_final = data.get("is_final") or data.get("isFinal")
-                        if is_final:
-                            return
+class ElevenLabsStreamer:
+    def __init__(self, pool: TtsSocketPool, voice_id: str):
+        self.pool = pool
+        self.voice_id = voice_id
+        pool.prewarm(voice_id)
 
-                    return
+    async def _receive_turn(
+        self, ws: Any, context_id: str, output_queue: asyncio.Queue[bytes], done_sending: asyncio.Event | None = None
+    ) -> None:
+        async for raw_message in ws:
+            data = json.loads(raw_message)
+            msg_context = data.get("context_id") or data.get("contextId")
+            if msg_context and msg_context != context_id:
+                continue  # late message for an earlier turn on this pooled socket
+            audio = data.get("audio")
+            if audio:
+                await output_queue.put(base64.b64decode(audio))
+            is_final = data.get("is_final") or data.get("isFinal")
+            if is_final and (done_sending is None or done_sending.is_set()):
+                return
+        raise ConnectionError("socket closed before the final message")
+
+    async def _finish_turn(self, ws: Any, context_id: str) -> None:
+        await ws.send(json.dumps({"context_id": context_id, "close_context": True}))
+        await self.pool.release(self.voice_id, ws)
+
+    async def stream_turn(self, text: str, context_id: str, output_queue: asyncio.Queue[bytes]) -> None:
+        last_error: Exception | None = None
+        for attempt in range(3):
+            ws = None
+            try:
+                ws = await self.pool.acquire(self.voice_id)
+                await ws.send(json.dumps({"context_id": context_id, "text": text}))
+                await ws.send(json.dumps({"context_id": context_id, "flush": True}))
+                await self._receive_turn(ws, context_id, output_queue)
+                await self._finish_turn(ws, context_id)
+                return
             except Exception as err:  # noqa: BLE001
                 last_error = err
+                if ws is not None:
+                    await self.pool.discard(ws)
                 if attempt < 2:
                     await asyncio.sleep(0.75 * (attempt + 1))
 
@@ -226,40 +369,24 @@ class ElevenLabsStreamer:
         context_id: str,
         output_queue: asyncio.Queue[bytes],
     ) -> None:
-        uri = (
-            f"wss://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}/multi-stream-input"
-            f"?model_id={ELEVENLABS_MODEL_ID}&output_format=pcm_16000"
-        )
+        ws = await self.pool.acquire(self.voice_id)
+        done_sending = asyncio.Event()
 
-        async with websockets.connect(
-            uri,
-            additional_headers={"xi-api-key": self.api_key},
-            max_size=16 * 1024 * 1024,
-            open_timeout=20,
-            close_timeout=10,
-        ) as ws:
-            done_sending = asyncio.Event()
-
-            async def sender() -> None:
-                while True:
-                    chunk = await text_queue.get()
-                    if chunk is None:
-                        await ws.send(json.dumps({"context_id": context_id, "flush": True}))
-                        done_sending.set()
-                        return
-                    await ws.send(json.dumps({"context_id": context_id, "text": chunk}))
-
-            async def receiver() -> None:
-                async for raw_message in ws:
-                    data = json.loads(raw_message)
-                    audio = data.get("audio")
-                    if audio:
-                        await output_queue.put(base64.b64decode(audio))
-                    is_final = data.get("is_final") or data.get("isFinal")
-                    if is_final and done_sending.is_set():
-                        return
-
-            await asyncio.gather(sender(), receiver())
+        async def sender() -> None:
+            while True:
+                chunk = await text_queue.get()
+                if chunk is None:
+                    await ws.send(json.dumps({"context_id": context_id, "flush": True}))
+                    done_sending.set()
+                    return
+                await ws.send(json.dumps({"context_id": context_id, "text": chunk}))
+
+        try:
+            await asyncio.gather(sender(), self._receive_turn(ws, context_id, output_queue, done_sending))
+            await self._finish_turn(ws, context_id)
+        except BaseException:
+            await self.pool.discard(ws)
+            raise
 
 
 def mix_frames(frame_list: list[bytes]) -> bytes:
@@ -487,8 +614,9 @@ async def run_conversation(config: Config) -> tuple[Path | None, Path | None]:
         retries=config.gemini_retries,
     )
 
-    speaker_a_tts = ElevenLabsStreamer(config.elevenlabs_api_key, config.agent_a_voice_id) if not config.text_only else None
-    speaker_b_tts = ElevenLabsStreamer(config.elevenlabs_api_key, config.agent_b_voice_id) if not config.text_only else None
+    tts_pool = TtsSocketPool(config.elevenlabs_api_key) if not config.text_only else None
+    speaker_a_tts = ElevenLabsStreamer(tts_pool, config.agent_a_voice_id) if tts_pool else None
+    speaker_b_tts = ElevenLabsStreamer(tts_pool, config.agent_b_voice_id) if tts_pool else None
 
     queue_a: asyncio.Queue[bytes] | None = asyncio.Queue() if not config.text_only else None
     queue_b: asyncio.Queue[bytes] | None = asyncio.Queue() if not config.text_only else None
@@ -636,6 +764,9 @@ async def run_conversation(config: Config) -> tuple[Path | None, Path | None]:
         stop_event.set()
     if mixer_task:
         await mixer_task
+    if tts_pool:
+        print(f"[TTS] {tts_pool.summary()}", flush=True)
+        await tts_pool.close()
 
     if not config.text_only:
         convert_cmd = [
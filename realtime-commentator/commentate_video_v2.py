@@ -16,6 +16,10 @@ from dotenv import load_dotenv
 from elevenlabs.client import ElevenLabs
 from pydub import AudioSegment
 
+# Synthesized lines are shared with the other scripts through the TTS cache.
+import game_agent_path  # noqa: E402,F401
+from tts_cache import shared_cache  # noqa: E402
+
 load_dotenv()
 
 # Tsunami game
@@ -111,16 +115,16 @@ def generate_clips(
             continue
 
         print(f"  [generating] {clip_path.name} ({ts}s): {text[:60]}...")
-        audio = client.text_to_speech.convert(
+        audio = shared_cache().convert(
+            client,
             text=text,
             voice_id=VOICE_ID,
             model_id=MODEL_ID,
             output_format=OUTPUT_FORMAT,
         )
-        audio_bytes = b"".join(audio)
-        clip_path.write_bytes(audio_bytes)
+        clip_path.write_bytes(audio.data)
 
-        if i < len(segments) - 1:
+        if audio.source == "synthesized" and i < len(segments) - 1:
             time.sleep(1)
 
     return clips
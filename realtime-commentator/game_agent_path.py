@@ -0,0 +1,13 @@
+"""Make selfplay-games/game_agent importable from the scripts in this directory.
+
+Import this before any game_agent module (rate_limit, tts_cache, world_map):
+
+    import game_agent_path  # noqa: F401
+"""
+import sys
+from pathlib import Path
+
+GAME_AGENT_DIR = Path(__file__).resolve().parent.parent / "selfplay-games" / "game_agent"
+
+if str(GAME_AGENT_DIR) not in sys.path:
+    sys.path.insert(0, str(GAME_AGENT_DIR))
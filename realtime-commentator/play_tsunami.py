@@ -25,6 +25,15 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
+# Pace requests to the documented per-agent limits (10 req/s gameplay, 1 msg/s chat).
+import game_agent_path  # noqa: E402,F401
+from rate_limit import CHAT, GAMEPLAY, INPUT, OBSERVE, POLL, RateLimiter, send_limited  # noqa: E402
+from tts_cache import shared_cache  # noqa: E402
+from world_map import attach_map, validated_move  # noqa: E402
+
+LIMITER = RateLimiter()
+WORLD_MAP = None  # static geometry from /map, loaded in main()
+
 CHAT_LINES = {
     "collect_common": [
         "a humble $10 brainrot... we all start somewhere",
@@ -97,15 +106,19 @@ def log(msg):
 
 
 def observe():
-    r = requests.get(f"{API_BASE}/games/{GAME_ID}/observe", headers=HEADERS)
+    r = send_limited(LIMITER, GAMEPLAY, OBSERVE, lambda: requests.get(f"{API_BASE}/games/{GAME_ID}/observe", headers=HEADERS))
     return r.json()
 
 
 def send_input(input_type, data=None):
+    checked, problem = validated_move(WORLD_MAP, input_type, data, snap_radius=6.0)
+    if problem:
+        log(f"  MoveTo {data['position']} {problem} -> {checked['position']}")
+        data = checked
     payload = {"type": input_type}
     if data:
         payload["data"] = data
-    requests.post(f"{API_BASE}/games/{GAME_ID}/input", headers=HEADERS, json=payload)
+    send_limited(LIMITER, GAMEPLAY, INPUT, lambda: requests.post(f"{API_BASE}/games/{GAME_ID}/input", headers=HEADERS, json=payload))
 
 
 last_chat_ts = ""
@@ -119,11 +132,11 @@ def poll_chat():
         params = {"limit": 50}
         if last_chat_ts:
             params["after"] = last_chat_ts
-        r = requests.get(
+        r = send_limited(LIMITER, GAMEPLAY, POLL, lambda: requests.get(
             f"{API_BASE}/games/{GAME_ID}/chat/messages",
             headers=HEADERS,
             params=params,
-        )
+        ))
         if r.status_code != 200:
             return
         messages = r.json()
@@ -145,33 +158,33 @@ def chat(category):
     msg = random.choice(CHAT_LINES[category])
     def _send():
         try:
-            # Generate TTS
-            audio = elevenlabs_client.text_to_speech.convert(
+            # Generate TTS (CHAT_LINES repeat, so most lines come from the cache)
+            audio_bytes = shared_cache().convert(
+                elevenlabs_client,
                 text=msg,
                 voice_id="oubi7HGxNVjXMnWLgwBT",
                 model_id="eleven_multilingual_v2",
                 output_format="mp3_44100_128",
-            )
-            audio_bytes = b"".join(audio)
+            ).data
             # Save locally for debugging
             filename = time.strftime("%H_%M_%S") + ".mp3"
             (AUDIO_DIR / filename).write_bytes(audio_bytes)
             # Upload via multipart to /chat/voice
-            r = requests.post(
+            r = send_limited(LIMITER, CHAT, INPUT, lambda: requests.post(
                 f"{API_BASE}/games/{GAME_ID}/chat/voice",
                 headers={"Authorization": f"Bearer {API_KEY}"},
                 files={"audio": (filename, audio_bytes, "audio/mpeg")},
                 data={"content": msg},
-            )
+            ))
             log(f'  VOICE: "{msg}" -> {r.status_code}')
         except Exception as e:
             # Fallback: send text-only if TTS fails
             try:
-                requests.post(
+                send_limited(LIMITER, CHAT, INPUT, lambda: requests.post(
                     f"{API_BASE}/games/{GAME_ID}/chat",
                     headers=HEADERS,
                     json={"content": msg},
-                )
+                ))
                 log(f'  CHAT (text fallback): "{msg}" ({e})')
             except Exception:
                 pass
@@ -394,6 +407,7 @@ def wait_until_near(target_pos, speed, label="target"):
 
 
 def main():
+    global WORLD_MAP
     log("=== ESCAPE TSUNAMI FOR BRAINROTS ===")
     log("Joining game and starting the grind...")
 
@@ -402,6 +416,7 @@ def main():
         log(f"Join: {r.text}")
     except Exception:
         pass
+    WORLD_MAP = attach_map(f"{API_BASE}/games/{GAME_ID}/map", f"{API_BASE}/{GAME_ID}", lambda m: log(f"Map: {m}"))
 
     chat_cooldown = 0
     trip_count = 0
@@ -19,6 +19,14 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
+# Pace requests to the documented per-agent limits (10 req/s gameplay, 1 msg/s chat).
+import game_agent_path  # noqa: E402,F401
+from rate_limit import GAMEPLAY, INPUT, OBSERVE, POLL, RateLimiter, send_limited  # noqa: E402
+from world_map import attach_map, validated_move  # noqa: E402
+
+LIMITER = RateLimiter()
+WORLD_MAP = None  # static geometry from /map, loaded in main()
+
 
 def dist(a, b):
     return math.sqrt((a[0] - b[0]) ** 2 + (a[2] - b[2]) ** 2)
@@ -35,15 +43,19 @@ def log(msg):
 
 
 def observe():
-    r = requests.get(f"{API_BASE}/games/{GAME_ID}/observe", headers=HEADERS)
+    r = send_limited(LIMITER, GAMEPLAY, OBSERVE, lambda: requests.get(f"{API_BASE}/games/{GAME_ID}/observe", headers=HEADERS))
     return r.json()
 
 
 def send_input(input_type, data=None):
+    checked, problem = validated_move(WORLD_MAP, input_type, data, snap_radius=6.0)
+    if problem:
+        log(f"  MoveTo {data['position']} {problem} -> {checked['position']}")
+        data = checked
     payload = {"type": input_type}
     if data:
         payload["data"] = data
-    requests.post(f"{API_BASE}/games/{GAME_ID}/input", headers=HEADERS, json=payload)
+    send_limited(LIMITER, GAMEPLAY, INPUT, lambda: requests.post(f"{API_BASE}/games/{GAME_ID}/input", headers=HEADERS, json=payload))
 
 
 last_chat_ts = ""
@@ -57,11 +69,11 @@ def poll_chat():
         params = {"limit": 50}
         if last_chat_ts:
             params["after"] = last_chat_ts
-        r = requests.get(
+        r = send_limited(LIMITER, GAMEPLAY, POLL, lambda: requests.get(
             f"{API_BASE}/games/{GAME_ID}/chat/messages",
             headers=HEADERS,
             params=params,
-        )
+        ))
         if r.status_code != 200:
             return
         messages = r.json()
@@ -436,6 +448,7 @@ def wait_until_near(target_pos, speed, label="target"):
 
 
 def main():
+    global WORLD_MAP
     log("=== GAME START ===")
 
     try:
@@ -443,6 +456,7 @@ def main():
         log(f"Joined game: {r.json().get('message', r.text)}")
     except Exception:
         pass
+    WORLD_MAP = attach_map(f"{API_BASE}/games/{GAME_ID}/map", f"{API_BASE}/{GAME_ID}", lambda m: log(f"Map: {m}"))
 
     trip_count = 0
     last_status_log = 0
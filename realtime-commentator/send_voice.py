@@ -8,6 +8,10 @@ from pathlib import Path
 from dotenv import load_dotenv
 from elevenlabs.client import ElevenLabs
 
+# Repeated messages are served from the TTS cache shared with the other scripts.
+import game_agent_path  # noqa: E402,F401
+from tts_cache import shared_cache  # noqa: E402
+
 load_dotenv()
 
 API_BASE = "https://clawblox.com/api/v1"
@@ -26,13 +30,13 @@ def send_voice(message: str):
     client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
 
     try:
-        audio = client.text_to_speech.convert(
+        audio_bytes = shared_cache().convert(
+            client,
             text=message,
             voice_id="oubi7HGxNVjXMnWLgwBT",
             model_id="eleven_multilingual_v2",
             output_format="mp3_44100_128",
-        )
-        audio_bytes = b"".join(audio)
+        ).data
 
         # Save locally
         filename = time.strftime("%H_%M_%S") + ".mp3"
@@ -19,11 +19,15 @@ import os
 import sys
 import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import requests
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "game_agent"))
+from rate_limit import GAMEPLAY, INPUT, OBSERVE, RateLimiter, send_limited  # noqa: E402
+from world_map import WorldMap, attach_map, validated_move  # noqa: E402
+
 AGENT_NAME = "fallguys-test-player"
 
 # Course layout from SKILL.md (scaled 4x)
@@ -41,6 +45,12 @@ class Session:
     api_base: str
     game_id: str | None
     headers: dict[str, str]
+    # One limiter per agent identity: the documented limits are per agent.
+    limiter: RateLimiter = field(default_factory=RateLimiter)
+    world_map: WorldMap | None = None
+    player_y: float | None = None
+    snapped_moves: int = 0
+    unverified_moves: int = 0
 
 
 def key_cache_path() -> Path:
@@ -130,12 +140,24 @@ def create_session(args: argparse.Namespace, agent_name: str, use_cache: bool) -
         return Session(mode="local", api_base=api_base, game_id=args.game_id, headers=headers)
 
 
+def attach_session_map(sess: Session, agent_name: str) -> None:
+    """Load the static map (cached on disk per game) for MoveTo validation."""
+    if sess.mode == "platform":
+        url, key = f"{sess.api_base}/games/{sess.game_id}/map", f"{sess.api_base}/{sess.game_id}"
+    else:
+        # The local server runs one game at a time; without --game-id the
+        # hash check in load_map still catches a different game's map.
+        url, key = f"{sess.api_base}/map", f"{sess.api_base}/{sess.game_id or 'local'}"
+    sess.world_map = attach_map(url, key, lambda m: print(f"[{agent_name}] [map] {m}"))
+
+
 def observe(sess: Session) -> dict | None:
     try:
         if sess.mode == "platform":
-            r = requests.get(f"{sess.api_base}/games/{sess.game_id}/observe", headers=sess.headers, timeout=10)
+            url = f"{sess.api_base}/games/{sess.game_id}/observe"
         else:
-            r = requests.get(f"{sess.api_base}/observe", headers=sess.headers, timeout=10)
+            url = f"{sess.api_base}/observe"
+        r = send_limited(sess.limiter, GAMEPLAY, OBSERVE, lambda: requests.get(url, headers=sess.headers, timeout=10))
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -146,12 +168,22 @@ def observe(sess: Session) -> dict | None:
 def send_input(sess: Session, input_type: str, data: dict | None = None) -> bool:
     if data is None:
         data = {}
+    checked, problem = validated_move(sess.world_map, input_type, data, snap_radius=2.0 * S, from_y=sess.player_y)
+    if problem is not None:
+        if checked["position"] != data["position"]:
+            sess.snapped_moves += 1
+        else:
+            sess.unverified_moves += 1
+        data = checked
     payload = {"type": input_type, "data": data}
     try:
         if sess.mode == "platform":
-            r = requests.post(f"{sess.api_base}/games/{sess.game_id}/input", headers=sess.headers, json=payload, timeout=10)
+            url = f"{sess.api_base}/games/{sess.game_id}/input"
         else:
-            r = requests.post(f"{sess.api_base}/input", headers=sess.headers, json=payload, timeout=10)
+            url = f"{sess.api_base}/input"
+        r = send_limited(
+            sess.limiter, GAMEPLAY, INPUT, lambda: requests.post(url, headers=sess.headers, json=payload, timeout=10)
+        )
         r.raise_for_status()
         return True
     except Exception as e:
@@ -190,6 +222,8 @@ def run_player(args: argparse.Namespace, idx: int, compact_output: bool) -> None
     agent_name = f"{args.name_prefix}-{idx + 1}" if args.num_players > 1 else args.name_prefix
     use_cache = args.num_players == 1
     sess = create_session(args, agent_name, use_cache=use_cache)
+    if args.validate_moves:
+        attach_session_map(sess, agent_name)
     time.sleep(1.0)
 
     start = time.time()
@@ -209,6 +243,7 @@ def run_player(args: argparse.Namespace, idx: int, compact_output: bool) -> None
             pos = player.get("position", [0, 0, 0])
             attrs = player.get("attributes", {})
             px, py, pz = pos[0], pos[1], pos[2]
+            sess.player_y = py
 
             section = get_section(pz)
             game_state = attrs.get("GameState", "unknown")
@@ -285,6 +320,12 @@ def run_player(args: argparse.Namespace, idx: int, compact_output: bool) -> None
 
         if not finished:
             print(f"\n[{agent_name}] Duration reached without finishing.")
+        print(f"\n[{agent_name}] rate limiter: {sess.limiter.stats.summary()}")
+        if sess.world_map is not None:
+            print(
+                f"[{agent_name}] map: {sess.snapped_moves} MoveTo targets snapped to static ground, "
+                f"{sess.unverified_moves} kept off-map (moving platforms?)"
+            )
 
     except KeyboardInterrupt:
         print(f"\n[{agent_name}] Interrupted.")
@@ -301,6 +342,11 @@ def main() -> int:
     parser.add_argument("--name-prefix", default=AGENT_NAME, help="Prefix for player names")
     parser.add_argument("--duration", type=float, default=120.0, help="Run duration in seconds")
     parser.add_argument("--tick", type=float, default=0.25, help="Loop interval")
+    parser.add_argument(
+        "--validate-moves",
+        action="store_true",
+        help="Check MoveTo targets against the static /map and snap unreachable ones to nearby ground",
+    )
     args = parser.parse_args()
 
     if args.num_players < 1:
@@ -12,25 +12,67 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import hashlib
 import json
 import re
 import sys
 import textwrap
 import time
-import urllib.error
 import urllib.parse
-import urllib.request
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, FrozenSet, Generator, List, Optional, Tuple, Union
 
 import anthropic
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from anthropic_http import AnthropicSession, sdk_http_client, shared_session, warm_sdk_client
 from audio import AgentAudioStreamer, AudioConfig
+from audio_output import AUDIO_OUTPUTS
+from conversation_log import ConversationLogWriter, format_text_record
+from decision_cache import SIGNATURE_MODES, DecisionCache, decision_signature
+from hedging import CancelToken, HedgeCancelled, Hedger
+from json_stream import StreamingReplyParser
+from observation import (
+    ObservationDiffer,
+    clean_observation,
+    diff_observations,
+    serialize_payload,
+)
+from pipeline import (
+    ACTIVE_GAME_STATUSES,
+    ActOutcome,
+    ActionDispatcher,
+    DeadlineTicker,
+    ObservationPoller,
+    PipelineStats,
+    stale_action_reason,
+)
+from plans import PLAN_PROMPT_ADDENDUM, PlanExecutor, PlanStats, parse_plan, significant_events
+from rate_limit import INPUT, OBSERVE, RateLimiter, endpoint_class
+from recording import TraceRecorder
+from relevance import RelevanceCompressor, estimate_tokens
+from router import (
+    CONFIDENCE_PROMPT_ADDENDUM,
+    ESCALATION_TRIGGERS,
+    FAST_TIER,
+    SLOW_TIER,
+    DecisionRouter,
+    parse_triggers,
+)
+from ticks import TickSample, TickTracker
+from tracing import Tracer
+from tts_cache import shared_cache
+from transport import KeepAliveTransport, TransportError
+from wire_format import TABLE_PROMPT_ADDENDUM, WIRE_FORMATS, WireFormatStats, format_payload_table
+from world_map import DEFAULT_CACHE_DIR, WorldMap, load_map
 
 
 API_BASE = "http://localhost:8080"
+# With --top-k, the uncompressed payload is built on one step in this many,
+# only to estimate the tokens compression saves.
+COMPRESSION_SAMPLE_EVERY = 10
 
 BROWSER_LIKE_HEADERS = {
     "User-Agent": (
@@ -81,185 +123,50 @@ Game skill.md (read this first, then process the observation):
 """.strip()
 
 
-def _rpos(pos: list) -> tuple:
-    """Round position to 1 decimal to filter physics jitter."""
-    return tuple(round(x, 1) for x in pos)
-
-
-# Attributes that are camera/rendering internals — not useful for decision making
-_IGNORED_ATTRIBUTES = frozenset({
-    "ViewOriginX", "ViewOriginY", "ViewOriginZ",
-    "ViewForwardX", "ViewForwardY", "ViewForwardZ",
-    "ViewFovDeg",
-    "RenderRole",
-    "ModelUrl",
-})
-
-# Entity names that mirror player.position — skip to avoid duplicate diffs
-_IGNORED_ENTITY_NAMES = frozenset({
-    "HumanoidRootPart",
-})
-
-
-def _diff_attributes(
-    prev_attrs: Dict[str, Any],
-    curr_attrs: Dict[str, Any],
-    label: str,
-    changes: List[str],
-) -> None:
-    for key in sorted(set(prev_attrs) | set(curr_attrs)):
-        if key in _IGNORED_ATTRIBUTES:
-            continue
-        pv = prev_attrs.get(key)
-        cv = curr_attrs.get(key)
-        if pv != cv:
-            changes.append(f"{label} {key}: {pv} -> {cv}")
-
-
-def _diff_player(
-    prev: Dict[str, Any],
-    curr: Dict[str, Any],
-    label: str,
-    changes: List[str],
-) -> None:
-    if not prev or not curr:
-        return
-    pp = _rpos(prev.get("position", [0, 0, 0]))
-    cp = _rpos(curr.get("position", [0, 0, 0]))
-    if pp != cp:
-        changes.append(f"{label} position: {pp} -> {cp}")
-    ph = prev.get("health")
-    ch = curr.get("health")
-    if ph is not None and ch is not None and round(ph, 1) != round(ch, 1):
-        changes.append(f"{label} health: {ph} -> {ch}")
-    _diff_attributes(
-        prev.get("attributes", {}),
-        curr.get("attributes", {}),
-        label,
-        changes,
-    )
-
-
-def _diff_entity(
-    prev: Dict[str, Any],
-    curr: Dict[str, Any],
-    changes: List[str],
-) -> None:
-    name = curr.get("name", curr.get("id", "?"))
-    pp = _rpos(prev.get("position", [0, 0, 0]))
-    cp = _rpos(curr.get("position", [0, 0, 0]))
-    if pp != cp:
-        changes.append(f"{name} position: {pp} -> {cp}")
-    prev_size = prev.get("size")
-    curr_size = curr.get("size")
-    if prev_size and curr_size and _rpos(prev_size) != _rpos(curr_size):
-        changes.append(f"{name} size: {_rpos(prev_size)} -> {_rpos(curr_size)}")
-    _diff_attributes(
-        prev.get("attributes", {}),
-        curr.get("attributes", {}),
-        name,
-        changes,
-    )
-
-
-def clean_observation(obs: Dict[str, Any]) -> Dict[str, Any]:
-    """Strip noisy/internal fields from a full observation before sending to LLM."""
-    import copy
-    out = copy.deepcopy(obs)
-    # Strip ignored attributes from player
-    player = out.get("player", {})
-    attrs = player.get("attributes", {})
-    for key in list(attrs):
-        if key in _IGNORED_ATTRIBUTES:
-            del attrs[key]
-    # Strip ignored attributes from other players
-    for p in out.get("other_players", []):
-        pa = p.get("attributes", {})
-        for key in list(pa):
-            if key in _IGNORED_ATTRIBUTES:
-                del pa[key]
-    # Strip ignored entities and ignored attributes from remaining entities
-    entities = out.get("world", {}).get("entities", [])
-    filtered = []
-    for e in entities:
-        if e.get("name") in _IGNORED_ENTITY_NAMES:
-            continue
-        ea = e.get("attributes", {})
-        for key in list(ea):
-            if key in _IGNORED_ATTRIBUTES:
-                del ea[key]
-        filtered.append(e)
-    if "world" in out:
-        out["world"]["entities"] = filtered
-    # Strip tick (internal counter, not useful)
-    out.pop("tick", None)
-    return out
-
-
-def diff_observations(prev: Dict[str, Any], curr: Dict[str, Any]) -> str:
-    """Compute human-readable diff between two /observe snapshots."""
-    changes: List[str] = []
-
-    # Game status
-    if prev.get("game_status") != curr.get("game_status"):
-        changes.append(
-            f"Game status: {prev.get('game_status')} -> {curr.get('game_status')}"
-        )
-
-    # Player
-    _diff_player(prev.get("player", {}), curr.get("player", {}), "You", changes)
-
-    # Other players (keyed by id)
-    prev_others = {p["id"]: p for p in prev.get("other_players", [])}
-    curr_others = {p["id"]: p for p in curr.get("other_players", [])}
-
-    for pid in sorted(set(prev_others) - set(curr_others)):
-        changes.append(f"Player {pid} left")
-    for pid in sorted(set(curr_others) - set(prev_others)):
-        p = curr_others[pid]
-        pos = _rpos(p.get("position", [0, 0, 0]))
-        changes.append(f"Player {pid} appeared at {pos}")
-    for pid in sorted(set(prev_others) & set(curr_others)):
-        _diff_player(prev_others[pid], curr_others[pid], f"Player {pid}", changes)
-
-    # Entities
-    prev_ents = {e["id"]: e for e in prev.get("world", {}).get("entities", [])}
-    curr_ents = {e["id"]: e for e in curr.get("world", {}).get("entities", [])}
-
-    for eid in sorted(set(prev_ents) - set(curr_ents), key=str):
-        e = prev_ents[eid]
-        if e.get("name") in _IGNORED_ENTITY_NAMES:
-            continue
-        changes.append(f"{e.get('name', eid)} removed")
-    for eid in sorted(set(curr_ents) - set(prev_ents), key=str):
-        e = curr_ents[eid]
-        if e.get("name") in _IGNORED_ENTITY_NAMES:
-            continue
-        pos = _rpos(e.get("position", [0, 0, 0]))
-        changes.append(f"{e.get('name', eid)} appeared at {pos}")
-    for eid in sorted(set(prev_ents) & set(curr_ents), key=str):
-        if curr_ents[eid].get("name") in _IGNORED_ENTITY_NAMES:
-            continue
-        _diff_entity(prev_ents[eid], curr_ents[eid], changes)
-
-    # Events (ephemeral — forward all new ones)
-    for event in curr.get("events", []):
-        changes.append(f"Event: {event}")
-
-    if not changes:
-        return "No changes."
-    return "State changes:\n" + "\n".join(f"- {c}" for c in changes)
-
-
 class ClawbloxAPIError(RuntimeError):
     pass
 
 
 class ClawbloxClient:
-    def __init__(self, api_base: str = API_BASE, join_name: str = "ClaudeOpusBot"):
+    def __init__(
+        self,
+        api_base: str = API_BASE,
+        join_name: str = "ClaudeOpusBot",
+        transport: Optional[KeepAliveTransport] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_429_retries: int = 5,
+    ):
         self.api_base = api_base.rstrip("/")
         self.join_name = join_name
         self.session_token: Optional[str] = None
+        self.transport = transport or KeepAliveTransport()
+        self.limiter = limiter
+        self.max_429_retries = max_429_retries
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        data: Optional[bytes],
+        headers: Dict[str, str],
+    ) -> bytes:
+        bucket = endpoint_class(path) if self.limiter is not None else None
+        priority = INPUT if path.startswith("/input") else OBSERVE
+        for attempt in range(self.max_429_retries + 1):
+            if bucket is not None:
+                self.limiter.acquire(bucket, priority)
+            try:
+                resp = self.transport.request(method, f"{self.api_base}{path}", body=data, headers=headers)
+            except TransportError as e:
+                raise ClawbloxAPIError(f"Network error {method} {path}: {e}") from e
+            if bucket is None:
+                break
+            self.limiter.on_response(bucket, resp.status, resp.headers.get("retry-after"))
+            if resp.status != 429:
+                break
+        if resp.status >= 400:
+            raise ClawbloxAPIError(f"HTTP {resp.status} {method} {path}: {resp.text()}")
+        return resp.body
 
     def _request(
         self,
@@ -267,7 +174,6 @@ class ClawbloxClient:
         path: str,
         body: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        url = f"{self.api_base}{path}"
         data = None
         headers = dict(BROWSER_LIKE_HEADERS)
         headers["Content-Type"] = "application/json"
@@ -277,16 +183,7 @@ class ClawbloxClient:
         if body is not None:
             data = json.dumps(body).encode("utf-8")
 
-        req = urllib.request.Request(url=url, method=method, data=data, headers=headers)
-        try:
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                raw = resp.read().decode("utf-8")
-        except urllib.error.HTTPError as e:
-            err_body = e.read().decode("utf-8", errors="replace")
-            raise ClawbloxAPIError(f"HTTP {e.code} {method} {path}: {err_body}") from e
-        except urllib.error.URLError as e:
-            raise ClawbloxAPIError(f"Network error {method} {path}: {e}") from e
-
+        raw = self._send(method, path, data, headers).decode("utf-8", errors="replace")
         if not raw.strip():
             return {}
 
@@ -296,14 +193,10 @@ class ClawbloxClient:
             raise ClawbloxAPIError(f"Invalid JSON from {method} {path}: {raw[:300]}") from e
 
     def get_skill_md(self) -> str:
-        url = f"{self.api_base}/skill.md"
-        req = urllib.request.Request(url=url, method="GET", headers=dict(BROWSER_LIKE_HEADERS))
-        try:
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                return resp.read().decode("utf-8", errors="replace")
-        except urllib.error.HTTPError as e:
-            err_body = e.read().decode("utf-8", errors="replace")
-            raise ClawbloxAPIError(f"HTTP {e.code} GET /skill.md: {err_body}") from e
+        return self._send("GET", "/skill.md", None, dict(BROWSER_LIKE_HEADERS)).decode("utf-8", errors="replace")
+
+    def get_map(self) -> bytes:
+        return self._send("GET", "/map", None, dict(BROWSER_LIKE_HEADERS))
 
     def join(self) -> Dict[str, Any]:
         payload = self._request(
@@ -328,11 +221,12 @@ class ClawbloxClient:
         return self._request("POST", "/input", body=payload)
 
 
-def append_conversation_log(log_path: Path, section: str, content: str) -> None:
-    with log_path.open("a", encoding="utf-8") as f:
-        f.write(f"\n[{dt.datetime.now(dt.timezone.utc).isoformat()}] {section}\n")
-        f.write(content.rstrip() + "\n")
-        f.flush()
+def append_conversation_log(log: Union[Path, ConversationLogWriter], section: str, content: str) -> None:
+    if isinstance(log, ConversationLogWriter):
+        log.write(section, content)
+        return
+    with log.open("a", encoding="utf-8") as f:
+        f.write(format_text_record(dt.datetime.now(dt.timezone.utc).isoformat(), section, content))
 
 
 def get_text_from_anthropic_message(message: Any) -> str:
@@ -370,17 +264,85 @@ def is_anthropic_setup_token(token: str) -> bool:
     return "sk-ant-oat" in token
 
 
-def create_message_with_setup_token(
-    token: str,
-    model: str,
+_EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+@dataclass
+class Decision:
+    action: Dict[str, Any]
+    raw_text: str
+    reason: Optional[str]
+    usage: Dict[str, int] = field(default_factory=dict)
+    latency: float = 0.0  # request -> full reply (s)
+    ttft: Optional[float] = None  # request -> first streamed text (s)
+    action_latency: Optional[float] = None  # request -> action complete in stream (s)
+    action_sent_early: bool = False  # on_action already fired for this decision
+    parse_time: float = 0.0  # JSON extraction of the full reply (s)
+    parsed: Dict[str, Any] = field(default_factory=dict)  # full decoded reply (plan fields etc.)
+    hedge: Optional[str] = None  # "won"/"lost" when a hedged duplicate was issued
+    tier: Optional[str] = None  # router tier that answered (set by AgentLoop)
+    model: Optional[str] = None  # model that answered (set by AgentLoop)
+
+
+def usage_to_dict(usage: Any) -> Dict[str, int]:
+    """Normalize SDK usage objects and raw API usage dicts to plain token counts."""
+    if usage is None:
+        return {}
+    out: Dict[str, int] = {}
+    for key in (
+        "input_tokens",
+        "output_tokens",
+        "cache_creation_input_tokens",
+        "cache_read_input_tokens",
+    ):
+        value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+        if isinstance(value, int):
+            out[key] = value
+    return out
+
+
+def format_usage(usage: Dict[str, int]) -> str:
+    return (
+        f"input={usage.get('input_tokens', 0)} "
+        f"cache_read={usage.get('cache_read_input_tokens', 0)} "
+        f"cache_creation={usage.get('cache_creation_input_tokens', 0)} "
+        f"output={usage.get('output_tokens', 0)}"
+    )
+
+
+def build_prompt_prefix(
     system_prompt: str,
     skill_md: str,
-    user_payload: Dict[str, Any],
-) -> str:
-    url = "https://api.anthropic.com/v1/messages"
-    headers = {
+    setup_token: bool,
+    prompt_cache: bool = True,
+) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Build the stable (system, skill) prefix shared by every decide_action call.
+
+    The prefix is identical for the whole run, so with `prompt_cache` it carries
+    cache_control breakpoints on the last system block and on the skill block;
+    only the trailing observation message changes between steps.
+    """
+    system: List[Dict[str, Any]] = []
+    if setup_token:
+        system.append({"type": "text", "text": CLAUDE_CODE_SYSTEM_PROMPT})
+    system.append({"type": "text", "text": system_prompt})
+    skill_block: Dict[str, Any] = {
+        "type": "text",
+        "text": SKILL_PROMPT_TEMPLATE.format(skill_md=skill_md),
+    }
+    if prompt_cache:
+        system[-1]["cache_control"] = _EPHEMERAL_CACHE
+        skill_block["cache_control"] = _EPHEMERAL_CACHE
+    return system, {"role": "user", "content": [skill_block]}
+
+
+ANTHROPIC_MESSAGES_PATH = "/v1/messages"
+
+
+def _setup_token_headers(token: str, accept: str) -> Dict[str, str]:
+    return {
         "Content-Type": "application/json",
-        "Accept": "application/json",
+        "Accept": accept,
         "Authorization": f"Bearer {token}",
         "anthropic-version": "2023-06-01",
         "anthropic-dangerous-direct-browser-access": "true",
@@ -393,32 +355,51 @@ def create_message_with_setup_token(
         "user-agent": "claude-cli/1.0.56 (external, cli)",
         "x-app": "cli",
     }
-    body = {
+
+
+def _message_params(
+    model: str,
+    system_prompt: str,
+    skill_md: str,
+    user_content: str,
+    setup_token: bool,
+    prompt_cache: bool,
+) -> Dict[str, Any]:
+    system, skill_message = build_prompt_prefix(
+        system_prompt, skill_md, setup_token=setup_token, prompt_cache=prompt_cache
+    )
+    return {
         "model": model,
         "max_tokens": 600,
-        "system": [
-            {"type": "text", "text": CLAUDE_CODE_SYSTEM_PROMPT},
-            {"type": "text", "text": system_prompt},
-        ],
+        "system": system,
         "messages": [
-            {"role": "user", "content": SKILL_PROMPT_TEMPLATE.format(skill_md=skill_md)},
-            {"role": "user", "content": json.dumps(user_payload, ensure_ascii=True)},
+            skill_message,
+            {"role": "user", "content": user_content},
         ],
     }
-    req = urllib.request.Request(
-        url=url,
-        method="POST",
-        data=json.dumps(body).encode("utf-8"),
-        headers=headers,
+
+
+def create_message_with_setup_token(
+    token: str,
+    model: str,
+    system_prompt: str,
+    skill_md: str,
+    user_content: str,
+    prompt_cache: bool = True,
+    session: Optional[AnthropicSession] = None,
+    cancel: Optional[CancelToken] = None,
+) -> tuple[str, Dict[str, int]]:
+    body = _message_params(model, system_prompt, skill_md, user_content, True, prompt_cache)
+    status, payload = (session or shared_session()).request(
+        "POST",
+        ANTHROPIC_MESSAGES_PATH,
+        body=json.dumps(body).encode("utf-8"),
+        headers=_setup_token_headers(token, "application/json"),
+        cancel=cancel,
     )
-    try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            raw = resp.read().decode("utf-8")
-    except urllib.error.HTTPError as e:
-        err_body = e.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"Anthropic HTTP {e.code}: {err_body}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Anthropic network error: {e}") from e
+    raw = payload.decode("utf-8", errors="replace")
+    if status >= 300:
+        raise RuntimeError(f"Anthropic HTTP {status}: {raw}")
 
     parsed = json.loads(raw)
     parts: List[str] = []
@@ -428,39 +409,73 @@ def create_message_with_setup_token(
     text = "\n".join(parts).strip()
     if not text:
         raise RuntimeError(f"Anthropic setup-token response missing text content: {raw[:500]}")
-    return text
+    return text, usage_to_dict(parsed.get("usage"))
 
 
-def decide_action(
-    claude: Optional[Anthropic],
-    anthropic_token: str,
+def stream_message_with_setup_token(
+    token: str,
     model: str,
     system_prompt: str,
     skill_md: str,
-    user_payload: Dict[str, Any],
-) -> tuple[Dict[str, Any], str, Optional[str]]:
-    if is_anthropic_setup_token(anthropic_token):
-        text = create_message_with_setup_token(
-            token=anthropic_token,
-            model=model,
-            system_prompt=system_prompt,
-            skill_md=skill_md,
-            user_payload=user_payload,
-        )
-    else:
-        if claude is None:
-            raise RuntimeError("Anthropic API-key mode selected but client is missing")
-        message = claude.messages.create(
-            model=model,
-            max_tokens=600,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": SKILL_PROMPT_TEMPLATE.format(skill_md=skill_md)},
-                {"role": "user", "content": json.dumps(user_payload, ensure_ascii=True)},
-            ],
-        )
-        text = get_text_from_anthropic_message(message)
+    user_content: str,
+    usage: Dict[str, int],
+    prompt_cache: bool = True,
+    session: Optional[AnthropicSession] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Generator[str, None, None]:
+    """Yield text deltas via raw SSE; fills `usage` from message_start/message_delta."""
+    body = _message_params(model, system_prompt, skill_md, user_content, True, prompt_cache)
+    body["stream"] = True
+    with (session or shared_session()).stream(
+        ANTHROPIC_MESSAGES_PATH,
+        body=json.dumps(body).encode("utf-8"),
+        headers=_setup_token_headers(token, "text/event-stream"),
+        cancel=cancel,
+    ) as lines:
+        for raw_line in lines:
+            line = raw_line.decode("utf-8").rstrip("\n")
+            if not line.startswith("data: "):
+                continue
+            data = json.loads(line[6:])
+            kind = data.get("type")
+            if kind == "content_block_delta":
+                delta = data.get("delta", {})
+                if delta.get("type") == "text_delta":
+                    yield delta["text"]
+            elif kind == "message_start":
+                usage.update(usage_to_dict(data.get("message", {}).get("usage")))
+            elif kind == "message_delta":
+                usage.update(usage_to_dict(data.get("usage")))
+            elif kind == "error":
+                raise RuntimeError(f"Anthropic stream error: {data.get('error')}")
+            elif kind == "message_stop":
+                return
+
+
+def _stream_message_sdk(
+    claude: Anthropic,
+    params: Dict[str, Any],
+    usage: Dict[str, int],
+    cancel: Optional[CancelToken] = None,
+) -> Generator[str, None, None]:
+    with claude.messages.stream(**params) as stream:
+        # Closing the response from the winning thread fails a read blocked before the first token.
+        unregister = cancel.register(stream.close) if cancel is not None else lambda: None
+        try:
+            for text in stream.text_stream:
+                yield text
+        except Exception as exc:
+            if cancel is not None and cancel.is_set():
+                raise HedgeCancelled() from exc
+            raise
+        finally:
+            unregister()
+        if cancel is not None and cancel.is_set():
+            raise HedgeCancelled()
+        usage.update(usage_to_dict(getattr(stream.get_final_message(), "usage", None)))
 
+
+def _parse_decision_text(text: str) -> tuple[Dict[str, Any], Optional[str], Dict[str, Any]]:
     parsed = extract_json_object(text)
     action = parsed.get("action") if isinstance(parsed, dict) else None
     if not isinstance(action, dict):
@@ -475,8 +490,143 @@ def decide_action(
     reason = parsed.get("reason") if isinstance(parsed, dict) else None
     if not isinstance(reason, str):
         reason = None
+    return action, reason, parsed
+
 
-    return action, text, reason
+def decide_action(
+    claude: Optional[Anthropic],
+    anthropic_token: str,
+    model: str,
+    system_prompt: str,
+    skill_md: str,
+    user_content: str,
+    prompt_cache: bool = True,
+    stream: bool = False,
+    on_action: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_reason_chunk: Optional[Callable[[str], None]] = None,
+    on_first_token: Optional[Callable[[], None]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Decision:
+    """Ask Claude for the next action.
+
+    With `stream`, the reply is parsed while it arrives: `on_action` fires as
+    soon as the "action" object is complete (before "reason" is generated)
+    and `on_reason_chunk` receives the decoded reason text incrementally.
+    `on_first_token` fires on the first streamed delta; setting `cancel`
+    raises HedgeCancelled, also out of a read that is still waiting for
+    the first byte (the socket is shut down). Without `stream`, a
+    cancellable API-key call is still sent as a stream (and read whole) so
+    that it can be aborted the same way.
+    """
+    setup_token = is_anthropic_setup_token(anthropic_token)
+    if not setup_token and claude is None:
+        raise RuntimeError("Anthropic API-key mode selected but client is missing")
+    t_request = time.monotonic()
+
+    if not stream:
+        if setup_token:
+            text, usage = create_message_with_setup_token(
+                token=anthropic_token,
+                model=model,
+                system_prompt=system_prompt,
+                skill_md=skill_md,
+                user_content=user_content,
+                prompt_cache=prompt_cache,
+                cancel=cancel,
+            )
+        else:
+            assert claude is not None
+            params = _message_params(model, system_prompt, skill_md, user_content, False, prompt_cache)
+            if cancel is None:
+                message = claude.messages.create(**params)
+                text = get_text_from_anthropic_message(message)
+                usage = usage_to_dict(getattr(message, "usage", None))
+            else:
+                # messages.create can't be interrupted once sent, so a hedged
+                # call reads the stream whole; cancel closes that response.
+                usage = {}
+                text = "".join(_stream_message_sdk(claude, params, usage, cancel)).strip()
+                if not text:
+                    raise RuntimeError("Anthropic stream returned no text content")
+        t_parse = time.monotonic()
+        action, reason, parsed = _parse_decision_text(text)
+        t_done = time.monotonic()
+        return Decision(
+            action=action,
+            raw_text=text,
+            reason=reason,
+            usage=usage,
+            latency=t_done - t_request,
+            parsed=parsed,
+            parse_time=t_done - t_parse,
+        )
+
+    usage = {}
+    if setup_token:
+        deltas = stream_message_with_setup_token(
+            token=anthropic_token,
+            model=model,
+            system_prompt=system_prompt,
+            skill_md=skill_md,
+            user_content=user_content,
+            usage=usage,
+            prompt_cache=prompt_cache,
+            cancel=cancel,
+        )
+    else:
+        assert claude is not None
+        deltas = _stream_message_sdk(
+            claude,
+            _message_params(model, system_prompt, skill_md, user_content, False, prompt_cache),
+            usage,
+            cancel,
+        )
+
+    parser = StreamingReplyParser()
+    parts: List[str] = []
+    ttft: Optional[float] = None
+    action_latency: Optional[float] = None
+    try:
+        for delta in deltas:
+            if cancel is not None and cancel.is_set():
+                raise HedgeCancelled()
+            if ttft is None:
+                ttft = time.monotonic() - t_request
+                if on_first_token is not None:
+                    on_first_token()
+            parts.append(delta)
+            parser.feed(delta)
+            early = parser.take_action()
+            if early is not None and "type" in early and action_latency is None:
+                action_latency = time.monotonic() - t_request
+                if on_action is not None:
+                    on_action(early)
+            if on_reason_chunk is not None:
+                reason_delta = parser.take_reason_delta()
+                if reason_delta:
+                    on_reason_chunk(reason_delta)
+    finally:
+        # Closes the HTTP stream right away if we stopped early (cancelled hedge).
+        deltas.close()
+
+    text = "".join(parts).strip()
+    if not text:
+        raise RuntimeError("Anthropic stream returned no text content")
+    t_parse = time.monotonic()
+    action, reason, parsed = _parse_decision_text(text)
+    t_done = time.monotonic()
+    return Decision(
+        action=action,
+        raw_text=text,
+        reason=reason,
+        usage=usage,
+        latency=t_done - t_request,
+        ttft=ttft,
+        action_latency=action_latency,
+        action_sent_early=action_latency is not None and on_action is not None,
+        parsed=parsed,
+        parse_time=t_done - t_parse,
+    )
 
 
 def review_observation_before_llm(step: int, log_path: Path) -> None:
@@ -499,9 +649,189 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--name", default="ClaudeOpusBot", help="Local runtime join name")
     parser.add_argument("--model", default="claude-opus-4-6", help="Anthropic model name")
     parser.add_argument("--max-steps", type=int, default=300, help="Maximum observe/act iterations")
-    parser.add_argument("--sleep", type=float, default=0.25, help="Seconds between actions")
+    parser.add_argument("--sleep", type=float, default=0.25, help="Seconds between actions (tick period in --pipeline mode)")
+    parser.add_argument("--http-connect-timeout", type=float, default=5.0, help="Runtime HTTP connect timeout (s)")
+    parser.add_argument("--http-timeout", type=float, default=30.0, help="Runtime HTTP read timeout (s)")
+    parser.add_argument(
+        "--no-rate-limit",
+        action="store_false",
+        dest="rate_limit",
+        help="Don't pace observe/input to the documented 10 req/s (burst 20) limit",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Poll observations in the background while Claude thinks and fire actions without blocking",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.1,
+        help="Seconds between background /observe polls in --pipeline mode",
+    )
+    parser.add_argument(
+        "--no-tick-dedupe",
+        action="store_false",
+        dest="tick_dedupe",
+        help="Act on every /observe response even when the server tick hasn't advanced",
+    )
+    parser.add_argument(
+        "--tick-wait",
+        type=float,
+        default=2.0,
+        help="Max seconds to re-poll for a newer tick before acting on a repeated one",
+    )
+    parser.add_argument(
+        "--no-anthropic-warmup",
+        action="store_false",
+        dest="anthropic_warmup",
+        help="Don't open the Anthropic HTTPS connection at startup (first decision pays the handshake)",
+    )
+    parser.add_argument(
+        "--no-prompt-cache",
+        action="store_false",
+        dest="prompt_cache",
+        help="Disable cache_control breakpoints on the system prompt and skill.md",
+    )
+    parser.add_argument(
+        "--diff-epsilon",
+        type=float,
+        default=0.0,
+        help="Min coordinate change reported in diffs (0 keeps the 1-decimal rounding rule)",
+    )
+    parser.add_argument(
+        "--decision-cache",
+        choices=("off",) + SIGNATURE_MODES,
+        default="off",
+        help="Reuse the last decision without an LLM call when the diff (or quantized state) repeats",
+    )
+    parser.add_argument("--cache-ttl", type=float, default=10.0, help="Seconds a cached decision stays valid")
+    parser.add_argument("--cache-max-reuse", type=int, default=5, help="Max times one cached decision is reused")
+    parser.add_argument("--cache-quantum", type=float, default=1.0, help="Grid size for --decision-cache state")
+    parser.add_argument(
+        "--cache-noop-action",
+        default=None,
+        help='Action JSON to send on a cache hit instead of repeating, e.g. \'{"type": "Wait"}\'',
+    )
+    parser.add_argument(
+        "--wire-format",
+        choices=WIRE_FORMATS,
+        default="json",
+        help="Prompt encoding: JSON payloads, or a schema header + one row per entity with grouped diffs",
+    )
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=0,
+        help="Send only the K most relevant entities and summarize the rest (0 = send all)",
+    )
+    parser.add_argument(
+        "--relevance-radius",
+        type=float,
+        default=150.0,
+        help="Entities farther than this (studs) are always summarized with --top-k",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream Claude's reply and send the action as soon as it is complete",
+    )
+    parser.add_argument(
+        "--plans",
+        action="store_true",
+        help="Let Claude return short multi-step plans that run locally between LLM calls",
+    )
+    parser.add_argument("--max-plan-steps", type=int, default=6, help="Max steps kept from one plan")
+    parser.add_argument(
+        "--fast-model",
+        default=None,
+        help="Route routine steps to this model and escalate to --model on triggers (e.g. claude-haiku-4-5)",
+    )
+    parser.add_argument(
+        "--escalate-on",
+        default="all",
+        help=f"Comma-separated escalation triggers, or 'all' ({', '.join(sorted(ESCALATION_TRIGGERS))})",
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=0.6,
+        help="Re-ask --model when the fast model's confidence is below this",
+    )
+    parser.add_argument(
+        "--map",
+        action="store_true",
+        help="Fetch static geometry from /map (cached on disk) and add nearby terrain to the prompt",
+    )
+    parser.add_argument(
+        "--map-cache-dir", default=str(DEFAULT_CACHE_DIR), help="Where --map caches /map responses"
+    )
+    parser.add_argument(
+        "--game-id",
+        default=None,
+        help="Game identity for the --map cache (default: game_id from /join, else a hash of skill.md)",
+    )
+    parser.add_argument(
+        "--map-radius", type=float, default=30.0, help="Static parts within this distance go into the terrain context"
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Re-issue an LLM call that has no first token (or reply, without --stream) after the model's rolling p90",
+    )
+    parser.add_argument("--hedge-model", default=None, help="Model for the duplicate request (default: same model)")
+    parser.add_argument(
+        "--hedge-percentile", type=float, default=0.9, help="Latency percentile used as the hedge delay"
+    )
+    parser.add_argument(
+        "--hedge-max-rate", type=float, default=0.2, help="Max fraction of LLM calls that may be hedged"
+    )
+    parser.add_argument(
+        "--hedge-max-tokens",
+        type=int,
+        default=0,
+        help="Stop hedging after this many estimated prompt tokens spent on hedges (0 = no budget)",
+    )
+    parser.add_argument(
+        "--log-jsonl",
+        action="store_true",
+        help="Also write conversation-log sections as JSONL records next to the log (<log>.jsonl)",
+    )
+    parser.add_argument(
+        "--log-max-mb",
+        type=float,
+        default=0.0,
+        help="Rotate the conversation log at this size in MB (0 = never)",
+    )
+    parser.add_argument("--log-backups", type=int, default=5, help="Rotated conversation-log segments to keep")
+    parser.add_argument("--log-compress", action="store_true", help="gzip rotated conversation-log segments")
+    parser.add_argument(
+        "--record",
+        default=None,
+        help="Record observe responses, model replies and input results to this trace (e.g. run.trace.jsonl.gz)",
+    )
+    parser.add_argument("--trace", default=None, help="Write per-stage latency spans to this JSONL file")
+    parser.add_argument("--trace-window", type=int, default=1000, help="Spans per stage kept for p50/p95/p99")
+    parser.add_argument(
+        "--prometheus-textfile",
+        default=None,
+        help="Export stage latency percentiles to this Prometheus textfile (node_exporter collector)",
+    )
     parser.add_argument("--verbose", action="store_true", help="Print extra runtime diagnostics")
     parser.add_argument("--audio", action="store_true", help="Enable streamed TTS playback for model reasons")
+    parser.add_argument(
+        "--audio-output",
+        choices=AUDIO_OUTPUTS,
+        default=None,
+        help="Playback backend (default: $AGENT_AUDIO_OUTPUT or auto = sounddevice, then ffplay)",
+    )
+    parser.add_argument("--audio-output-file", default=None, help="With --audio-output null, record TTS audio to this WAV file")
+    parser.add_argument(
+        "--no-tts-cache",
+        action="store_false",
+        dest="tts_cache",
+        help="Always synthesize reasons instead of replaying cached audio ($TTS_CACHE_DIR, default ~/.clawblox/tts)",
+    )
     parser.add_argument(
         "--no-breakpoint-before-llm",
         action="store_false",
@@ -513,10 +843,673 @@ def parse_args() -> argparse.Namespace:
         default="conversation.log",
         help="Path to conversation log file (overwritten on each run)",
     )
-    parser.set_defaults(breakpoint_before_llm=True)
+    parser.set_defaults(breakpoint_before_llm=True, prompt_cache=True)
     return parser.parse_args()
 
 
+class AgentLoop:
+    """One run's observe -> decide -> act loop and the state carried between steps.
+
+    run() builds the clients and the optional components selected on the
+    command line and passes them in (None when off). Each step observes,
+    advances a running local plan, builds the model payload, and then either
+    replays a cached decision or asks the model, before waiting for the next
+    tick.
+    """
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        api: ClawbloxClient,
+        claude: Optional[Anthropic],
+        anthropic_token: str,
+        system_prompt: str,
+        skill_md: str,
+        conversation_log: ConversationLogWriter,
+        tracer: Tracer,
+        audio_streamer: Optional[AgentAudioStreamer] = None,
+        router: Optional[DecisionRouter] = None,
+        hedger: Optional[Hedger] = None,
+        decision_cache: Optional[DecisionCache] = None,
+        compressor: Optional[RelevanceCompressor] = None,
+        world_map: Optional[WorldMap] = None,
+        ticks: Optional[TickTracker] = None,
+        recorder: Optional[TraceRecorder] = None,
+    ) -> None:
+        self.args = args
+        self.api = api
+        self.claude = claude
+        self.anthropic_token = anthropic_token
+        self.system_prompt = system_prompt
+        self.skill_md = skill_md
+        self.conversation_log = conversation_log
+        self.tracer = tracer
+        self.audio_streamer = audio_streamer
+        self.router = router
+        self.hedger = hedger
+        self.decision_cache = decision_cache
+        self.compressor = compressor
+        self.world_map = world_map
+        self.ticks = ticks
+        self.recorder = recorder
+        self.poller: Optional[ObservationPoller] = None
+        self.dispatcher: Optional[ActionDispatcher] = None
+        self.ticker: Optional[DeadlineTicker] = None
+
+        self.differ = ObservationDiffer(epsilon=args.diff_epsilon)
+        self.grouped_diffs = args.wire_format == "table"
+        self.wire_stats = WireFormatStats(args.wire_format)
+        self.pipeline_stats = PipelineStats()
+        self.plan_stats = PlanStats()
+        self.usage_totals: Dict[str, int] = {}
+        self.request_to_input: List[float] = []
+
+        # Carried from one step to the next.
+        self.previous_action_error: Optional[str] = None
+        self.previous_obs: Optional[Dict[str, Any]] = None
+        self.last_shown: Optional[FrozenSet[Any]] = None
+        self.last_other_counts: Optional[List[Any]] = None
+        self.last_terrain: Optional[str] = None
+        self.last_model_action: Optional[Dict[str, Any]] = None
+        self.plan: Optional[PlanExecutor] = None
+        self.plan_obs: Optional[Dict[str, Any]] = None
+        self.input_sent_at: Optional[float] = None
+        self.last_seq = 0
+
+    def start(self) -> None:
+        """Start the poller and dispatcher threads in --pipeline mode."""
+        if not self.args.pipeline:
+            return
+        self.poller = ObservationPoller(self.api.observe, interval=self.args.poll_interval, tracker=self.ticks)
+        self.dispatcher = ActionDispatcher(self._traced_act)
+        self.ticker = DeadlineTicker(self.args.sleep)
+        self.poller.start()
+        self.dispatcher.start()
+        print(f"Pipeline: enabled (poll every {self.args.poll_interval:.2f}s, tick {self.args.sleep:.2f}s)")
+
+    def run(self) -> None:
+        step = 0
+        step_started: Optional[float] = None
+        try:
+            for step in range(self.args.max_steps):
+                now = time.monotonic()
+                if step_started is not None:
+                    self.tracer.record("step", step - 1, step_started, now)
+                step_started = now
+                if not self.step(step):
+                    break
+        finally:
+            if step_started is not None:
+                self.tracer.record("step", step, step_started, time.monotonic())
+
+    def step(self, step: int) -> bool:
+        """Run one step; False once the game has ended."""
+        obs, obs_received_at, obs_tick, obs_tick_age = self.observe(step)
+        if self.recorder is not None:
+            self.recorder.record("obs", step, obs)
+        status = str(obs.get("game_status", "")).lower()
+        if self.args.verbose:
+            print(f"step={step} status={status}")
+        if status and status not in ACTIVE_GAME_STATUSES:
+            print(f"Game ended with status: {status}")
+            append_conversation_log(self.conversation_log, "GAME_STATUS", status)
+            return False
+
+        if self.plan is not None:
+            plan_running, plan_status = self.advance_plan(step, obs)
+            if plan_running:
+                self.wait_tick(step)
+                return True
+        else:
+            plan_status = None
+
+        routed_from = self.previous_obs
+        user_content, diff = self.build_payload(step, obs, plan_status)
+
+        cache_key: Optional[str] = None
+        cached_action: Optional[Dict[str, Any]] = None
+        if self.decision_cache is not None and diff is not None and self.previous_action_error is None:
+            cache_key = decision_signature(
+                self.args.decision_cache, diff, obs, self.last_model_action, quantum=self.args.cache_quantum
+            )
+            with self.tracer.span("cache_lookup", step):
+                cached_action = self.decision_cache.lookup(cache_key)
+
+        # Age when the observation is handed to the decider; the model's
+        # latency is tracked separately.
+        obs_age = time.monotonic() - obs_received_at
+        self.pipeline_stats.record_step(obs_age)
+        if cached_action is not None and cache_key is not None:
+            self.replay_cached(step, cache_key, cached_action)
+            self.send_action(step, cached_action, obs)
+        else:
+            decision = self.decide(step, obs, routed_from, user_content, diff, plan_status)
+            if decision is not None:
+                self.finish_decision(step, obs, decision, obs_age, obs_tick, obs_tick_age, cache_key)
+        self.wait_tick(step)
+        return True
+
+    # -- observe -------------------------------------------------------------
+
+    def observe(self, step: int) -> Tuple[Dict[str, Any], float, Optional[int], float]:
+        """(observation, received_at, server tick, tick age) for this step."""
+        if self.poller is not None and self.dispatcher is not None:
+            with self.tracer.span("observe_wait", step):
+                snapshot = self.poller.latest(min_seq=self.last_seq + 1, timeout=self.args.http_timeout)
+            self.last_seq = snapshot.seq
+            self.log_act_outcomes(self.dispatcher.drain())
+            return snapshot.obs, snapshot.received_at, snapshot.tick, snapshot.tick_age
+        obs, received_at, sample = self.observe_fresh(step)
+        if sample is None:
+            return obs, received_at, None, 0.0
+        return obs, received_at, sample.tick, sample.age
+
+    def observe_fresh(self, step: int) -> Tuple[Dict[str, Any], float, Optional[TickSample]]:
+        """Observe until the server tick advances, re-polling when the next tick is due.
+
+        Repeated ticks never reach diffing, the LLM or the log. After
+        --tick-wait seconds without a new tick (paused or finished game) the
+        latest response is returned anyway so status changes are still seen.
+        """
+        ticks = self.ticks
+        deadline = time.monotonic() + self.args.tick_wait
+        while True:
+            sent_at = time.monotonic()
+            with self.tracer.span("observe", step):
+                obs = self.api.observe()
+            received_at = time.monotonic()
+            if ticks is None:
+                return obs, received_at, None
+            sample = ticks.update(obs, sent_at, received_at)
+            if sample.fresh or received_at >= deadline:
+                return obs, received_at, sample
+            due = ticks.next_fresh_at()
+            delay = max(1.0 / ticks.rate(), (due - received_at) if due is not None else 0.0)
+            time.sleep(min(delay, deadline - received_at))
+
+    # -- plan ----------------------------------------------------------------
+
+    def advance_plan(self, step: int, obs: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        """Run the next local plan step: (still running, outcome once it has ended)."""
+        plan = self.plan
+        assert plan is not None
+        if plan.active and self.plan_obs is not None:
+            interrupt = significant_events(self.plan_obs, obs)
+            if interrupt:
+                plan.abort(interrupt)
+            elif self.previous_action_error:
+                plan.fail(f"action error: {self.previous_action_error}")
+        self.plan_obs = obs
+        if plan.active:
+            next_action = plan.advance(obs)
+            if next_action is not None:
+                self.plan_stats.plan_actions += 1
+                append_conversation_log(
+                    self.conversation_log,
+                    f"STEP_{step}_PLAN_ACTION",
+                    json.dumps(next_action, ensure_ascii=True),
+                )
+                print(f"[step {step}] plan step {plan.index + 1}/{len(plan.steps)}: {next_action.get('type')}")
+                self.send_action(step, next_action, obs)
+            if plan.active:
+                self.plan_stats.local_steps += 1
+                return True, None
+        self.plan = None
+        append_conversation_log(self.conversation_log, f"STEP_{step}_PLAN_STATUS", str(plan.outcome))
+        return False, plan.outcome
+
+    def start_plan(self, step: int, obs: Dict[str, Any], decision: Decision) -> None:
+        steps = parse_plan(decision.parsed, self.args.max_plan_steps)
+        if len(steps) > 1 or (steps and (steps[0].until or steps[0].wait)):
+            self.plan = PlanExecutor(steps)
+            self.plan.start(obs)
+            self.plan_obs = obs
+            append_conversation_log(
+                self.conversation_log,
+                f"STEP_{step}_PLAN",
+                json.dumps([st.__dict__ for st in steps], ensure_ascii=True),
+            )
+
+    # -- payload -------------------------------------------------------------
+
+    def encode_payload(self, payload: Dict[str, Any]) -> tuple[str, str]:
+        """(content for the model, text for the log) in the selected --wire-format."""
+        if self.args.wire_format == "table":
+            text = format_payload_table(payload)
+            return text, text
+        # One filtering walk: compact JSON for Claude, pretty JSON for the log.
+        return serialize_payload(payload)
+
+    def build_payload(
+        self, step: int, obs: Dict[str, Any], plan_status: Optional[str]
+    ) -> Tuple[str, Optional[str]]:
+        """Serialize this step's user message: (content, diff or None on the first step)."""
+        compressor = self.compressor
+        model_obs = obs
+        other_entities: Optional[List[Dict[str, Any]]] = None
+        shown: Optional[FrozenSet[Any]] = None
+        if compressor is not None:
+            with self.tracer.span("compress", step):
+                model_obs, other_entities = compressor.compress(obs)
+            shown = frozenset(e.get("id") for e in model_obs.get("world", {}).get("entities", []))
+        previous_obs = self.previous_obs
+        diff: Optional[str] = None
+        if previous_obs is None:
+            self.differ.reset(obs, shown)
+            user_payload: Dict[str, Any] = {
+                "observation": model_obs,
+                "last_action_error": self.previous_action_error,
+            }
+        else:
+            with self.tracer.span("diff", step):
+                # Diff the full observation and report only the kept entities:
+                # leaving or re-entering the top-K is not a removal or an appearance.
+                diff = self.differ.diff(obs, grouped=self.grouped_diffs, shown=shown)
+            user_payload = {
+                "state_changes": diff,
+                "last_action_error": self.previous_action_error,
+            }
+            if plan_status:
+                user_payload["plan_status"] = plan_status
+            last_shown = self.last_shown
+            if shown is not None and last_shown is not None and shown - last_shown:
+                # Existing entities the model hasn't seen yet: send their current state.
+                before = {e.get("id") for e in previous_obs.get("world", {}).get("entities", [])}
+                entered = [
+                    e
+                    for e in model_obs.get("world", {}).get("entities", [])
+                    if e.get("id") not in last_shown and e.get("id") in before
+                ]
+                if entered:
+                    user_payload["newly_relevant"] = entered
+        self.last_shown = shown
+        if other_entities is not None:
+            # Resent only when the per-name counts change, not on every move.
+            counts = [(g["name"], g["count"]) for g in other_entities]
+            if counts != self.last_other_counts:
+                user_payload["other_entities"] = other_entities
+                self.last_other_counts = counts
+        position = obs.get("player", {}).get("position")
+        if self.world_map is not None and isinstance(position, list) and len(position) >= 3:
+            with self.tracer.span("map", step):
+                terrain = self.world_map.describe_around(position, self.args.map_radius)
+            if terrain != self.last_terrain:
+                user_payload["terrain"] = terrain
+                self.last_terrain = terrain
+        user_payload["instruction"] = "Return only the JSON object now."
+        self.previous_obs = obs
+        with self.tracer.span("serialize", step):
+            user_content, user_content_pretty = self.encode_payload(user_payload)
+        append_conversation_log(self.conversation_log, f"STEP_{step}_USER_OBSERVATION", user_content_pretty)
+        if compressor is not None:
+            self.log_compression(step, obs, model_obs, previous_obs, diff, user_content)
+        return user_content, diff
+
+    def log_compression(
+        self,
+        step: int,
+        obs: Dict[str, Any],
+        model_obs: Dict[str, Any],
+        previous_obs: Optional[Dict[str, Any]],
+        diff: Optional[str],
+        user_content: str,
+    ) -> None:
+        assert self.compressor is not None
+        kept = len(model_obs.get("world", {}).get("entities", []))
+        total = len(obs.get("world", {}).get("entities", []))
+        note = f"entities={kept}/{total}"
+        if diff is None or step % COMPRESSION_SAMPLE_EVERY == 0:
+            # Building the uncompressed payload costs a second full diff and
+            # serialization, so the savings are only estimated on sampled steps.
+            if diff is None or previous_obs is None:
+                full_payload: Dict[str, Any] = {"observation": obs, "last_action_error": self.previous_action_error}
+            else:
+                full_differ = ObservationDiffer(epsilon=self.args.diff_epsilon)
+                full_differ.reset(previous_obs)
+                full_payload = {
+                    "state_changes": full_differ.diff(obs, grouped=self.grouped_diffs),
+                    "last_action_error": self.previous_action_error,
+                }
+            tokens_before = estimate_tokens(self.encode_payload(full_payload)[0])
+            tokens_after = estimate_tokens(user_content)
+            self.compressor.stats.record(tokens_before, tokens_after)
+            note += f" tokens~{tokens_before}->{tokens_after}"
+        append_conversation_log(self.conversation_log, f"STEP_{step}_COMPRESSION", note)
+        if self.args.verbose:
+            print(f"[step {step}] compression: {note}")
+
+    # -- decide --------------------------------------------------------------
+
+    def replay_cached(self, step: int, cache_key: str, action_body: Dict[str, Any]) -> None:
+        uses = self.decision_cache.uses(cache_key) if self.decision_cache is not None else 0
+        print(f"\n[step {step}] Decision cache hit ({uses}/{self.args.cache_max_reuse}); no LLM call")
+        print(json.dumps(action_body, indent=2, ensure_ascii=True))
+        append_conversation_log(
+            self.conversation_log,
+            f"STEP_{step}_DECISION_CACHE",
+            f"hit uses={uses}/{self.args.cache_max_reuse} action={json.dumps(action_body, ensure_ascii=True)}",
+        )
+
+    def decide(
+        self,
+        step: int,
+        obs: Dict[str, Any],
+        routed_from: Optional[Dict[str, Any]],
+        user_content: str,
+        diff: Optional[str],
+        plan_status: Optional[str],
+    ) -> Optional[Decision]:
+        """Ask the model (routed, hedged, escalated as configured) and send its action.
+
+        Returns None when the reply could not be parsed; the error is fed back
+        on the next step.
+        """
+        if self.args.breakpoint_before_llm:
+            self.conversation_log.flush()
+            review_observation_before_llm(step, self.conversation_log.path)
+
+        router = self.router
+        audio_streamer = self.audio_streamer
+        stream_reason_to_audio = bool(self.args.stream and audio_streamer)
+        tier, model = SLOW_TIER, self.args.model
+        if router is not None:
+            tier, fired = router.route(routed_from, obs, diff, self.previous_action_error, plan_status)
+            model = router.model_for(tier)
+            append_conversation_log(
+                self.conversation_log,
+                f"STEP_{step}_ROUTE",
+                f"tier={tier} model={model} triggers={','.join(fired) or 'none'}",
+            )
+        self.input_sent_at = None
+        t_llm = time.monotonic()
+        # A fast-tier action may be discarded on low confidence, so it is
+        # only sent once the whole reply has been read.
+        hold_action = router is not None and tier == FAST_TIER and "low_confidence" in router.triggers
+        decision = self.ask_model(
+            step,
+            model,
+            user_content,
+            on_action=None if hold_action else (lambda early: self.send_action(step, early, obs)),
+            on_reason_chunk=audio_streamer.send_text_chunk if audio_streamer and stream_reason_to_audio and not hold_action else None,
+        )
+        if decision is None:
+            return None
+        self.trace_decision(step, t_llm, decision, model)
+        decision.tier, decision.model = tier, model
+        if router is not None:
+            router.record(tier, decision.latency)
+            if tier == FAST_TIER and router.low_confidence(decision.parsed):
+                decision = self.escalate(step, obs, user_content, decision)
+            elif hold_action and stream_reason_to_audio and audio_streamer and decision.reason:
+                audio_streamer.send_text_chunk(decision.reason)
+        if not decision.action_sent_early:
+            self.send_action(step, decision.action, obs)
+        if self.input_sent_at is not None:
+            self.request_to_input.append(self.input_sent_at - t_llm)
+            append_conversation_log(
+                self.conversation_log,
+                f"STEP_{step}_LATENCY",
+                f"request_to_input={self.input_sent_at - t_llm:.3f}s "
+                f"ttft={decision.ttft if decision.ttft is not None else float('nan'):.3f}s "
+                f"total={decision.latency:.3f}s early={decision.action_sent_early} "
+                f"hedge={decision.hedge or 'none'}",
+            )
+        return decision
+
+    def escalate(self, step: int, obs: Dict[str, Any], user_content: str, fast: Decision) -> Decision:
+        """Re-ask the slow model after a low-confidence fast reply; keeps `fast` if that fails."""
+        router = self.router
+        assert router is not None
+        append_conversation_log(
+            self.conversation_log,
+            f"STEP_{step}_ROUTE",
+            f"escalate: confidence={fast.parsed.get('confidence')} < {router.min_confidence} "
+            f"fast_action={json.dumps(fast.action, ensure_ascii=True)}",
+        )
+        self.add_usage(fast.usage)
+        audio_streamer = self.audio_streamer
+        t_escalate = time.monotonic()
+        slow = self.ask_model(
+            step,
+            router.slow_model,
+            user_content,
+            on_action=lambda early: self.send_action(step, early, obs),
+            on_reason_chunk=audio_streamer.send_text_chunk if audio_streamer and self.args.stream else None,
+        )
+        if slow is None:
+            return fast
+        self.trace_decision(step, t_escalate, slow, router.slow_model)
+        slow.tier, slow.model = SLOW_TIER, router.slow_model
+        router.record(SLOW_TIER, slow.latency)
+        return slow
+
+    def finish_decision(
+        self,
+        step: int,
+        obs: Dict[str, Any],
+        decision: Decision,
+        obs_age: float,
+        obs_tick: Optional[int],
+        obs_tick_age: float,
+        cache_key: Optional[str],
+    ) -> None:
+        """Report and log a model decision, speak its reason, and start its plan."""
+        action_body, raw_text, reason = decision.action, decision.raw_text, decision.reason
+        self.add_usage(decision.usage)
+
+        tier_label = f" ({decision.tier}: {decision.model})" if self.router is not None else ""
+        print(f"\n[step {step}] Model response{tier_label}:")
+        print(raw_text)
+        print(f"[step {step}] Extracted action:")
+        print(json.dumps(action_body, indent=2, ensure_ascii=True))
+        if self.args.verbose:
+            print(f"[step {step}] observation age at hand-off: {obs_age:.2f}s")
+            print(f"[step {step}] tokens: {format_usage(decision.usage)}")
+
+        log = self.conversation_log
+        append_conversation_log(log, f"STEP_{step}_ASSISTANT_RAW", raw_text)
+        append_conversation_log(log, f"STEP_{step}_ASSISTANT_ACTION", json.dumps(action_body, indent=2, ensure_ascii=True))
+        append_conversation_log(
+            log,
+            f"STEP_{step}_OBS_AGE",
+            f"{obs_age:.3f}s tick={obs_tick if obs_tick is not None else 'n/a'} tick_age={obs_tick_age:.3f}s",
+        )
+        append_conversation_log(log, f"STEP_{step}_USAGE", format_usage(decision.usage))
+        audio_streamer = self.audio_streamer
+        stream_reason_to_audio = bool(self.args.stream and audio_streamer)
+        if reason:
+            append_conversation_log(log, f"STEP_{step}_ASSISTANT_REASON", reason)
+            if audio_streamer and not stream_reason_to_audio:
+                with self.tracer.span("audio", step):
+                    audio_streamer.enqueue_text(reason)
+        if stream_reason_to_audio and audio_streamer:
+            with self.tracer.span("audio", step):
+                audio_streamer.start_flush()
+        self.last_model_action = action_body
+        self.plan_stats.llm_calls += 1
+        if self.args.plans:
+            self.start_plan(step, obs, decision)
+        if self.decision_cache is not None and cache_key is not None:
+            self.decision_cache.store(cache_key, action_body)
+            append_conversation_log(log, f"STEP_{step}_DECISION_CACHE", "miss")
+
+    def ask_model(
+        self,
+        step: int,
+        model: str,
+        user_content: str,
+        on_action: Optional[Callable[[Dict[str, Any]], None]],
+        on_reason_chunk: Optional[Callable[[str], None]],
+    ) -> Optional[Decision]:
+        """decide_action, but an unparseable reply is fed back as last_action_error instead of raised."""
+        hedger = self.hedger
+        common = dict(
+            claude=self.claude,
+            anthropic_token=self.anthropic_token,
+            system_prompt=self.system_prompt,
+            skill_md=self.skill_md,
+            user_content=user_content,
+            prompt_cache=self.args.prompt_cache,
+            stream=self.args.stream,
+        )
+        try:
+            if hedger is None:
+                decision = decide_action(model=model, on_action=on_action, on_reason_chunk=on_reason_chunk, **common)
+            else:
+                delay = hedger.threshold(model)
+                decision, hedge = hedger.run(
+                    lambda attempt: decide_action(
+                        model=attempt.model,
+                        on_action=attempt.on_action,
+                        on_reason_chunk=attempt.on_reason_chunk,
+                        on_first_token=attempt.first_signal,
+                        cancel=attempt.cancel,
+                        **common,
+                    ),
+                    model,
+                    on_action=on_action,
+                    on_reason_chunk=on_reason_chunk,
+                    cost_estimate=estimate_tokens(self.system_prompt + self.skill_md + user_content),
+                )
+                if hedge is not None:
+                    decision.hedge = "won" if hedge.race.winner is hedge else "lost"
+                    if decision.hedge == "won":
+                        # Report latency from the original request, not the hedge.
+                        offset = hedge.started - hedge.race.attempts[0].started
+                        decision.latency += offset
+                        if decision.ttft is not None:
+                            decision.ttft += offset
+                        if decision.action_latency is not None:
+                            decision.action_latency += offset
+                    append_conversation_log(
+                        self.conversation_log,
+                        f"STEP_{step}_HEDGE",
+                        f"delay={delay:.2f}s hedge_model={hedge.model} result={decision.hedge} "
+                        f"latency={decision.latency:.3f}s",
+                    )
+        except ValueError as exc:
+            self.wire_stats.invalid += 1
+            self.previous_action_error = f"invalid reply: {exc}"
+            append_conversation_log(self.conversation_log, f"STEP_{step}_INVALID_REPLY", str(exc))
+            print(f"[step {step}] invalid model reply: {exc}", file=sys.stderr)
+            return None
+        self.wire_stats.record(decision.usage, decision.ttft)
+        return decision
+
+    def trace_decision(self, step: int, started: float, decision: Decision, model: str) -> None:
+        tracer = self.tracer
+        end = started + decision.latency
+        tracer.record("llm", step, started, end, model=model, early=decision.action_sent_early)
+        if decision.ttft is not None:
+            tracer.record("llm_ttft", step, started, started + decision.ttft)
+        if decision.action_latency is not None:
+            tracer.record("llm_action", step, started, started + decision.action_latency)
+        tracer.record("parse", step, end - decision.parse_time, end)
+        if self.recorder is not None:
+            self.recorder.record(
+                "llm",
+                step,
+                {"model": model, "text": decision.raw_text, "latency": round(decision.latency, 4), "usage": decision.usage},
+            )
+
+    def add_usage(self, usage: Dict[str, int]) -> None:
+        for key, value in usage.items():
+            self.usage_totals[key] = self.usage_totals.get(key, 0) + value
+
+    # -- act -----------------------------------------------------------------
+
+    def _traced_act(self, action_body: Dict[str, Any]) -> Dict[str, Any]:
+        with self.tracer.span("input", None, action=action_body.get("type")):
+            return self.api.act(action_body)
+
+    def send_action(self, step: int, action_body: Dict[str, Any], decided_obs: Dict[str, Any]) -> None:
+        """Send one action: handed to the dispatcher in --pipeline mode, inline otherwise."""
+        self.input_sent_at = time.monotonic()
+        if self.poller is not None and self.dispatcher is not None:
+            # Re-check against the freshest snapshot, then fire without waiting.
+            fresh = self.poller.latest(timeout=0)
+            skip_reason = stale_action_reason(decided_obs, fresh.obs)
+            if skip_reason:
+                self.pipeline_stats.skipped_actions += 1
+                self.previous_action_error = f"action not sent: {skip_reason}"
+                append_conversation_log(self.conversation_log, f"STEP_{step}_ACT_SKIPPED", skip_reason)
+                print(f"[step {step}] action skipped: {skip_reason}")
+            else:
+                self.dispatcher.submit(step, action_body)
+            return
+
+        try:
+            with self.tracer.span("input", step, action=action_body.get("type")):
+                act_result = self.api.act(action_body)
+        except Exception as e:
+            self.log_act_outcomes([ActOutcome(step=step, action=action_body, error=str(e))])
+        else:
+            self.log_act_outcomes([ActOutcome(step=step, action=action_body, result=act_result)])
+
+    def log_act_outcomes(self, outcomes: List[ActOutcome]) -> None:
+        for outcome in outcomes:
+            if self.recorder is not None:
+                self.recorder.record(
+                    "act",
+                    outcome.step,
+                    {"action": outcome.action, "result": outcome.result, "error": outcome.error},
+                )
+            if outcome.error is None:
+                self.previous_action_error = None
+                append_conversation_log(
+                    self.conversation_log,
+                    f"STEP_{outcome.step}_ACT_RESULT",
+                    json.dumps(outcome.result, indent=2, ensure_ascii=True),
+                )
+            else:
+                self.previous_action_error = outcome.error
+                append_conversation_log(self.conversation_log, f"STEP_{outcome.step}_ACT_ERROR", outcome.error)
+                print(f"act_error={outcome.error}", file=sys.stderr)
+
+    def wait_tick(self, step: int) -> None:
+        with self.tracer.span("wait", step):
+            if self.ticker is not None:
+                self.ticker.wait()
+            else:
+                time.sleep(self.args.sleep)
+
+    def close(self) -> None:
+        """Stop the pipeline threads and report the loop's stats."""
+        if self.dispatcher is not None:
+            self.log_act_outcomes(self.dispatcher.close())
+        if self.poller is not None:
+            self.poller.stop()
+        log = self.conversation_log
+        print(f"Pipeline stats: {self.pipeline_stats.summary()}")
+        append_conversation_log(log, "PIPELINE_STATS", self.pipeline_stats.summary())
+        if self.decision_cache is not None:
+            print(f"Decision cache: {self.decision_cache.stats.summary()}")
+            append_conversation_log(log, "DECISION_CACHE", self.decision_cache.stats.summary())
+        if self.compressor is not None:
+            print(f"Observation compression: {self.compressor.stats.summary()}")
+            append_conversation_log(log, "COMPRESSION_STATS", self.compressor.stats.summary())
+        print(f"Wire format: {self.wire_stats.summary()}")
+        append_conversation_log(log, "WIRE_FORMAT_STATS", self.wire_stats.summary())
+        print(f"LLM usage: {self.plan_stats.summary()}")
+        append_conversation_log(log, "PLAN_STATS", self.plan_stats.summary())
+        if self.router is not None:
+            print(f"Router: {self.router.summary()}")
+            append_conversation_log(log, "ROUTER_STATS", self.router.summary())
+        if self.hedger is not None:
+            print(f"Hedging: {self.hedger.stats.summary()}")
+            append_conversation_log(log, "HEDGE_STATS", self.hedger.stats.summary())
+        if self.request_to_input:
+            mean_rti = sum(self.request_to_input) / len(self.request_to_input)
+            mode = "streamed" if self.args.stream else "blocking"
+            print(f"Request->input latency ({mode}): mean {mean_rti:.2f}s over {len(self.request_to_input)} calls")
+            append_conversation_log(log, "REQUEST_TO_INPUT", f"mode={mode} mean={mean_rti:.3f}s n={len(self.request_to_input)}")
+        print(f"Token usage: {format_usage(self.usage_totals)}")
+        append_conversation_log(log, "USAGE_TOTAL", format_usage(self.usage_totals))
+        if self.ticks is not None:
+            print(f"Observe ticks: {self.ticks.summary()}")
+            append_conversation_log(log, "TICK_STATS", self.ticks.summary())
+
+
 def run(args: argparse.Namespace) -> int:
     script_path = Path(__file__).resolve()
     repo_env = script_path.parents[2] / ".env"
@@ -536,30 +1529,59 @@ def run(args: argparse.Namespace) -> int:
         print("Missing ANTHROPIC_OAUTH_TOKEN or ANTHROPIC_API_KEY", file=sys.stderr)
         return 2
 
-    api = ClawbloxClient(api_base=args.api_base, join_name=args.name)
+    transport = KeepAliveTransport(
+        connect_timeout=args.http_connect_timeout,
+        read_timeout=args.http_timeout,
+        # Pipelined mode polls and acts concurrently; keep /input off the observe connection.
+        max_connections_per_host=2 if args.pipeline else 1,
+    )
+    limiter = RateLimiter() if args.rate_limit else None
+    api = ClawbloxClient(api_base=args.api_base, join_name=args.name, transport=transport, limiter=limiter)
     audio_streamer: Optional[AgentAudioStreamer] = None
 
     claude: Optional[Anthropic]
     auth_mode: str
+    anthropic_session: Optional[AnthropicSession] = None
+    warmup_note = "skipped"
     if is_anthropic_setup_token(anthropic_token):
         claude = None
         auth_mode = "setup-token (oauth)"
+        anthropic_session = shared_session()
+        if args.anthropic_warmup:
+            health = anthropic_session.warmup()
+            warmup_note = f"{'ok' if health.ok else 'failed'} in {health.latency * 1000:.0f}ms ({health.detail})"
     else:
-        claude = Anthropic(api_key=anthropic_token)
+        sdk_client = sdk_http_client()
+        claude = Anthropic(api_key=anthropic_token, http_client=sdk_client)
         auth_mode = "api-key"
+        if args.anthropic_warmup:
+            health = warm_sdk_client(sdk_client)
+            warmup_note = f"{'ok' if health.ok else 'failed'} in {health.latency * 1000:.0f}ms ({health.detail})"
 
     log_path = Path(args.conversation_log).expanduser().resolve()
-    log_path.write_text("", encoding="utf-8")
+    jsonl_path = log_path.with_suffix(".jsonl") if args.log_jsonl else None
+    conversation_log = ConversationLogWriter(
+        log_path,
+        jsonl_path=jsonl_path,
+        max_bytes=int(args.log_max_mb * 1024 * 1024),
+        backups=args.log_backups,
+        compress=args.log_compress,
+    )
 
     web_base = api.api_base.rstrip("/")
     print("Selected game: local runtime")
     print(f"Live URL: {web_base}/")
     print(f"Browse URL: {web_base}/browse")
     print(f"Anthropic auth mode: {auth_mode}")
+    print(f"Anthropic connection warmup: {warmup_note}")
 
     if args.audio:
         try:
-            audio_streamer = AgentAudioStreamer(AudioConfig.from_env())
+            audio_config = AudioConfig.from_env()
+            if args.audio_output:
+                audio_config.output = args.audio_output
+            audio_config.output_path = args.audio_output_file
+            audio_streamer = AgentAudioStreamer(audio_config, cache=shared_cache() if args.tts_cache else None)
             audio_streamer.start()
             print("Audio: enabled")
         except Exception as exc:
@@ -571,95 +1593,126 @@ def run(args: argparse.Namespace) -> int:
     if skill_md.lstrip().lower().startswith("<!doctype html") or "<html" in skill_md[:300].lower():
         raise ClawbloxAPIError("No valid skill.md found: received HTML from /skill.md")
 
-    append_conversation_log(log_path, "RUN_START", f"game=local model={args.model}")
-    append_conversation_log(log_path, "ANTHROPIC_AUTH_MODE", auth_mode)
-    append_conversation_log(log_path, "SKILL_SOURCE", f"api:{api.api_base}/skill.md")
-    append_conversation_log(log_path, "SKILL_MD", skill_md)
-    append_conversation_log(log_path, "SYSTEM_PROMPT", SYSTEM_PROMPT)
+    append_conversation_log(conversation_log, "RUN_START", f"game=local model={args.model}")
+    append_conversation_log(conversation_log, "ANTHROPIC_AUTH_MODE", auth_mode)
+    append_conversation_log(conversation_log, "ANTHROPIC_WARMUP", warmup_note)
+    append_conversation_log(conversation_log, "SKILL_SOURCE", f"api:{api.api_base}/skill.md")
+    append_conversation_log(conversation_log, "SKILL_MD", skill_md)
+    system_prompt = SYSTEM_PROMPT
+    if args.plans:
+        system_prompt = f"{SYSTEM_PROMPT}\n\n{PLAN_PROMPT_ADDENDUM}"
+    if args.wire_format == "table":
+        system_prompt = f"{system_prompt}\n\n{TABLE_PROMPT_ADDENDUM}"
+    router: Optional[DecisionRouter] = None
+    if args.fast_model:
+        router = DecisionRouter(
+            fast_model=args.fast_model,
+            slow_model=args.model,
+            triggers=parse_triggers(args.escalate_on),
+            min_confidence=args.min_confidence,
+        )
+        if "low_confidence" in router.triggers:
+            system_prompt = f"{system_prompt}\n\n{CONFIDENCE_PROMPT_ADDENDUM}"
+        print(f"Router: fast={args.fast_model} slow={args.model} escalate_on={','.join(sorted(router.triggers))}")
+    hedger: Optional[Hedger] = None
+    if args.hedge:
+        hedger = Hedger(
+            hedge_model=args.hedge_model,
+            percentile=args.hedge_percentile,
+            max_rate=args.hedge_max_rate,
+            max_tokens=args.hedge_max_tokens,
+        )
+        print(f"Hedging: p{args.hedge_percentile * 100:.0f} delay, model={args.hedge_model or 'same'}, max rate {args.hedge_max_rate:.0%}")
+    append_conversation_log(conversation_log, "SYSTEM_PROMPT", system_prompt)
 
-    api.join()
+    join_payload = api.join()
     print("Joined game")
 
-    previous_action_error: Optional[str] = None
-    previous_obs: Optional[Dict[str, Any]] = None
-    try:
-        for step in range(args.max_steps):
-            obs = api.observe()
-            status = str(obs.get("game_status", "")).lower()
-
-            if args.verbose:
-                print(f"step={step} status={status}")
-
-            if status and status not in {"active", "running", "in_progress"}:
-                print(f"Game ended with status: {status}")
-                append_conversation_log(log_path, "GAME_STATUS", status)
-                break
-
-            if previous_obs is None:
-                user_payload = {
-                    "observation": clean_observation(obs),
-                    "last_action_error": previous_action_error,
-                    "instruction": "Return only the JSON object now.",
-                }
-            else:
-                diff = diff_observations(previous_obs, obs)
-                user_payload = {
-                    "state_changes": diff,
-                    "last_action_error": previous_action_error,
-                    "instruction": "Return only the JSON object now.",
-                }
-            previous_obs = obs
-            append_conversation_log(
-                log_path,
-                f"STEP_{step}_USER_OBSERVATION",
-                json.dumps(user_payload, indent=2, ensure_ascii=True),
-            )
-
-            if args.breakpoint_before_llm:
-                review_observation_before_llm(step, log_path)
-
-            action_body, raw_text, reason = decide_action(
-                claude=claude,
-                anthropic_token=anthropic_token,
-                model=args.model,
-                system_prompt=SYSTEM_PROMPT,
-                skill_md=skill_md,
-                user_payload=user_payload,
-            )
-
-            print(f"\n[step {step}] Model response:")
-            print(raw_text)
-            print(f"[step {step}] Extracted action:")
-            print(json.dumps(action_body, indent=2, ensure_ascii=True))
-
-            append_conversation_log(log_path, f"STEP_{step}_ASSISTANT_RAW", raw_text)
-            append_conversation_log(
-                log_path,
-                f"STEP_{step}_ASSISTANT_ACTION",
-                json.dumps(action_body, indent=2, ensure_ascii=True),
+    world_map: Optional[WorldMap] = None
+    if args.map:
+        try:
+            # Key by game, not just host: one local server can run different games over time.
+            game_id = (
+                args.game_id
+                or join_payload.get("game_id")
+                or hashlib.sha256(skill_md.encode("utf-8")).hexdigest()[:16]
             )
-            if reason:
-                append_conversation_log(log_path, f"STEP_{step}_ASSISTANT_REASON", reason)
-                if audio_streamer:
-                    audio_streamer.enqueue_text(reason)
-
-            try:
-                act_result = api.act(action_body)
-                previous_action_error = None
-                append_conversation_log(
-                    log_path,
-                    f"STEP_{step}_ACT_RESULT",
-                    json.dumps(act_result, indent=2, ensure_ascii=True),
-                )
-            except Exception as e:
-                previous_action_error = str(e)
-                append_conversation_log(log_path, f"STEP_{step}_ACT_ERROR", previous_action_error)
-                print(f"act_error={previous_action_error}", file=sys.stderr)
-
-            time.sleep(args.sleep)
+            loaded = load_map(f"{api.api_base}/{game_id}", api.get_map, cache_dir=Path(args.map_cache_dir).expanduser())
+        except (ClawbloxAPIError, ValueError) as exc:
+            print(f"Map: unavailable ({exc})", file=sys.stderr)
+        else:
+            world_map = loaded.world_map
+            map_note = f"{len(world_map)} static parts ({loaded.source}, {loaded.seconds * 1000:.0f}ms) {loaded.path}"
+            print(f"Map: {map_note}")
+            append_conversation_log(conversation_log, "MAP", map_note)
+    compressor: Optional[RelevanceCompressor] = None
+    if args.top_k > 0:
+        compressor = RelevanceCompressor(top_k=args.top_k, radius=args.relevance_radius, skill_md=skill_md)
+        print(f"Relevance compression: top {args.top_k} entities within {args.relevance_radius:g} studs")
+    decision_cache: Optional[DecisionCache] = None
+    if args.decision_cache != "off":
+        decision_cache = DecisionCache(
+            ttl=args.cache_ttl,
+            max_reuse=args.cache_max_reuse,
+            noop_action=json.loads(args.cache_noop_action) if args.cache_noop_action else None,
+        )
+    tracer = Tracer(
+        trace_path=Path(args.trace) if args.trace else None,
+        window=args.trace_window,
+        prometheus_path=Path(args.prometheus_textfile) if args.prometheus_textfile else None,
+    )
+    tracer.install_signal_handler()
+    recorder: Optional[TraceRecorder] = None
+    if args.record:
+        recorder = TraceRecorder(
+            Path(args.record).expanduser(),
+            meta={"model": args.model, "fast_model": args.fast_model, "api_base": api.api_base},
+        )
+        print(f"Recording trace: {recorder.path}")
+
+    loop = AgentLoop(
+        args,
+        api,
+        claude,
+        anthropic_token,
+        system_prompt,
+        skill_md,
+        conversation_log,
+        tracer,
+        audio_streamer=audio_streamer,
+        router=router,
+        hedger=hedger,
+        decision_cache=decision_cache,
+        compressor=compressor,
+        world_map=world_map,
+        ticks=TickTracker() if args.tick_dedupe else None,
+        recorder=recorder,
+    )
+    try:
+        loop.start()
+        loop.run()
     finally:
+        loop.close()
         if audio_streamer:
             audio_streamer.close()
+        print(f"HTTP transport: {transport.stats.summary()}")
+        if limiter is not None:
+            print(f"Rate limiter: {limiter.stats.summary()}")
+            append_conversation_log(conversation_log, "RATE_LIMITER", limiter.stats.summary())
+        append_conversation_log(conversation_log, "HTTP_TRANSPORT", transport.stats.summary())
+        transport.close()
+        if anthropic_session is not None:
+            print(f"Anthropic HTTPS: {anthropic_session.stats.summary()}")
+            append_conversation_log(conversation_log, "ANTHROPIC_HTTPS", anthropic_session.stats.summary())
+            anthropic_session.close()
+        tracer.print_summary()
+        append_conversation_log(conversation_log, "STAGE_LATENCY", "\n".join(tracer.summary_lines()))
+        tracer.close()
+        if recorder is not None:
+            recorder.close()
+            print(f"Recorded {recorder.records} trace records to {recorder.path}")
+        conversation_log.close()
+        print(f"Conversation log: {conversation_log.stats.summary()}")
 
     return 0
 
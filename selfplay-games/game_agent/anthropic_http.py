@@ -0,0 +1,347 @@
+"""Long-lived HTTPS connections to the Anthropic API.
+
+The setup-token (oauth) path talks to /v1/messages directly; opening a new
+urllib connection per call costs a TCP + TLS handshake every decision.
+`AnthropicSession` keeps connections open between calls and resumes the TLS
+session when a connection does have to be reopened. `sdk_http_client()`
+builds the matching shared client for the SDK (api-key) path.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import http.client
+import importlib.util
+import queue
+import select
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from hedging import CancelToken, HedgeCancelled
+from transport import _RETRY_AFTER_SEND, _STALE_CONNECTION_ERRORS
+
+ANTHROPIC_API_BASE = "https://api.anthropic.com"
+
+
+def http2_available() -> bool:
+    """True if httpx can negotiate HTTP/2 (the optional `h2` package is installed)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class SessionStats:
+    connections_opened: int = 0
+    tls_resumed: int = 0
+    requests_served: int = 0
+    stale_retries: int = 0
+    connect_seconds: float = 0.0
+
+    def summary(self) -> str:
+        if not self.connections_opened:
+            return "no connections"
+        mean_ms = self.connect_seconds / self.connections_opened * 1000
+        return (
+            f"{self.requests_served} requests over {self.connections_opened} connections "
+            f"(tls resumed {self.tls_resumed}, connect mean {mean_ms:.0f}ms, "
+            f"stale retries {self.stale_retries})"
+        )
+
+
+@dataclass
+class HealthStatus:
+    ok: bool
+    latency: float
+    detail: str
+
+
+class _ResumingHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that offers the last TLS session when it (re)connects."""
+
+    def __init__(self, session: "AnthropicSession", host: str, port: int, timeout: float):
+        super().__init__(host, port, timeout=timeout, context=session.ssl_context)
+        self._owner = session
+
+    def connect(self) -> None:
+        http.client.HTTPConnection.connect(self)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = self._owner.ssl_context.wrap_socket(
+            self.sock, server_hostname=self.host, session=self._owner.tls_session
+        )
+
+
+def _abort(conn: _ResumingHTTPSConnection) -> None:
+    """Shut down a connection's socket from another thread so a blocked read fails now."""
+    sock = conn.sock
+    if sock is None:
+        return
+    try:
+        # The plain-socket shutdown, not SSLSocket.shutdown, which also
+        # unwraps the TLS object under the reading thread.
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class AnthropicSession:
+    """Thread-safe keep-alive HTTPS pool for one API host (HTTP/1.1).
+
+    - One SSLContext for all connections: CA certificates are loaded once,
+      not per request as with urllib's default context.
+    - Idle connections are reused; before reuse an idle socket is probed
+      and dropped if the server already closed it.
+    - The TLS session from the last connection is offered on reconnect, so a
+      reconnect is an abbreviated handshake when the server supports resumption.
+    - `warmup()` opens a connection ahead of the first real call;
+      `health_check()` times a cheap round trip on a pooled connection.
+    """
+
+    def __init__(
+        self,
+        base_url: str = ANTHROPIC_API_BASE,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 120.0,
+        max_connections: int = 2,
+    ) -> None:
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = parsed.hostname or "api.anthropic.com"
+        self.port = parsed.port or 443
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.ssl_context = ssl.create_default_context()
+        self.tls_session: Optional[ssl.SSLSession] = None
+        self.stats = SessionStats()
+        self._idle: "queue.LifoQueue[_ResumingHTTPSConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, max_connections))
+        self._lock = threading.Lock()
+
+    def _open(self) -> _ResumingHTTPSConnection:
+        conn = _ResumingHTTPSConnection(self, self.host, self.port, self.connect_timeout)
+        started = time.perf_counter()
+        try:
+            conn.connect()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise RuntimeError(f"Anthropic network error: {e}") from e
+        conn.sock.settimeout(self.read_timeout)
+        with self._lock:
+            self.stats.connections_opened += 1
+            self.stats.connect_seconds += time.perf_counter() - started
+            if getattr(conn.sock, "session_reused", False):
+                self.stats.tls_resumed += 1
+        return conn
+
+    @staticmethod
+    def _idle_socket_alive(conn: _ResumingHTTPSConnection) -> bool:
+        # An idle keep-alive socket should have nothing to read; readable
+        # means EOF or a close_notify from the server.
+        if conn.sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def _checkout(self) -> Tuple[_ResumingHTTPSConnection, bool]:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open(), False
+            if self._idle_socket_alive(conn):
+                return conn, True
+            conn.close()
+
+    def _checkin(self, conn: _ResumingHTTPSConnection, resp: http.client.HTTPResponse) -> None:
+        with self._lock:
+            self.stats.requests_served += 1
+        if conn.sock is not None:
+            # TLS 1.3 tickets arrive after the handshake, so grab the session
+            # once a response has been read rather than right after connect.
+            session = getattr(conn.sock, "session", None)
+            if session is not None:
+                self.tls_session = session
+        if resp.will_close:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+        timeout: Optional[float],
+        cancel: Optional[CancelToken] = None,
+    ) -> Tuple[_ResumingHTTPSConnection, http.client.HTTPResponse, Callable[[], None]]:
+        """Send on a pooled connection; also returns the unregister function for `cancel`."""
+        current: List[_ResumingHTTPSConnection] = []
+        unregister = cancel.register(lambda: _abort(current[-1]) if current else None) if cancel else lambda: None
+        conn, reused = self._checkout()
+        while True:
+            current.append(conn)
+            if cancel is not None and cancel.is_set():
+                unregister()
+                conn.close()
+                raise HedgeCancelled()
+            sent = False
+            try:
+                conn.sock.settimeout(timeout if timeout is not None else self.read_timeout)
+                conn.request(method, path, body=body, headers=headers)
+                sent = True
+                return conn, conn.getresponse(), unregister
+            except _STALE_CONNECTION_ERRORS as e:
+                conn.close()
+                if cancel is not None and cancel.is_set():
+                    unregister()
+                    raise HedgeCancelled() from e
+                # Once a POST is fully sent the server may already be running
+                # (and billing) it; only a request that never left is resent.
+                if not reused or (sent and method.upper() not in _RETRY_AFTER_SEND):
+                    unregister()
+                    raise RuntimeError(f"Anthropic network error: {e}") from e
+                with self._lock:
+                    self.stats.stale_retries += 1
+                conn, reused = self._open(), False
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                unregister()
+                if cancel is not None and cancel.is_set():
+                    raise HedgeCancelled() from e
+                raise RuntimeError(f"Anthropic network error: {e}") from e
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Tuple[int, bytes]:
+        """Send a request and read the whole response body.
+
+        Setting `cancel` shuts the socket down, failing a blocked read with
+        HedgeCancelled.
+        """
+        with self._slots:
+            conn, resp, unregister = self._send(method, path, body, headers or {}, timeout, cancel)
+            try:
+                payload = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if cancel is not None and cancel.is_set():
+                    raise HedgeCancelled() from e
+                raise RuntimeError(f"Anthropic network error: {e}") from e
+            finally:
+                unregister()
+            if cancel is not None and cancel.is_set():
+                conn.close()
+                raise HedgeCancelled()
+            self._checkin(conn, resp)
+            return resp.status, payload
+
+    @contextlib.contextmanager
+    def stream(
+        self,
+        path: str,
+        body: bytes,
+        headers: Dict[str, str],
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Iterator[Iterator[bytes]]:
+        """POST and yield the response as raw lines (for SSE).
+
+        Raises RuntimeError on a non-2xx status. If the caller reads to the
+        end of the stream the connection goes back to the pool; if it stops
+        early (interrupt, error) the connection is closed instead. Setting
+        `cancel` shuts the socket down, so even a read still waiting for
+        the first byte fails at once with HedgeCancelled.
+        """
+        with self._slots:
+            conn, resp, unregister = self._send("POST", path, body, headers, timeout, cancel)
+            try:
+                if resp.status >= 300:
+                    err_body = resp.read().decode("utf-8", errors="replace")
+                    self._checkin(conn, resp)
+                    raise RuntimeError(f"Anthropic HTTP {resp.status}: {err_body}")
+                try:
+                    yield iter(resp.readline, b"")
+                    # Drain the SSE trailer (blank line + final chunk) so the
+                    # connection is reusable.
+                    resp.read()
+                except BaseException as e:
+                    conn.close()
+                    if cancel is not None and cancel.is_set() and not isinstance(e, (HedgeCancelled, GeneratorExit)):
+                        raise HedgeCancelled() from e
+                    raise
+            finally:
+                unregister()
+            if cancel is not None and cancel.is_set():
+                # The shut-down socket reads as EOF, which looks like the end of the stream.
+                conn.close()
+                raise HedgeCancelled()
+            self._checkin(conn, resp)
+
+    def warmup(self) -> HealthStatus:
+        """Open a pooled connection now so the first decision skips the handshake."""
+        return self.health_check()
+
+    def health_check(self) -> HealthStatus:
+        """Time a HEAD round trip; any HTTP status counts as a live connection."""
+        started = time.perf_counter()
+        try:
+            status, _ = self.request("HEAD", "/", timeout=self.connect_timeout)
+        except RuntimeError as e:
+            return HealthStatus(False, time.perf_counter() - started, str(e))
+        return HealthStatus(True, time.perf_counter() - started, f"HTTP {status}")
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_shared_session: Optional[AnthropicSession] = None
+_shared_lock = threading.Lock()
+
+
+def shared_session() -> AnthropicSession:
+    """Process-wide session used by the setup-token helpers by default."""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = AnthropicSession()
+        return _shared_session
+
+
+def sdk_http_client(connect_timeout: float = 10.0, read_timeout: float = 120.0) -> Any:
+    """httpx client for `Anthropic(http_client=...)` with the same connection behaviour.
+
+    Uses the SDK's DefaultHttpxClient (keep-alive pool, SDK defaults), with
+    HTTP/2 when `h2` is installed.
+    """
+    import anthropic
+
+    return anthropic.DefaultHttpxClient(
+        http2=http2_available(),
+        timeout=anthropic.Timeout(read_timeout, connect=connect_timeout),
+    )
+
+
+def warm_sdk_client(http_client: Any, base_url: str = ANTHROPIC_API_BASE) -> HealthStatus:
+    """Open a pooled connection on an SDK httpx client; any HTTP status counts as live."""
+    started = time.perf_counter()
+    try:
+        resp = http_client.head(base_url)
+    except Exception as e:  # httpx transport errors; httpx isn't imported directly here
+        return HealthStatus(False, time.perf_counter() - started, str(e))
+    return HealthStatus(True, time.perf_counter() - started, f"HTTP {resp.status_code} {resp.http_version}")
@@ -3,25 +3,30 @@ from __future__ import annotations
 import json
 import os
 import queue
-import subprocess
 import sys
 import threading
 import time
 import base64
-from dataclasses import dataclass
-from typing import Optional
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Optional, Union
 
 import websockets.sync.client
 
+from audio_frames import FrameDecoder
+from audio_output import AudioSink, open_sink, pcm_sample_rate
+from tts_cache import TtsCache, tts_key
+from tts_pool import TtsEndpoint, TtsSocketPool
 
 ELEVENLABS_MODEL_ID = "eleven_flash_v2_5"
 ELEVENLABS_OUTPUT_FORMAT = "pcm_16000"
 ELEVENLABS_STT_MODEL_ID = "scribe_v2_realtime"
 ELEVENLABS_STT_SAMPLE_RATE = 16000
 
-# Timeout waiting for audio chunks after flush (seconds).
-# If ElevenLabs doesn't send more data within this window, assume utterance is done.
-_RECV_TIMEOUT = 1.0
+# How often the receive thread wakes up to check for stalled contexts (seconds).
+_RECV_POLL = 0.2
+# If ElevenLabs doesn't send more data within this window after a flush,
+# assume the utterance is done.
 _FLUSH_IDLE_TIMEOUT = 2.5
 
 
@@ -31,6 +36,8 @@ class AudioConfig:
     voice_id: str
     model_id: str = ELEVENLABS_MODEL_ID
     output_format: str = ELEVENLABS_OUTPUT_FORMAT
+    output: str = "auto"  # playback backend, see audio_output.AUDIO_OUTPUTS
+    output_path: Optional[str] = None  # WAV file for output="null"
 
     @classmethod
     def from_env(cls) -> "AudioConfig":
@@ -43,41 +50,96 @@ class AudioConfig:
             raise RuntimeError("Missing ELEVENLABS_API_KEY")
         if not voice_id:
             raise RuntimeError("Missing AGENT_VOICE_ID (or AGENT_A_VOICE_ID)")
-        return cls(api_key=api_key, voice_id=voice_id)
+        return cls(
+            api_key=api_key,
+            voice_id=voice_id,
+            output=os.environ.get("AGENT_AUDIO_OUTPUT", "").strip() or "auto",
+        )
+
+
+@dataclass
+class _Context:
+    """One TTS context (utterance) on the shared socket, kept in playback order."""
+
+    context_id: str
+    stats: dict[str, float | int | None]
+    pending: list[bytes] = field(default_factory=list)  # audio that arrived while an earlier context plays
+    flushed_at: Optional[float] = None
+    final: bool = False
+    timed_out: bool = False
+    done: Optional[threading.Event] = None
+    last_msg_at: float = field(default_factory=time.monotonic)
+    text: list[str] = field(default_factory=list)
+    recorded: Optional[list[bytes]] = None  # all audio, kept for the TTS cache
+    local: bool = False  # served from the TTS cache; nothing open on the socket
 
 
 class AgentAudioStreamer:
     """Background audio streamer with persistent ElevenLabs WebSocket.
 
-    Architecture:
-    - One worker thread owns the WebSocket and ffplay subprocess.
-    - start() connects both and blocks until ready.
-    - enqueue_text() is non-blocking; worker processes utterances sequentially.
+    Architecture (full duplex):
+    - The send thread ("agent-audio") owns the queue and the WebSocket
+      lifecycle; it only sends (text, flush, close_context) and never waits
+      for audio, so a burst of text chunks goes out immediately.
+    - The receive thread ("agent-audio-recv") reads the socket continuously
+      and routes audio by context_id: the oldest open context plays straight
+      into the AudioSink, later ones are held until it finishes, so
+      utterances never interleave.
+    - start() connects and blocks until ready.
+    - enqueue_text() is non-blocking; utterances play sequentially. With a
+      TtsCache, a previously synthesized utterance plays from the cache
+      without touching the socket, and finished contexts are stored.
     - The WebSocket persists across utterances (no per-message connect overhead).
-    - On WS failure, reconnects automatically before the next utterance.
+    - Sockets come from a TtsSocketPool, which keeps a warm spare: on WS
+      failure, or when the socket has idled close to the server's timeout,
+      the next utterance swaps to the spare instead of handshaking.
     """
 
-    def __init__(self, config: AudioConfig):
+    def __init__(
+        self,
+        config: AudioConfig,
+        cache: Optional[TtsCache] = None,
+        pool: Optional[TtsSocketPool] = None,
+    ):
         self.config = config
+        self.cache = cache
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else TtsSocketPool(config.api_key)
+        self._endpoint = TtsEndpoint(config.voice_id, config.model_id, config.output_format)
         # Queue items:
         # - str (full utterance)
         # - ("chunk", str)
         # - ("flush", Event)
         # - ("interrupt", Event)
+        # - ("close", context_id)
         # - None (stop)
         self._queue: queue.Queue = queue.Queue()
         self._thread: Optional[threading.Thread] = None
+        self._receiver: Optional[threading.Thread] = None
         self._stop = threading.Event()
         self._ready = threading.Event()
         self._start_error: Optional[str] = None
         self._context_counter = 0
-        self._streaming_ctx: Optional[str] = None
-        self._streaming_stats: Optional[dict[str, float | int | None]] = None
+        self._streaming_ctx: Optional[_Context] = None
         self._speaking = threading.Event()
         self._interrupt_requested = threading.Event()
+        self._sink: Optional[AudioSink] = None
+        self._frames = FrameDecoder()  # used only by the receive thread
+        self._ws: Optional[websockets.sync.client.ClientConnection] = None
+        self._ws_active_at = 0.0  # last send or receive on _ws (monotonic)
+        # Guards _contexts, _ws and appends to _playout. The sink is never
+        # written under it, so an interrupt can clear it mid-write.
+        self._lock = threading.Lock()
+        self._contexts: "OrderedDict[str, _Context]" = OrderedDict()
+        # Audio in playback order, plus the `done` events of retired contexts
+        # (set once the audio before them is written). Drained by
+        # _write_playout under _write_lock, so chunks keep their order whichever
+        # thread queued them.
+        self._playout: Deque[Union[bytes, threading.Event]] = deque()
+        self._write_lock = threading.Lock()
 
     def start(self) -> None:
-        """Start worker thread, block until WS + ffplay are ready."""
+        """Start worker threads, block until WS + audio output are ready."""
         if self._thread is not None:
             return
         self._ready.clear()
@@ -116,9 +178,18 @@ class AgentAudioStreamer:
     def is_speaking(self) -> bool:
         return self._speaking.is_set()
 
+    def buffered_seconds(self) -> float:
+        """Audio written to the output but not yet heard."""
+        sink = self._sink
+        return sink.buffered_seconds() if sink is not None else 0.0
+
     def interrupt(self) -> None:
         """Abort current/pending streaming audio for the active turn."""
         self._interrupt_requested.set()
+        sink = self._sink
+        if sink is not None and sink.instant_clear:
+            # Silence now; the worker clears again once it has stopped the context.
+            sink.clear()
         done = threading.Event()
         self._queue.put(("interrupt", done))
         done.wait(timeout=2)
@@ -135,81 +206,66 @@ class AgentAudioStreamer:
         self._context_counter += 1
         return f"ctx_{self._context_counter}"
 
-    def _ws_uri(self) -> str:
-        return (
-            f"wss://api.elevenlabs.io/v1/text-to-speech/{self.config.voice_id}"
-            f"/multi-stream-input"
-            f"?model_id={self.config.model_id}&output_format={self.config.output_format}"
-        )
-
     def _connect_ws(self) -> websockets.sync.client.ClientConnection:
         t0 = time.monotonic()
-        ws = websockets.sync.client.connect(
-            self._ws_uri(),
-            additional_headers={"xi-api-key": self.config.api_key},
-            max_size=16 * 1024 * 1024,
-            open_timeout=15,
-            close_timeout=3,
-        )
-        print(f"[audio] ws connected in {time.monotonic() - t0:.2f}s")
+        warm = self.pool.stats.warm
+        ws = self.pool.acquire(self._endpoint)
+        how = "warm spare" if self.pool.stats.warm > warm else "connected"
+        print(f"[audio] ws {how} in {time.monotonic() - t0:.2f}s")
+        self._ws_active_at = time.monotonic()
         return ws
 
-    def _start_ffplay(self) -> subprocess.Popen:
-        cmd = [
-            "ffplay",
-            "-hide_banner", "-loglevel", "error",
-            "-autoexit", "-nodisp",
-            "-probesize", "32",
-            "-analyzeduration", "0",
-            "-fflags", "nobuffer",
-            "-flags", "low_delay",
-            "-f", "s16le", "-ar", "16000", "-ac", "1",
-            "-i", "pipe:0",
-        ]
-        return subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            bufsize=0,
-        )
-
-    def _restart_ffplay(self, ffplay: subprocess.Popen) -> subprocess.Popen:
-        """Stop current playback immediately and start a fresh ffplay process."""
+    def _refresh_idle_ws(self) -> None:
+        """Swap an idle socket that is close to the server's timeout for a fresh spare."""
+        with self._lock:
+            ws = self._ws
+            if ws is None or self._contexts or not self.pool.is_stale(self._ws_active_at):
+                return
         try:
-            if ffplay.stdin:
-                ffplay.stdin.close()
-        except Exception:
-            pass
-        try:
-            ffplay.kill()
-        except Exception:
-            pass
-        try:
-            ffplay.wait(timeout=1)
-        except Exception:
-            pass
-        return self._start_ffplay()
+            fresh = self._connect_ws()
+        except Exception as exc:
+            print(f"[audio] ws refresh failed: {exc}")
+            return
+        with self._lock:
+            if self._ws is not ws:
+                # Dropped in the meantime; the send loop takes over from here.
+                self.pool.discard(fresh)
+                return
+            self._ws = fresh
+        # The receive thread's recv on the old socket fails and sees it is no longer current.
+        self.pool.discard(ws)
+
+    # -- send thread ---------------------------------------------------------
 
     def _run(self) -> None:
-        # Start ffplay
         try:
-            ffplay = self._start_ffplay()
+            sink = open_sink(
+                self.config.output,
+                pcm_sample_rate(self.config.output_format),
+                path=self.config.output_path,
+            )
         except Exception as exc:
-            self._start_error = f"unable to start ffplay: {exc}"
+            self._start_error = f"unable to open audio output: {exc}"
             self._ready.set()
             return
+        self._sink = sink
+        print(f"[audio] output: {sink.name}")
 
         # Connect WebSocket
-        ws: Optional[websockets.sync.client.ClientConnection] = None
         try:
-            ws = self._connect_ws()
+            self._ws = self._connect_ws()
         except Exception as exc:
             self._start_error = f"unable to connect ElevenLabs WS: {exc}"
             self._ready.set()
-            ffplay.kill()
+            sink.close()
+            self._sink = None
+            if self._owns_pool:
+                self.pool.close()
             return
 
+        self._receiver = threading.Thread(target=self._receive_loop, daemon=True, name="agent-audio-recv")
+        self._receiver.start()
+
         # Signal ready
         print("[audio] ready")
         self._ready.set()
@@ -224,51 +280,19 @@ class AgentAudioStreamer:
                     break
 
                 if isinstance(item, tuple) and item[0] == "interrupt":
-                    ctx = self._streaming_ctx
-                    if ws is not None and ctx:
-                        try:
-                            ws.send(json.dumps({
-                                "context_id": ctx,
-                                "close_context": True,
-                            }))
-                        except Exception as exc:
-                            print(f"[audio] close_context error: {exc}")
-                    try:
-                        if ws is not None:
-                            self._drain_audio(
-                                context_id=ctx or "",
-                                ws=ws,
-                                ffplay=ffplay,
-                                stats=self._new_audio_stats(),
-                                timeout=0.01,
-                                stop_on_final=False,
-                            )
-                    except Exception:
-                        pass
-                    try:
-                        ffplay = self._restart_ffplay(ffplay)
-                    except Exception as exc:
-                        print(f"[audio] ffplay restart error: {exc}")
-                    self._streaming_ctx = None
-                    self._streaming_stats = None
-                    item[1].set()
-
-                    # Drop queued text/flush items from the canceled turn.
-                    while True:
-                        try:
-                            pending = self._queue.get_nowait()
-                        except queue.Empty:
-                            break
-                        if pending is None:
-                            self._queue.put(None)
-                            break
-                        if isinstance(pending, tuple) and pending[0] in ("flush", "interrupt"):
-                            pending[1].set()
-                    self._speaking.clear()
-                    self._interrupt_requested.clear()
+                    self._handle_interrupt(item[1])
+                    continue
+
+                if self._interrupt_requested.is_set():
+                    # Queued ahead of a pending interrupt: don't send text for a canceled turn.
+                    if isinstance(item, tuple) and item[0] == "flush":
+                        item[1].set()
                     continue
 
                 # Ensure WS is alive; reconnect if needed
+                if self._streaming_ctx is None:
+                    self._refresh_idle_ws()
+                ws = self._ws
                 if ws is None:
                     try:
                         ws = self._connect_ws()
@@ -277,218 +301,292 @@ class AgentAudioStreamer:
                         if isinstance(item, tuple) and item[0] == "flush":
                             item[1].set()
                         continue
+                    with self._lock:
+                        self._ws = ws
 
-                # Streaming chunk: send text to WS immediately
-                if isinstance(item, tuple) and item[0] == "chunk":
-                    if self._streaming_ctx is None:
-                        self._streaming_ctx = self._next_context_id()
-                        self._streaming_stats = self._new_audio_stats()
-                        self._interrupt_requested.clear()
-                        self._speaking.set()
-                    try:
-                        ws.send(json.dumps({
-                            "context_id": self._streaming_ctx,
-                            "text": item[1],
-                        }))
-                        if self._streaming_stats is not None:
-                            self._drain_audio(
-                                context_id=self._streaming_ctx,
-                                ws=ws,
-                                ffplay=ffplay,
-                                stats=self._streaming_stats,
-                                timeout=0.01,
-                                stop_on_final=False,
-                            )
-                    except Exception as exc:
-                        print(f"[audio] chunk send error: {exc}")
-                        try:
-                            ws.close()
-                        except Exception:
-                            pass
-                        ws = None
-                        self._streaming_ctx = None
-                        self._streaming_stats = None
-                        self._speaking.clear()
-                    continue
-
-                # Streaming flush: send flush, receive audio, signal done
-                if isinstance(item, tuple) and item[0] == "flush":
-                    ctx = self._streaming_ctx
-                    stats = self._streaming_stats
+                try:
+                    self._send_item(ws, item)
+                    self._ws_active_at = time.monotonic()
+                except Exception as exc:
+                    print(f"[audio] send error: {exc}, will reconnect")
                     self._streaming_ctx = None
-                    self._streaming_stats = None
-                    if ctx:
-                        if stats is None:
-                            stats = self._new_audio_stats()
-                        try:
-                            t0 = time.monotonic()
-                            ws.send(json.dumps({
-                                "context_id": ctx, "flush": True,
-                            }))
-                            finished = self._drain_audio(
-                                context_id=ctx,
-                                ws=ws,
-                                ffplay=ffplay,
-                                stats=stats,
-                                timeout=_RECV_TIMEOUT,
-                                stop_on_final=True,
-                            )
-                            if not self._interrupt_requested.is_set() and not finished and int(stats["msg_count"]) == 0:
-                                print("[audio] flush warning: no final marker before timeout")
-                            self._print_audio_stats(stats)
-                            print(f"[audio] stream done in "
-                                  f"{time.monotonic() - t0:.2f}s")
-                            try:
-                                ws.send(json.dumps({
-                                    "context_id": ctx,
-                                    "close_context": True,
-                                }))
-                            except Exception:
-                                pass
-                        except Exception as exc:
-                            print(f"[audio] flush error: {exc}")
-                            try:
-                                ws.close()
-                            except Exception:
-                                pass
-                            ws = None
-                        finally:
-                            self._speaking.clear()
-                            self._interrupt_requested.clear()
-                    item[1].set()
-                    continue
-
-                # Full utterance (non-streaming path)
-                if isinstance(item, str):
-                    print(f"[audio] dequeue ({len(item)} chars)")
-                    t0 = time.monotonic()
-                    self._interrupt_requested.clear()
-                    self._speaking.set()
-                    try:
-                        self._stream_utterance(item, ws, ffplay)
-                    except Exception as exc:
-                        if not self._interrupt_requested.is_set():
-                            print(f"[audio] stream error: {exc}, will reconnect")
-                        try:
-                            ws.close()
-                        except Exception:
-                            pass
-                        ws = None
-                        continue
-                    finally:
-                        self._speaking.clear()
-                        self._interrupt_requested.clear()
-                    print(f"[audio] done in {time.monotonic() - t0:.2f}s")
-
+                    self._drop_connection(ws)
         finally:
+            self._stop.set()
+            with self._lock:
+                ws, self._ws = self._ws, None
             if ws is not None:
-                try:
-                    ws.close()
-                except Exception:
-                    pass
-            self._speaking.clear()
-            if ffplay.stdin:
-                ffplay.stdin.close()
-            try:
-                ffplay.wait(timeout=2)
-            except Exception:
-                ffplay.kill()
+                self.pool.discard(ws)
+            if self._receiver is not None:
+                self._receiver.join(timeout=2)
+            self._fail_contexts()
+            print(f"[audio] {sink.summary()}")
+            if self.cache is not None:
+                print(f"[audio] tts cache: {self.cache.stats.summary()}")
+            print(f"[audio] tts sockets: {self.pool.stats.summary()}")
+            if self._owns_pool:
+                self.pool.close()
+            sink.close(drain_timeout=2)
+            self._sink = None
+
+    def _send_item(self, ws: websockets.sync.client.ClientConnection, item: object) -> None:
+        # Streaming chunk: send text to WS immediately
+        if isinstance(item, tuple) and item[0] == "chunk":
+            if self._streaming_ctx is None:
+                self._streaming_ctx = self._open_context()
+            self._streaming_ctx.text.append(item[1])
+            ws.send(json.dumps({
+                "context_id": self._streaming_ctx.context_id,
+                "text": item[1],
+            }))
+            return
 
-    def _new_audio_stats(self) -> dict[str, float | int | None]:
-        return {
-            "t_start": time.monotonic(),
-            "t_first_audio": None,
-            "audio_bytes": 0,
-            "msg_count": 0,
-        }
+        # Streaming flush: the receive thread sets the event once the audio is in
+        if isinstance(item, tuple) and item[0] == "flush":
+            ctx = self._streaming_ctx
+            self._streaming_ctx = None
+            if ctx is None:
+                item[1].set()
+                return
+            self._mark_flushed(ctx, item[1])
+            ws.send(json.dumps({"context_id": ctx.context_id, "flush": True}))
+            return
 
-    def _print_audio_stats(self, stats: dict[str, float | int | None]) -> None:
-        print(
-            f"[audio] {stats['msg_count']} msgs, {stats['audio_bytes']} bytes, "
-            f"total {time.monotonic() - float(stats['t_start']):.2f}s"
-        )
+        if isinstance(item, tuple) and item[0] == "close":
+            ws.send(json.dumps({"context_id": item[1], "close_context": True}))
+            return
 
-    def _drain_audio(
-        self,
-        context_id: str,
-        ws: websockets.sync.client.ClientConnection,
-        ffplay: subprocess.Popen,
-        stats: dict[str, float | int | None],
-        timeout: float,
-        stop_on_final: bool,
-    ) -> bool:
-        """Drain currently available audio frames for a context."""
-        saw_final = False
-        last_msg_at = time.monotonic()
+        # Full utterance (non-streaming path)
+        if isinstance(item, str):
+            print(f"[audio] dequeue ({len(item)} chars)")
+            if self._play_cached(item):
+                return
+            ctx = self._open_context()
+            ctx.text.append(item)
+            for chunk in self._chunk_text(item):
+                ws.send(json.dumps({"context_id": ctx.context_id, "text": chunk}))
+            self._mark_flushed(ctx, None)
+            ws.send(json.dumps({"context_id": ctx.context_id, "flush": True}))
+
+    def _open_context(self) -> _Context:
+        ctx = _Context(self._next_context_id(), self._new_audio_stats())
+        if self.cache is not None:
+            ctx.recorded = []
+        with self._lock:
+            self._contexts[ctx.context_id] = ctx
+        self._speaking.set()
+        return ctx
+
+    def _cache_key(self, text: str) -> str:
+        return tts_key(text, self.config.voice_id, self.config.model_id, self.config.output_format)
+
+    def _play_cached(self, text: str) -> bool:
+        """Queue a cached utterance for playback in order; False on a miss."""
+        if self.cache is None:
+            return False
+        hit = self.cache.get(self._cache_key(text), self.config.output_format)
+        if hit is None:
+            return False
+        ctx = _Context(self._next_context_id(), self._new_audio_stats(), pending=[hit.data], final=True, local=True)
+        ctx.stats["msg_count"] = 0
+        ctx.stats["audio_bytes"] = len(hit.data)
+        print(f"[audio] tts cache hit ({hit.source}, {len(hit.data)} bytes)")
+        self._speaking.set()
+        with self._lock:
+            self._contexts[ctx.context_id] = ctx
+            self._advance_locked()
+        self._write_playout()
+        return True
+
+    def _mark_flushed(self, ctx: _Context, done: Optional[threading.Event]) -> None:
+        # Before sending the flush, so a fast isFinal can't beat the bookkeeping.
+        with self._lock:
+            ctx.flushed_at = time.monotonic()
+            ctx.done = done
+            if ctx.context_id not in self._contexts and done is not None:
+                done.set()  # connection dropped in the meantime
+
+    def _handle_interrupt(self, done: threading.Event) -> None:
+        with self._lock:
+            canceled = list(self._contexts.values())
+            self._contexts.clear()
+            retired = [item for item in self._playout if isinstance(item, threading.Event)]
+            self._playout.clear()
+            if self._sink is not None:
+                try:
+                    self._sink.clear()
+                except Exception as exc:
+                    print(f"[audio] output clear error: {exc}")
+            ws = self._ws
+        self._streaming_ctx = None
+        for ctx in canceled:
+            if ws is not None and not ctx.local:
+                try:
+                    ws.send(json.dumps({"context_id": ctx.context_id, "close_context": True}))
+                except Exception as exc:
+                    print(f"[audio] close_context error: {exc}")
+            if ctx.done is not None:
+                ctx.done.set()
+        for event in retired:
+            event.set()
+        done.set()
+
+        # Drop queued text/flush items from the canceled turn.
         while True:
-            if self._interrupt_requested.is_set():
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
                 break
+            if pending is None:
+                self._queue.put(None)
+                break
+            if isinstance(pending, tuple) and pending[0] in ("flush", "interrupt"):
+                pending[1].set()
+        self._speaking.clear()
+        self._interrupt_requested.clear()
+
+    # -- receive thread ------------------------------------------------------
+
+    def _receive_loop(self) -> None:
+        while not self._stop.is_set():
+            ws = self._ws
+            if ws is None:
+                time.sleep(0.05)
+                continue
             try:
-                raw = ws.recv(timeout=0.2 if stop_on_final else timeout)
+                # decode=False: keep text frames as bytes for FrameDecoder.
+                raw = ws.recv(timeout=_RECV_POLL, decode=False)
             except TimeoutError:
-                if stop_on_final and (time.monotonic() - last_msg_at) < _FLUSH_IDLE_TIMEOUT:
-                    continue
-                if not stop_on_final:
-                    break
-                if (time.monotonic() - last_msg_at) >= _FLUSH_IDLE_TIMEOUT:
-                    break
+                self._check_idle()
                 continue
-            last_msg_at = time.monotonic()
-
-            data = json.loads(raw)
-
-            # Skip messages from previous contexts
-            msg_ctx = data.get("context_id") or data.get("contextId")
-            if msg_ctx and msg_ctx != context_id:
+            except Exception as exc:
+                if self._ws is not ws:
+                    continue  # swapped for a fresh socket by _refresh_idle_ws
+                if not self._stop.is_set():
+                    print(f"[audio] receive error: {exc}, will reconnect")
+                self._drop_connection(ws)
                 continue
-
+            self._ws_active_at = time.monotonic()
+            self._route(raw)
+            self._write_playout()
+
+    def _route(self, raw: bytes) -> None:
+        msg_ctx, pcm, is_final = self._frames.parse(raw)
+        with self._lock:
+            head = next(iter(self._contexts.values()), None)
+            # Messages without a context id belong to whatever is playing.
+            ctx = self._contexts.get(msg_ctx) if msg_ctx else head
+            if ctx is None:
+                return  # closed or interrupted context
+            ctx.last_msg_at = time.monotonic()
+            stats = ctx.stats
             stats["msg_count"] = int(stats["msg_count"]) + 1
-            audio = data.get("audio")
 
-            if audio and ffplay.stdin:
-                decoded = base64.b64decode(audio)
-                stats["audio_bytes"] = int(stats["audio_bytes"]) + len(decoded)
+            if pcm is not None and len(pcm):
+                stats["audio_bytes"] = int(stats["audio_bytes"]) + len(pcm)
                 if stats["t_first_audio"] is None:
                     stats["t_first_audio"] = time.monotonic()
                     latency = float(stats["t_first_audio"]) - float(stats["t_start"])
                     print(f"[audio] first chunk in {latency:.2f}s "
-                          f"({len(decoded)} bytes)")
-                ffplay.stdin.write(decoded)
-                ffplay.stdin.flush()
+                          f"({len(pcm)} bytes)")
+                if ctx.recorded is not None:
+                    ctx.recorded.append(bytes(pcm))
+                # pcm is only valid until the next parse.
+                if ctx is head:
+                    self._playout.append(bytes(pcm))
+                else:
+                    ctx.pending.append(bytes(pcm))
+
+            if is_final:
+                ctx.final = True
+            self._advance_locked()
+
+    def _check_idle(self) -> None:
+        """Finish a flushed context whose final marker never came."""
+        with self._lock:
+            head = next(iter(self._contexts.values()), None)
+            if head is None or head.flushed_at is None or head.final:
+                return
+            if time.monotonic() - max(head.last_msg_at, head.flushed_at) < _FLUSH_IDLE_TIMEOUT:
+                return
+            if int(head.stats["msg_count"]) == 0:
+                print("[audio] flush warning: no final marker before timeout")
+            head.final = True
+            head.timed_out = True
+            self._advance_locked()
+        self._write_playout()
+
+    def _advance_locked(self) -> None:
+        """Retire finished contexts at the head and queue the next one's audio for playout."""
+        while self._contexts:
+            head = next(iter(self._contexts.values()))
+            if head.pending:
+                self._playout.extend(head.pending)
+                head.pending.clear()
+            if not head.final:
+                return
+            del self._contexts[head.context_id]
+            self._print_audio_stats(head.stats)
+            print(f"[audio] {head.context_id} done in {time.monotonic() - float(head.stats['t_start']):.2f}s")
+            if not head.local:
+                self._queue.put(("close", head.context_id))
+            if self.cache is not None and head.recorded and not head.timed_out:
+                # Only complete utterances (isFinal seen) are worth replaying.
+                self.cache.put(self._cache_key("".join(head.text)), self.config.output_format, b"".join(head.recorded))
+            if head.done is not None:
+                self._playout.append(head.done)
+        self._speaking.clear()
+
+    def _write_playout(self) -> None:
+        """Write queued audio to the sink, outside _lock (write() blocks on backpressure)."""
+        with self._write_lock:
+            # After interrupt() the queued audio belongs to the canceled turn;
+            # leave it for _handle_interrupt to drop.
+            while not self._interrupt_requested.is_set():
+                try:
+                    item = self._playout.popleft()
+                except IndexError:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+                    continue
+                sink = self._sink
+                if sink is not None:
+                    sink.write(item)
+
+    # -- shared --------------------------------------------------------------
+
+    def _drop_connection(self, ws: websockets.sync.client.ClientConnection) -> None:
+        """Forget a dead socket (either thread may notice first) and fail its contexts."""
+        with self._lock:
+            if self._ws is not ws:
+                return
+            self._ws = None
+        self.pool.discard(ws)
+        self._fail_contexts()
+
+    def _fail_contexts(self) -> None:
+        with self._lock:
+            failed = list(self._contexts.values())
+            self._contexts.clear()
+        for ctx in failed:
+            if ctx.done is not None:
+                ctx.done.set()
+        self._speaking.clear()
 
-            if data.get("is_final") or data.get("isFinal"):
-                saw_final = True
-                if stop_on_final:
-                    break
-            if not stop_on_final:
-                timeout = 0.0
-        return saw_final
+    def _new_audio_stats(self) -> dict[str, float | int | None]:
+        return {
+            "t_start": time.monotonic(),
+            "t_first_audio": None,
+            "audio_bytes": 0,
+            "msg_count": 0,
+        }
 
-    def _stream_utterance(
-        self,
-        text: str,
-        ws: websockets.sync.client.ClientConnection,
-        ffplay: subprocess.Popen,
-    ) -> None:
-        context_id = self._next_context_id()
-        chunks = self._chunk_text(text)
-        stats = self._new_audio_stats()
-
-        for chunk in chunks:
-            ws.send(json.dumps({"context_id": context_id, "text": chunk}))
-        ws.send(json.dumps({"context_id": context_id, "flush": True}))
-
-        finished = self._drain_audio(
-            context_id=context_id,
-            ws=ws,
-            ffplay=ffplay,
-            stats=stats,
-            timeout=_RECV_TIMEOUT,
-            stop_on_final=True,
+    def _print_audio_stats(self, stats: dict[str, float | int | None]) -> None:
+        print(
+            f"[audio] {stats['msg_count']} msgs, {stats['audio_bytes']} bytes, "
+            f"total {time.monotonic() - float(stats['t_start']):.2f}s"
         )
-        if not finished and int(stats["msg_count"]) == 0:
-            print("[audio] warning: no final marker before timeout")
-        self._print_audio_stats(stats)
 
     @staticmethod
     def _chunk_text(text: str) -> list[str]:
@@ -0,0 +1,168 @@
+"""Allocation-free parsing of ElevenLabs multi-stream-input audio messages.
+
+Each TTS message is a JSON object with a large base64 `audio` string plus
+`isFinal`/`contextId` (and alignment data we don't use). The naive path,
+json.loads + b64decode, builds a str of the frame, a dict with a second
+copy of the base64 text, and a bytes object for the PCM for every message.
+`FrameDecoder` instead reads the frame as bytes, finds the three fields by
+scanning and decodes the base64 with numpy into a reused buffer. The only
+per-message allocation left is the frame that the WebSocket hands us.
+"""
+
+from __future__ import annotations
+
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_INVALID = 255
+_LUT = np.full(256, _INVALID, dtype=np.uint8)
+_LUT[np.frombuffer(_ALPHABET, dtype=np.uint8)] = np.arange(64, dtype=np.uint8)
+_LUT[ord("=")] = 0
+
+_AUDIO_KEY = b'"audio"'
+_FINAL_KEYS = (b'"isFinal"', b'"is_final"')
+_CONTEXT_KEYS = (b'"contextId"', b'"context_id"')
+
+
+@dataclass
+class FrameStats:
+    frames: int = 0
+    audio_frames: int = 0
+    pcm_bytes: int = 0
+    fallbacks: int = 0  # frames handled by json.loads / binascii instead
+
+
+class FrameDecoder:
+    """Reads `audio`, `isFinal` and `contextId` out of raw TTS frames.
+
+    parse() returns (context_id, pcm, is_final). `pcm` is a memoryview into
+    a buffer owned by the decoder and is only valid until the next call, so
+    callers copy it out (e.g. into an AudioSink) before parsing the next
+    frame. Frames that don't look like the usual compact encoding (escaped
+    strings, whitespace inside the base64) go through json.loads instead.
+    """
+
+    def __init__(self, initial_bytes: int = 1 << 15):
+        self.stats = FrameStats()
+        self._pcm = bytearray(0)
+        self._idx = np.empty(0, dtype=np.intp)
+        self._vals = np.empty(0, dtype=np.uint8)
+        self._tmp = np.empty(0, dtype=np.uint8)
+        self._grow(initial_bytes)
+
+    def _grow(self, encoded_len: int) -> None:
+        size = 1 << max(12, (encoded_len - 1).bit_length())
+        self._idx = np.empty(size, dtype=np.intp)
+        self._vals = np.empty(size, dtype=np.uint8)
+        self._tmp = np.empty(size // 4, dtype=np.uint8)
+        self._pcm = bytearray(size // 4 * 3)
+
+    def parse(self, raw: Union[bytes, str]) -> Tuple[Optional[str], Optional[memoryview], bool]:
+        self.stats.frames += 1
+        if isinstance(raw, str):
+            raw = raw.encode()
+        span = _string_value(raw, _AUDIO_KEY)
+        audio_present = span is not None and span[1] > span[0]
+        if span is None and raw.find(_AUDIO_KEY) != -1 and not _is_null(raw, _AUDIO_KEY):
+            return self._parse_slow(raw)
+        context_id = None
+        for key in _CONTEXT_KEYS:
+            ctx = _string_value(raw, key)
+            if ctx is not None:
+                context_id = raw[ctx[0]:ctx[1]].decode()
+                break
+        is_final = any(_is_true(raw, key) for key in _FINAL_KEYS)
+        if not audio_present:
+            return context_id, None, is_final
+        pcm = self.decode(memoryview(raw)[span[0]:span[1]])
+        if pcm is None:
+            return self._parse_slow(raw)
+        self.stats.audio_frames += 1
+        self.stats.pcm_bytes += len(pcm)
+        return context_id, pcm, is_final
+
+    def decode(self, encoded: memoryview) -> Optional[memoryview]:
+        """Decode padded base64 into the reused buffer; None if it isn't plain base64."""
+        n = len(encoded)
+        if n == 0:
+            return memoryview(self._pcm)[:0]
+        if n % 4:
+            return None
+        if n > len(self._vals):
+            self._grow(n)
+        vals = self._vals[:n]
+        # np.take would convert uint8 indices to a fresh intp array (and buffer
+        # `out` in the default mode); widen into our own scratch instead.
+        idx = self._idx[:n]
+        np.copyto(idx, np.frombuffer(encoded, dtype=np.uint8), casting="safe")
+        np.take(_LUT, idx, out=vals, mode="wrap")
+        if vals.max() == _INVALID:
+            return None
+        quads = vals.reshape(-1, 4)
+        groups = n // 4
+        out = np.frombuffer(self._pcm, dtype=np.uint8)[: groups * 3].reshape(-1, 3)
+        tmp = self._tmp[:groups]
+        # 4 x 6 bits -> 3 bytes; uint8 shifts drop the bits that belong to the neighbour byte.
+        np.left_shift(quads[:, 0], 2, out=out[:, 0])
+        np.right_shift(quads[:, 1], 4, out=tmp)
+        np.bitwise_or(out[:, 0], tmp, out=out[:, 0])
+        np.left_shift(quads[:, 1], 4, out=out[:, 1])
+        np.right_shift(quads[:, 2], 2, out=tmp)
+        np.bitwise_or(out[:, 1], tmp, out=out[:, 1])
+        np.left_shift(quads[:, 2], 6, out=out[:, 2])
+        np.bitwise_or(out[:, 2], quads[:, 3], out=out[:, 2])
+        pad = (encoded[n - 1] == 0x3D) + (encoded[n - 2] == 0x3D)
+        return memoryview(self._pcm)[: groups * 3 - pad]
+
+    def _parse_slow(self, raw: bytes) -> Tuple[Optional[str], Optional[memoryview], bool]:
+        self.stats.fallbacks += 1
+        data = json.loads(raw)
+        context_id = data.get("context_id") or data.get("contextId")
+        is_final = bool(data.get("is_final") or data.get("isFinal"))
+        audio = data.get("audio")
+        if not audio:
+            return context_id, None, is_final
+        pcm = binascii.a2b_base64(audio)
+        self.stats.audio_frames += 1
+        self.stats.pcm_bytes += len(pcm)
+        return context_id, memoryview(pcm), is_final
+
+
+def _value_start(raw: bytes, key: bytes) -> int:
+    """Index of the first byte of `key`'s value, or -1."""
+    i = raw.find(key)
+    if i == -1:
+        return -1
+    i = raw.find(b":", i + len(key))
+    if i == -1:
+        return -1
+    i += 1
+    while i < len(raw) and raw[i] in b" \t\r\n":
+        i += 1
+    return i
+
+
+def _string_value(raw: bytes, key: bytes) -> Optional[Tuple[int, int]]:
+    """(start, end) of an unescaped JSON string value for `key`, or None."""
+    i = _value_start(raw, key)
+    if i == -1 or i >= len(raw) or raw[i] != 0x22:
+        return None
+    end = raw.find(b'"', i + 1)
+    if end == -1 or raw.find(b"\\", i + 1, end) != -1:
+        return None
+    return i + 1, end
+
+
+def _is_true(raw: bytes, key: bytes) -> bool:
+    i = _value_start(raw, key)
+    return i != -1 and raw.startswith(b"true", i)
+
+
+def _is_null(raw: bytes, key: bytes) -> bool:
+    i = _value_start(raw, key)
+    return i != -1 and raw.startswith(b"null", i)
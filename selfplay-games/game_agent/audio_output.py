@@ -0,0 +1,408 @@
+"""PCM playback sinks for AgentAudioStreamer.
+
+- `SoundDeviceSink`: in-process PortAudio output (sounddevice) fed from a
+  lock-free ring buffer. Interrupting is an O(1) clear of the ring and the
+  buffered depth is known at all times.
+- `FfplaySink`: the previous ffplay subprocess, kept as a fallback when
+  PortAudio isn't available. Clearing restarts the process.
+- `NullSink`: discards audio or writes it to a WAV file, optionally at
+  real-time pace, for headless runs and benchmarks.
+
+`open_sink("auto", ...)` picks sounddevice, then ffplay.
+"""
+
+from __future__ import annotations
+
+import abc
+import shutil
+import subprocess
+import time
+import wave
+from dataclasses import dataclass
+from typing import Any, Optional
+
+AUDIO_OUTPUTS = ("auto", "sounddevice", "ffplay", "null")
+
+_SAMPLE_WIDTH = 2  # s16le
+
+
+def pcm_sample_rate(output_format: str) -> int:
+    """Sample rate of an ElevenLabs PCM output format ("pcm_16000" -> 16000)."""
+    kind, _, rate = output_format.partition("_")
+    if kind != "pcm" or not rate.isdigit():
+        raise ValueError(f"audio playback needs a pcm_<rate> output format, got {output_format!r}")
+    return int(rate)
+
+
+@dataclass
+class OutputStats:
+    written_bytes: int = 0
+    cleared: int = 0
+    cleared_bytes: int = 0  # unplayed audio dropped by clear()
+    underruns: int = 0  # output underflows reported by the device
+
+    def summary(self, bytes_per_second: float) -> str:
+        return (
+            f"{self.written_bytes / bytes_per_second:.1f}s written, "
+            f"{self.cleared} clears ({self.cleared_bytes / bytes_per_second:.1f}s dropped), "
+            f"{self.underruns} underruns"
+        )
+
+
+class PcmRing:
+    """Single-producer, single-consumer byte ring without locks.
+
+    The producer only advances `_written` and the consumer only advances
+    `_read`; both are monotonically increasing byte counts, so each side
+    reads the other's counter without a lock (int assignment is atomic
+    under the GIL). clear() may be called from any thread: it moves a
+    discard mark up to the current write position and the consumer skips
+    to it on its next read, so dropping any amount of audio is O(1).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._written = 0
+        self._read = 0
+        self._discard_to = 0
+        self.generation = 0  # bumped by clear(); lets a blocked writer notice
+
+    def readable(self) -> int:
+        return max(0, self._written - max(self._read, self._discard_to))
+
+    def writable(self) -> int:
+        # Space is only reclaimed once the consumer has actually moved past it.
+        return self.capacity - (self._written - self._read)
+
+    def write(self, data: memoryview) -> int:
+        """Copy as much of `data` as fits; return the number of bytes copied."""
+        n = min(len(data), self.writable())
+        if n <= 0:
+            return 0
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if first < n:
+            self._view[: n - first] = data[first:n]
+        self._written += n
+        return n
+
+    def read_into(self, out: memoryview) -> int:
+        """Copy up to len(out) bytes into `out`; return the number copied."""
+        read = max(self._read, self._discard_to)
+        n = min(len(out), self._written - read)
+        if n <= 0:
+            self._read = read
+            return 0
+        start = read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._view[start:start + first]
+        if first < n:
+            out[first:n] = self._view[: n - first]
+        self._read = read + n
+        return n
+
+    def clear(self) -> int:
+        """Drop everything not yet played; return the number of bytes dropped."""
+        dropped = self.readable()
+        self._discard_to = self._written
+        self.generation += 1
+        return dropped
+
+
+class AudioSink(abc.ABC):
+    """Interface shared by the playback backends (16-bit little-endian PCM).
+
+    - write() blocks while the backend is full (backpressure for the TTS
+      receive loop) and returns early if clear() is called meanwhile.
+    - clear() drops unplayed audio. When `instant_clear` is set it is O(1)
+      and safe to call from any thread.
+    - buffered_seconds() is how much written audio has not been heard yet.
+    """
+
+    name = "sink"
+    instant_clear = False
+
+    def __init__(self, sample_rate: int, channels: int = 1):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bytes_per_second = sample_rate * channels * _SAMPLE_WIDTH
+        self.stats = OutputStats()
+
+    @abc.abstractmethod
+    def write(self, pcm: Any) -> None:
+        ...
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def buffered_seconds(self) -> float:
+        return 0.0
+
+    def drain(self, timeout: float) -> bool:
+        """Wait until buffered audio has played (or `timeout`); True if drained."""
+        deadline = time.monotonic() + timeout
+        while self.buffered_seconds() > 0.0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(0.02, remaining))
+        return True
+
+    def close(self, drain_timeout: float = 0.0) -> None:
+        pass
+
+    def summary(self) -> str:
+        return f"{self.name}: {self.stats.summary(self.bytes_per_second)}"
+
+
+class _PlayClock:
+    """Estimates unplayed audio for backends that don't report it (assumes real-time playback)."""
+
+    def __init__(self, bytes_per_second: float):
+        self.bytes_per_second = bytes_per_second
+        self.until = 0.0
+
+    def add(self, nbytes: int) -> None:
+        self.until = max(time.monotonic(), self.until) + nbytes / self.bytes_per_second
+
+    def buffered(self) -> float:
+        return max(0.0, self.until - time.monotonic())
+
+    def reset(self) -> float:
+        left = self.buffered()
+        self.until = 0.0
+        return left
+
+
+class SoundDeviceSink(AudioSink):
+    """PortAudio output stream pulling from a `PcmRing` in its callback."""
+
+    name = "sounddevice"
+    instant_clear = True
+
+    def __init__(self, sample_rate: int, channels: int = 1, ring_seconds: float = 30.0, latency: str = "low"):
+        super().__init__(sample_rate, channels)
+        import sounddevice as sd  # raises OSError when PortAudio itself is missing
+
+        frame = channels * _SAMPLE_WIDTH
+        self.ring = PcmRing(max(frame, int(ring_seconds * self.bytes_per_second) // frame * frame))
+        self._silence = bytes(4096)
+        self._closed = False
+        self._stream = sd.RawOutputStream(
+            samplerate=sample_rate,
+            channels=channels,
+            dtype="int16",
+            latency=latency,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def _callback(self, outdata: Any, frames: int, time_info: Any, status: Any) -> None:
+        if status.output_underflow:
+            self.stats.underruns += 1
+        out = memoryview(outdata).cast("B")
+        n = self.ring.read_into(out)
+        if n < len(out):
+            if len(self._silence) < len(out):
+                self._silence = bytes(len(out))
+            out[n:] = self._silence[: len(out) - n]
+
+    def write(self, pcm: Any) -> None:
+        data = memoryview(pcm).cast("B")
+        generation = self.ring.generation
+        offset = 0
+        while offset < len(data):
+            if self._closed or self.ring.generation != generation:
+                return
+            n = self.ring.write(data[offset:])
+            if n == 0:
+                time.sleep(0.005)
+                continue
+            offset += n
+        self.stats.written_bytes += len(data)
+
+    def clear(self) -> None:
+        dropped = self.ring.clear()
+        self.stats.cleared += 1
+        self.stats.cleared_bytes += dropped
+
+    def buffered_seconds(self) -> float:
+        queued = self.ring.readable() / self.bytes_per_second
+        return queued + (float(self._stream.latency) if queued else 0.0)
+
+    def close(self, drain_timeout: float = 0.0) -> None:
+        if drain_timeout > 0:
+            self.drain(drain_timeout)
+        self._closed = True
+        try:
+            self._stream.stop()
+        finally:
+            self._stream.close()
+
+
+class FfplaySink(AudioSink):
+    """Pipes PCM into an ffplay subprocess; clear() kills and respawns it."""
+
+    name = "ffplay"
+
+    def __init__(self, sample_rate: int, channels: int = 1):
+        super().__init__(sample_rate, channels)
+        if shutil.which("ffplay") is None:
+            raise RuntimeError("ffplay not found in PATH")
+        self._clock = _PlayClock(self.bytes_per_second)
+        self._proc = self._start()
+
+    def _start(self) -> subprocess.Popen:
+        cmd = [
+            "ffplay",
+            "-hide_banner", "-loglevel", "error",
+            "-autoexit", "-nodisp",
+            "-probesize", "32",
+            "-analyzeduration", "0",
+            "-fflags", "nobuffer",
+            "-flags", "low_delay",
+            "-f", "s16le", "-ar", str(self.sample_rate), "-ac", str(self.channels),
+            "-i", "pipe:0",
+        ]
+        return subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+        )
+
+    def _stop(self) -> None:
+        try:
+            if self._proc.stdin:
+                self._proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self._proc.kill()
+        except Exception:
+            pass
+        try:
+            self._proc.wait(timeout=1)
+        except Exception:
+            pass
+
+    def write(self, pcm: Any) -> None:
+        if self._proc.stdin:
+            self._proc.stdin.write(pcm)
+            self._proc.stdin.flush()
+            self._clock.add(len(pcm))
+            self.stats.written_bytes += len(pcm)
+
+    def clear(self) -> None:
+        """Stop current playback immediately and start a fresh ffplay process."""
+        self.stats.cleared += 1
+        self.stats.cleared_bytes += int(self._clock.reset() * self.bytes_per_second)
+        self._stop()
+        self._proc = self._start()
+
+    def buffered_seconds(self) -> float:
+        return self._clock.buffered()
+
+    def close(self, drain_timeout: float = 0.0) -> None:
+        if self._proc.stdin:
+            self._proc.stdin.close()
+        try:
+            self._proc.wait(timeout=drain_timeout or 2)
+        except Exception:
+            self._proc.kill()
+
+
+class NullSink(AudioSink):
+    """Headless sink: optionally records to a WAV file and/or paces writes in real time.
+
+    With `realtime`, writes block once more than `buffer_seconds` is queued,
+    like a device would, so end-to-end timings match live playback.
+    """
+
+    name = "null"
+    instant_clear = True
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int = 1,
+        path: Optional[str] = None,
+        realtime: bool = False,
+        buffer_seconds: float = 30.0,
+    ):
+        super().__init__(sample_rate, channels)
+        self.realtime = realtime
+        self.buffer_seconds = buffer_seconds
+        self._clock = _PlayClock(self.bytes_per_second)
+        self._generation = 0
+        self._wav: Optional[wave.Wave_write] = None
+        if path:
+            self._wav = wave.open(path, "wb")
+            self._wav.setnchannels(channels)
+            self._wav.setsampwidth(_SAMPLE_WIDTH)
+            self._wav.setframerate(sample_rate)
+
+    def write(self, pcm: Any) -> None:
+        if self.realtime:
+            generation = self._generation
+            while self._clock.buffered() > self.buffer_seconds:
+                if self._generation != generation:
+                    return
+                time.sleep(0.005)
+            if self._generation != generation:
+                return  # clear() resets the clock, which also ends the wait above
+            self._clock.add(len(pcm))
+        if self._wav is not None:
+            self._wav.writeframesraw(pcm)
+        self.stats.written_bytes += len(pcm)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.stats.cleared += 1
+        self.stats.cleared_bytes += int(self._clock.reset() * self.bytes_per_second)
+
+    def buffered_seconds(self) -> float:
+        return self._clock.buffered() if self.realtime else 0.0
+
+    def close(self, drain_timeout: float = 0.0) -> None:
+        if drain_timeout > 0:
+            self.drain(drain_timeout)
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+def open_sink(
+    kind: str,
+    sample_rate: int,
+    channels: int = 1,
+    path: Optional[str] = None,
+    realtime: bool = False,
+) -> AudioSink:
+    """Open a playback backend by name (see AUDIO_OUTPUTS).
+
+    "auto" tries sounddevice (PortAudio) and falls back to ffplay; `path`
+    and `realtime` only apply to "null".
+    """
+    if kind == "null":
+        return NullSink(sample_rate, channels, path=path, realtime=realtime)
+    if kind == "sounddevice":
+        return SoundDeviceSink(sample_rate, channels)
+    if kind == "ffplay":
+        return FfplaySink(sample_rate, channels)
+    if kind != "auto":
+        raise ValueError(f"unknown audio output {kind!r} (choose from {', '.join(AUDIO_OUTPUTS)})")
+    errors = []
+    for backend in (SoundDeviceSink, FfplaySink):
+        try:
+            return backend(sample_rate, channels)
+        except (ImportError, OSError, RuntimeError) as exc:
+            # sounddevice raises OSError at import time when PortAudio is missing.
+            errors.append(f"{backend.name}: {exc}")
+    raise RuntimeError("no audio output available (" + "; ".join(errors) + ")")
+
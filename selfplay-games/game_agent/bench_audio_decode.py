@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Benchmark decoding of ElevenLabs TTS WebSocket frames.
+
+Compares the old path (str frame -> json.loads -> base64.b64decode) with
+FrameDecoder (bytes frame -> field scan -> numpy base64 into a reused
+buffer). Reports messages/s, seconds of audio decoded per second, and the
+transient memory allocated per second of audio (sum over messages of the
+tracemalloc peak while handling that message, measured in a separate pass).
+
+Usage:
+  uv run bench_audio_decode.py
+  uv run bench_audio_decode.py --chunk-ms 50 250 1000 --messages 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import time
+import tracemalloc
+from typing import Callable, List, Union
+
+from audio_frames import FrameDecoder
+
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+
+def make_frames(chunk_ms: int, count: int) -> List[bytes]:
+    """Frames shaped like multi-stream-input output: audio, alignment, contextId."""
+    pcm_len = BYTES_PER_SECOND * chunk_ms // 1000
+    chars = list("the quick brown fox jumps over the lazy dog "[: max(1, chunk_ms // 60)])
+    frames = []
+    for i in range(count):
+        alignment = {
+            "chars": chars,
+            "charStartTimesMs": [j * 60 for j in range(len(chars))],
+            "charDurationsMs": [60] * len(chars),
+        }
+        frames.append(json.dumps({
+            "audio": base64.b64encode(os.urandom(pcm_len)).decode(),
+            "isFinal": None,
+            "normalizedAlignment": alignment,
+            "alignment": alignment,
+            "contextId": f"ctx_{i // 20}",
+        }).encode())
+    return frames
+
+
+def legacy(raw: Union[bytes, str]) -> int:
+    # What ws.recv() + _drain_audio did before: text frame decoded to str, full dict, new bytes.
+    data = json.loads(raw.decode() if isinstance(raw, bytes) else raw)
+    data.get("context_id") or data.get("contextId")
+    data.get("is_final") or data.get("isFinal")
+    audio = data.get("audio")
+    return len(base64.b64decode(audio)) if audio else 0
+
+
+def run(handle: Callable[[bytes], int], frames: List[bytes]) -> float:
+    started = time.perf_counter()
+    for raw in frames:
+        handle(raw)
+    return time.perf_counter() - started
+
+
+def allocated(handle: Callable[[bytes], int], frames: List[bytes]) -> int:
+    handle(frames[0])  # warm up buffers and caches outside the measurement
+    tracemalloc.start()
+    total = 0
+    try:
+        for raw in frames:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            handle(raw)
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+    finally:
+        tracemalloc.stop()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-ms", type=int, nargs="+", default=[50, 250, 1000], help="Audio per frame")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N timing runs")
+    args = parser.parse_args()
+
+    decoder = FrameDecoder()
+
+    def frame_decoder(raw: bytes) -> int:
+        _, pcm, _ = decoder.parse(raw)
+        return len(pcm) if pcm is not None else 0
+
+    for chunk_ms in args.chunk_ms:
+        frames = make_frames(chunk_ms, args.messages)
+        expected = [legacy(f) for f in frames[:20]]
+        assert expected == [frame_decoder(f) for f in frames[:20]]
+        assert all(bytes(decoder.parse(f)[1]) == base64.b64decode(json.loads(f)["audio"]) for f in frames[:20])
+        audio_seconds = args.messages * chunk_ms / 1000
+        print(f"\n{chunk_ms}ms frames ({len(frames[0]) / 1024:.1f} KiB each), {args.messages} messages")
+        for name, handle in (("json+b64decode", legacy), ("FrameDecoder", frame_decoder)):
+            elapsed = min(run(handle, frames) for _ in range(args.repeat))
+            alloc = allocated(handle, frames)
+            print(
+                f"  {name:<15} {args.messages / elapsed:>9.0f} msg/s  "
+                f"{audio_seconds / elapsed:>8.0f}x realtime  "
+                f"{alloc / audio_seconds / 1024:>8.1f} KiB allocated per audio-second"
+            )
+    print(f"\nFrameDecoder fallbacks: {decoder.stats.fallbacks}")
+
+
+if __name__ == "__main__":
+    main()
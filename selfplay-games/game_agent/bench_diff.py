@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark diff_observations vs. the indexed ObservationDiffer.
+
+Generates synthetic /observe snapshots (a few percent of parts moving,
+occasional attribute changes, spawns and despawns), checks that both
+diff paths produce identical text, and prints per-step timings.
+
+Usage:
+  uv run bench_diff.py
+  uv run bench_diff.py --sizes 100 1000 10000 --steps 50
+  uv run bench_diff.py --move-fraction 0.005
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import random
+import time
+from typing import Any, Dict, List
+
+from observation import ObservationDiffer, diff_observations
+
+
+def make_observation(n_entities: int, rng: random.Random) -> Dict[str, Any]:
+    entities: List[Dict[str, Any]] = []
+    for i in range(n_entities):
+        entities.append({
+            "id": i,
+            "name": rng.choice(["Part", "Coin", "Platform", "Brainrot", "HumanoidRootPart"]),
+            "position": [rng.uniform(-500, 500), rng.uniform(0, 50), rng.uniform(-500, 500)],
+            "size": [rng.uniform(1, 10), rng.uniform(1, 10), rng.uniform(1, 10)],
+            "attributes": {"Value": rng.randint(0, 100), "Zone": "Common", "ModelUrl": "x.glb"},
+        })
+    return {
+        "tick": 0,
+        "game_status": "active",
+        "player": {"id": "me", "position": [0.0, 3.0, 0.0], "health": 100, "attributes": {"Money": 0}},
+        "other_players": [],
+        "world": {"entities": entities},
+        "events": [],
+    }
+
+
+def next_observation(
+    obs: Dict[str, Any], rng: random.Random, next_id: List[int], move_fraction: float = 0.05
+) -> Dict[str, Any]:
+    out = copy.deepcopy(obs)
+    out["tick"] += 6
+    ents = out["world"]["entities"]
+    for e in rng.sample(ents, max(1, int(len(ents) * move_fraction))):
+        e["position"] = [x + rng.uniform(-0.5, 0.5) for x in e["position"]]
+    for e in rng.sample(ents, max(1, len(ents) // 200)):
+        e["attributes"]["Value"] = rng.randint(0, 100)
+    if rng.random() < 0.3 and ents:
+        ents.pop(rng.randrange(len(ents)))
+    if rng.random() < 0.3:
+        next_id[0] += 1
+        ents.append({
+            "id": next_id[0],
+            "name": "Coin",
+            "position": [rng.uniform(-500, 500), 1.0, rng.uniform(-500, 500)],
+            "attributes": {"Value": 10},
+        })
+    out["player"]["position"][0] += 0.3
+    return out
+
+
+def bench(n_entities: int, steps: int, seed: int, move_fraction: float) -> None:
+    rng = random.Random(seed)
+    next_id = [n_entities]
+    frames = [make_observation(n_entities, rng)]
+    for _ in range(steps):
+        frames.append(next_observation(frames[-1], rng, next_id, move_fraction))
+
+    t0 = time.perf_counter()
+    baseline = [diff_observations(a, b) for a, b in zip(frames, frames[1:])]
+    t_ref = time.perf_counter() - t0
+
+    differ = ObservationDiffer()
+    differ.reset(frames[0])
+    t0 = time.perf_counter()
+    indexed = [differ.diff(f) for f in frames[1:]]
+    t_idx = time.perf_counter() - t0
+
+    mismatches = sum(1 for a, b in zip(baseline, indexed) if a != b)
+    print(
+        f"{n_entities:>7} entities | reference {t_ref / steps * 1e3:8.2f} ms/step | "
+        f"indexed {t_idx / steps * 1e3:8.2f} ms/step | "
+        f"speedup {t_ref / t_idx if t_idx else float('inf'):5.2f}x | mismatches {mismatches}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark observation diffing.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--move-fraction", type=float, default=0.05, help="Fraction of entities moved per step")
+    args = parser.parse_args()
+    for n in args.sizes:
+        bench(n, args.steps, args.seed, args.move_fraction)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
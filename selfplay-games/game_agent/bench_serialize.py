@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Benchmark payload serialization: deepcopy + two json.dumps vs. serialize_payload.
+
+The "legacy" path is what run() used to do for the first step: deepcopy
+the observation, strip ignored fields, then json.dumps it once pretty for
+the log and once more for the model. Reports wall time and allocations
+(tracemalloc peak) per payload.
+
+Usage:
+  uv run bench_serialize.py
+  uv run bench_serialize.py --sizes 1000 10000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Tuple
+
+from bench_diff import make_observation
+from observation import (
+    _IGNORED_ATTRIBUTES,
+    _IGNORED_ENTITY_NAMES,
+    clean_observation,
+    serialize_payload,
+)
+
+
+def legacy_clean_observation(obs: Dict[str, Any]) -> Dict[str, Any]:
+    out = copy.deepcopy(obs)
+    for p in [out.get("player", {})] + out.get("other_players", []):
+        attrs = p.get("attributes", {})
+        for key in list(attrs):
+            if key in _IGNORED_ATTRIBUTES:
+                del attrs[key]
+    filtered = []
+    for e in out.get("world", {}).get("entities", []):
+        if e.get("name") in _IGNORED_ENTITY_NAMES:
+            continue
+        ea = e.get("attributes", {})
+        for key in list(ea):
+            if key in _IGNORED_ATTRIBUTES:
+                del ea[key]
+        filtered.append(e)
+    if "world" in out:
+        out["world"]["entities"] = filtered
+    out.pop("tick", None)
+    return out
+
+
+def legacy(obs: Dict[str, Any]) -> Tuple[str, str]:
+    payload = {"observation": legacy_clean_observation(obs), "last_action_error": None}
+    pretty = json.dumps(payload, indent=2, ensure_ascii=True)
+    compact = json.dumps(payload, ensure_ascii=True)
+    return compact, pretty
+
+
+def streaming(obs: Dict[str, Any]) -> Tuple[str, str]:
+    return serialize_payload({"observation": obs, "last_action_error": None})
+
+
+def measure(fn: Callable[[Dict[str, Any]], Tuple[str, str]], obs: Dict[str, Any], repeat: int) -> Tuple[float, int]:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(obs)
+    elapsed = (time.perf_counter() - t0) / repeat
+
+    tracemalloc.start()
+    fn(obs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark observation serialization.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        obs = make_observation(n, random.Random(n))
+        obs["player"]["attributes"].update({"ViewFovDeg": 70, "RenderRole": "player"})
+        ref = json.loads(legacy(obs)[0])
+        compact, pretty = streaming(obs)
+        assert json.loads(compact) == ref == json.loads(pretty)
+        assert ref["observation"] == clean_observation(obs)
+
+        t_old, peak_old = measure(legacy, obs, args.repeat)
+        t_new, peak_new = measure(streaming, obs, args.repeat)
+        print(
+            f"{n:>7} entities | legacy {t_old * 1e3:8.2f} ms peak {peak_old / 1e6:7.2f} MB | "
+            f"streaming {t_new * 1e3:8.2f} ms peak {peak_new / 1e6:7.2f} MB | "
+            f"speedup {t_old / t_new:5.2f}x | compact {len(compact)} vs {len(json.dumps(ref, ensure_ascii=True))} chars"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
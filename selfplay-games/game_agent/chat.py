@@ -16,8 +16,6 @@ import json
 import os
 import select
 import sys
-import urllib.error
-import urllib.request
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -25,7 +23,9 @@ import anthropic
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from anthropic_http import sdk_http_client, shared_session, warm_sdk_client
 from audio import AgentAudioStreamer, AudioConfig, MicSTTListener
+from tts_cache import shared_cache
 
 
 SYSTEM_PROMPT = (
@@ -56,7 +56,6 @@ def _stream_setup_token(
     max_tokens: int = 1024,
 ) -> Generator[str, None, None]:
     """Stream text deltas via raw SSE from the Anthropic API (setup-token auth)."""
-    url = "https://api.anthropic.com/v1/messages"
     headers = {
         "Content-Type": "application/json",
         "Accept": "text/event-stream",
@@ -79,14 +78,12 @@ def _stream_setup_token(
         "system": system_prompt,
         "messages": messages,
     }
-    req = urllib.request.Request(
-        url=url,
-        method="POST",
-        data=json.dumps(body).encode("utf-8"),
+    with shared_session().stream(
+        "/v1/messages",
+        body=json.dumps(body).encode("utf-8"),
         headers=headers,
-    )
-    with urllib.request.urlopen(req, timeout=120) as resp:
-        for raw_line in resp:
+    ) as lines:
+        for raw_line in lines:
             line = raw_line.decode("utf-8").rstrip("\n")
             if not line.startswith("data: "):
                 continue
@@ -267,14 +264,18 @@ def run(args: argparse.Namespace) -> int:
     if is_anthropic_setup_token(anthropic_token):
         claude = None
         print("Auth: setup-token (oauth)")
+        health = shared_session().warmup()
     else:
-        claude = Anthropic(api_key=anthropic_token)
+        sdk_client = sdk_http_client()
+        claude = Anthropic(api_key=anthropic_token, http_client=sdk_client)
         print("Auth: api-key")
+        health = warm_sdk_client(sdk_client)
+    print(f"Connection: {'warm' if health.ok else 'cold'} ({health.latency * 1000:.0f}ms, {health.detail})")
 
     audio_streamer: Optional[AgentAudioStreamer] = None
     if args.audio:
         try:
-            audio_streamer = AgentAudioStreamer(AudioConfig.from_env())
+            audio_streamer = AgentAudioStreamer(AudioConfig.from_env(), cache=shared_cache())
             audio_streamer.start()
             print("Audio: enabled")
         except Exception as exc:
@@ -0,0 +1,246 @@
+"""Background conversation-log writer: batched text + JSONL, with size rotation."""
+
+from __future__ import annotations
+
+import atexit
+import datetime as dt
+import gzip
+import json
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+_STEP_SECTION = re.compile(r"^STEP_(\d+)_(.+)$")
+
+
+def split_section(section: str) -> Tuple[Optional[int], str]:
+    """"STEP_12_ASSISTANT_RAW" -> (12, "ASSISTANT_RAW"); other sections have no step."""
+    match = _STEP_SECTION.match(section)
+    if match:
+        return int(match.group(1)), match.group(2)
+    return None, section
+
+
+def format_text_record(timestamp: str, section: str, content: str) -> str:
+    return f"\n[{timestamp}] {section}\n{content.rstrip()}\n"
+
+
+class _RotatingFile:
+    """Append-only UTF-8 text file rotated to path.1 .. path.N (optionally .gz) by size in bytes."""
+
+    def __init__(self, path: Path, max_bytes: int, backups: int, compress: bool) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        # Each run starts a fresh log, like the synchronous writer did.
+        self._f: BinaryIO = path.open("wb")
+        self._size = 0
+
+    def _backup(self, index: int) -> Path:
+        suffix = f".{index}.gz" if self.compress else f".{index}"
+        return self.path.with_name(self.path.name + suffix)
+
+    def write(self, data: str) -> None:
+        raw = data.encode("utf-8")
+        self._f.write(raw)
+        self._size += len(raw)
+        if self.max_bytes > 0 and self._size >= self.max_bytes:
+            self._rotate()
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def _rotate(self) -> None:
+        self._f.close()
+        if self.backups > 0:
+            self._backup(self.backups).unlink(missing_ok=True)
+            for index in range(self.backups - 1, 0, -1):
+                src = self._backup(index)
+                if src.exists():
+                    src.replace(self._backup(index + 1))
+            if self.compress:
+                with self.path.open("rb") as src_f, gzip.open(self._backup(1), "wb") as dst_f:
+                    shutil.copyfileobj(src_f, dst_f)
+            else:
+                self.path.replace(self._backup(1))
+        self._f = self.path.open("wb")
+        self._size = 0
+
+    def close(self) -> None:
+        self._f.close()
+
+
+@dataclass
+class _Record:
+    timestamp: str
+    monotonic: float
+    section: str
+    content: str
+
+
+@dataclass
+class LogWriterStats:
+    records: int = 0
+    batches: int = 0
+    blocked_puts: int = 0
+    dropped: int = 0  # records not queued: writer dead or queue full past put_timeout
+    write_errors: int = 0  # batches that failed to write
+
+    def summary(self) -> str:
+        per_batch = self.records / self.batches if self.batches else 0.0
+        return (
+            f"records={self.records} batches={self.batches} ({per_batch:.1f}/batch) "
+            f"blocked_puts={self.blocked_puts} dropped={self.dropped} write_errors={self.write_errors}"
+        )
+
+
+_STOP = object()
+_FLUSH = object()
+
+
+class ConversationLogWriter:
+    """Write conversation-log sections from a background thread.
+
+    write() timestamps the section and puts it on a bounded queue (blocking
+    when the writer falls behind, so nothing is dropped). The worker drains
+    up to `batch_size` records at a time and writes them in one go to the
+    human-readable log and, if `jsonl_path` is set, as JSONL records
+    {"ts", "mono", "step", "section", "content"}. Both files rotate at
+    `max_bytes` of UTF-8 (0 disables rotation). close() is also registered
+    with atexit so queued records are flushed on KeyboardInterrupt.
+
+    A failing write is counted and skipped, and a put blocked for more than
+    `put_timeout` seconds drops the record, so a logging problem can slow
+    the game loop but never hang it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        jsonl_path: Optional[Path] = None,
+        max_bytes: int = 0,
+        backups: int = 5,
+        compress: bool = False,
+        queue_size: int = 1024,
+        batch_size: int = 64,
+        put_timeout: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.stats = LogWriterStats()
+        self._text = _RotatingFile(path, max_bytes, backups, compress)
+        self._jsonl = _RotatingFile(jsonl_path, max_bytes, backups, compress) if jsonl_path else None
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=queue_size)
+        self._flushed = threading.Condition()
+        self._flush_requests = 0
+        self._flushes_done = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="conversation-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, section: str, content: str) -> None:
+        if self._closed:
+            return
+        record = _Record(
+            timestamp=dt.datetime.now(dt.timezone.utc).isoformat(),
+            monotonic=time.monotonic(),
+            section=section,
+            content=content,
+        )
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.stats.blocked_puts += 1
+            if not self._put(record):
+                self.stats.dropped += 1
+
+    def _put(self, item: object) -> bool:
+        """Blocking put bounded by put_timeout; False if the writer is dead or stuck."""
+        if not self._thread.is_alive():
+            return False
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def flush(self, timeout: Optional[float] = 5.0) -> None:
+        """Block until everything written so far is on disk (e.g. before a breakpoint)."""
+        if self._closed:
+            return
+        with self._flushed:
+            self._flush_requests += 1
+            target = self._flush_requests
+        if not self._put(_FLUSH):
+            return
+        with self._flushed:
+            self._flushed.wait_for(lambda: self._flushes_done >= target, timeout=timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop after queued records are written; waits at most about 2 * `timeout`."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        if not self._thread.is_alive():
+            return  # nothing would drain the queue
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch: List[object] = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if isinstance(item, _Record)]
+            if records:
+                try:
+                    self._write_batch(records)
+                except Exception as exc:
+                    self.stats.write_errors += 1
+                    if self.stats.write_errors == 1:
+                        print(f"[conversation-log] write failed, skipping batch: {exc}", file=sys.stderr)
+            # _write_batch flushes, so every record before a marker is on disk.
+            if any(item is _FLUSH for item in batch):
+                with self._flushed:
+                    self._flushes_done += sum(1 for item in batch if item is _FLUSH)
+                    self._flushed.notify_all()
+            if any(item is _STOP for item in batch):
+                self._text.close()
+                if self._jsonl is not None:
+                    self._jsonl.close()
+                return
+
+    def _write_batch(self, records: List[_Record]) -> None:
+        self._text.write("".join(format_text_record(r.timestamp, r.section, r.content) for r in records))
+        if self._jsonl is not None:
+            lines = []
+            for r in records:
+                step, section = split_section(r.section)
+                lines.append(
+                    json.dumps(
+                        {"ts": r.timestamp, "mono": round(r.monotonic, 6), "step": step, "section": section, "content": r.content},
+                        ensure_ascii=True,
+                    )
+                )
+            self._jsonl.write("\n".join(lines) + "\n")
+        self._text.flush()
+        if self._jsonl is not None:
+            self._jsonl.flush()
+        self.stats.records += len(records)
+        self.stats.batches += 1
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from observation import clean_observation
+
+
+SIGNATURE_MODES = ("diff", "state")
+
+
+def _quantize(value: Any, quantum: float) -> Any:
+    if isinstance(value, float):
+        return round(value / quantum) * quantum if quantum > 0 else value
+    if isinstance(value, list):
+        return [_quantize(v, quantum) for v in value]
+    if isinstance(value, dict):
+        return {k: _quantize(v, quantum) for k, v in value.items()}
+    return value
+
+
+def decision_signature(
+    mode: str,
+    diff_text: str,
+    obs: Dict[str, Any],
+    last_action: Optional[Dict[str, Any]],
+    quantum: float = 1.0,
+) -> str:
+    """Normalized key for "same situation, same previous action".
+
+    - "diff": the diff text itself (e.g. "No changes.").
+    - "state": a hash of the cleaned observation with every float snapped
+      to a `quantum` grid, so jitter below the grid size maps to one key.
+    """
+    if mode == "state":
+        state = json.dumps(_quantize(clean_observation(obs), quantum), sort_keys=True, ensure_ascii=True)
+    else:
+        state = diff_text
+    action = json.dumps(last_action, sort_keys=True, ensure_ascii=True)
+    return hashlib.sha1(f"{mode}\0{state}\0{action}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Entry:
+    action: Dict[str, Any]
+    created_at: float
+    uses: int = 0
+
+
+@dataclass
+class DecisionCacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"hits={self.hits} misses={self.misses} expired={self.expired} "
+            f"hit_rate={self.hit_rate():.0%}"
+        )
+
+
+@dataclass
+class DecisionCache:
+    """Reuse the last decision while the world is not changing.
+
+    An entry is served at most `max_reuse` times and for at most `ttl`
+    seconds after the model produced it; after that the model is asked
+    again. On a hit, `noop_action` is returned if set, otherwise the cached
+    action is re-issued.
+    """
+
+    ttl: float = 10.0
+    max_reuse: int = 5
+    noop_action: Optional[Dict[str, Any]] = None
+    max_entries: int = 256
+    stats: DecisionCacheStats = field(default_factory=DecisionCacheStats)
+    _entries: "OrderedDict[str, _Entry]" = field(default_factory=OrderedDict)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            fresh = (time.monotonic() - entry.created_at) <= self.ttl
+            if fresh and entry.uses < self.max_reuse:
+                entry.uses += 1
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return dict(self.noop_action if self.noop_action is not None else entry.action)
+            del self._entries[key]
+            self.stats.expired += 1
+        self.stats.misses += 1
+        return None
+
+    def uses(self, key: str) -> int:
+        entry = self._entries.get(key)
+        return entry.uses if entry is not None else 0
+
+    def store(self, key: str, action: Dict[str, Any]) -> None:
+        self._entries[key] = _Entry(action=dict(action), created_at=time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
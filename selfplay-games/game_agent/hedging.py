@@ -0,0 +1,313 @@
+"""Hedged LLM requests: re-issue a slow decide_action call and take whichever answers first."""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from tracing import _percentile
+
+_SAVED_WINDOW = 1000  # per-win savings kept for the p50 in HedgeStats
+
+
+class HedgeCancelled(Exception):
+    """Raised inside a losing attempt once another attempt has won."""
+
+
+class CancelToken:
+    """A threading.Event that also runs registered aborts when set.
+
+    Checking is_set() between stream deltas can't stop an attempt blocked
+    in a read before its first token, so the HTTP layer registers a
+    callback that closes the attempt's socket; set() runs it immediately
+    and the blocked read fails.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+    def set(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:  # noqa: BLE001 - aborting a dying connection
+                pass
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run `callback` on set() (right away if already set); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    capped: int = 0  # hedge was due but the rate/spend cap refused it
+    spent_tokens: int = 0  # estimated prompt tokens of hedge requests
+    latency_saved: float = 0.0  # estimated, summed over hedge wins
+    saved: Deque[float] = field(default_factory=lambda: deque(maxlen=_SAVED_WINDOW))
+
+    def summary(self) -> str:
+        if not self.calls:
+            return "no calls"
+        saved = (
+            f"saved ~{self.latency_saved:.1f}s total (p50 {_percentile(self.saved, 0.5):.2f}s per win)"
+            if self.saved
+            else "saved 0.0s"
+        )
+        return (
+            f"{self.hedged}/{self.calls} calls hedged ({self.hedged / self.calls:.0%}), "
+            f"hedge won {self.hedge_wins}, capped {self.capped}, "
+            f"~{self.spent_tokens} extra prompt tokens, {saved}"
+        )
+
+
+class HedgeAttempt:
+    """Hooks handed to one decide_action call of a hedged race.
+
+    - `first_signal()` marks the first token (streaming) or the reply (blocking).
+    - `on_action` / `on_reason_chunk` forward to the caller's callbacks only
+      for the winning attempt; the first attempt to stream a complete action
+      wins the race.
+    - `cancel` is set when another attempt wins. decide_action checks it
+      between stream deltas, and the HTTP layer registers an abort on it
+      that shuts the attempt's socket, so an attempt still waiting for its
+      first token fails at once instead of holding a connection until the
+      read timeout.
+    """
+
+    def __init__(self, race: "_Race", index: int, model: str):
+        self.race = race
+        self.index = index
+        self.model = model
+        self.cancel = CancelToken()
+        self.signalled = threading.Event()
+        self.started = time.monotonic()
+        self.signalled_at: Optional[float] = None
+
+    def first_signal(self) -> None:
+        if not self.signalled.is_set():
+            self.signalled_at = time.monotonic()
+            self.signalled.set()
+            self.race.hedger.observe(self.model, self.signalled_at - self.started)
+
+    def on_action(self, action: Dict[str, Any]) -> None:
+        if self.race.claim(self):
+            if self.race.on_action is not None:
+                self.race.on_action(action)
+        else:
+            raise HedgeCancelled()
+
+    def on_reason_chunk(self, chunk: str) -> None:
+        if self.race.winner is self and self.race.on_reason_chunk is not None:
+            self.race.on_reason_chunk(chunk)
+
+
+class _Race:
+    def __init__(
+        self,
+        hedger: "Hedger",
+        on_action: Optional[Callable[[Dict[str, Any]], None]],
+        on_reason_chunk: Optional[Callable[[str], None]],
+    ):
+        self.hedger = hedger
+        self.on_action = on_action
+        self.on_reason_chunk = on_reason_chunk
+        self.attempts: List[HedgeAttempt] = []
+        self.winner: Optional[HedgeAttempt] = None
+        self.won_at: Optional[float] = None
+        self.results: "queue.Queue[Tuple[HedgeAttempt, Any, Optional[BaseException]]]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def claim(self, attempt: HedgeAttempt) -> bool:
+        with self._lock:
+            if self.winner is None:
+                self.winner = attempt
+                self.won_at = time.monotonic()
+                for other in self.attempts:
+                    if other is not attempt:
+                        other.cancel.set()
+                if attempt.index > 0:
+                    self.hedger.record_hedge_win()
+            return self.winner is attempt
+
+    def finished(self, attempt: HedgeAttempt, completed: bool) -> None:
+        now = time.monotonic()
+        if completed and attempt.signalled_at is not None:
+            self.hedger.observe_tail(attempt.model, now - attempt.signalled_at)
+        with self._lock:
+            winner, won_at = self.winner, self.won_at
+        if attempt.index != 0 or winner is None or winner is attempt or won_at is None:
+            return
+        # A hedge won. If the primary ran to completion the saving is exact.
+        # If it was cancelled before its first token, it would still have
+        # needed at least its usual first-token-to-reply time on top of that.
+        saved = now - won_at
+        if not completed and attempt.signalled_at is None:
+            saved += self.hedger.typical_tail(attempt.model)
+        self.hedger.record_saved(max(0.0, saved))
+
+
+@dataclass
+class Hedger:
+    """Adaptive hedging policy for decide_action.
+
+    The hedge delay per model is the rolling `percentile` (p90 by default)
+    of time-to-first-signal (first token when streaming, the full reply
+    otherwise) over the last `window` calls, clamped to
+    [min_delay, max_delay]; `initial_delay` is used until `min_samples`
+    calls have been seen. When the primary hasn't signalled by then, one
+    duplicate goes to `hedge_model` (or the same model). At most
+    `max_rate` of calls are hedged, and hedges stop once `max_tokens`
+    estimated prompt tokens have been spent on them (0 = no budget).
+    """
+
+    hedge_model: Optional[str] = None
+    percentile: float = 0.9
+    window: int = 50
+    min_samples: int = 5
+    initial_delay: float = 8.0
+    min_delay: float = 1.0
+    max_delay: float = 30.0
+    max_rate: float = 0.2
+    max_tokens: int = 0
+    stats: HedgeStats = field(default_factory=HedgeStats)
+    _samples: Dict[str, Deque[float]] = field(default_factory=dict)
+    _tails: Dict[str, Deque[float]] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def observe(self, model: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def observe_tail(self, model: str, seconds: float) -> None:
+        """First signal -> finished reply, used to estimate the saving of a cancelled primary."""
+        with self._lock:
+            tails = self._tails.get(model)
+            if tails is None:
+                tails = self._tails[model] = deque(maxlen=self.window)
+            tails.append(seconds)
+
+    def typical_tail(self, model: str) -> float:
+        with self._lock:
+            tails = list(self._tails.get(model, ()))
+        return _percentile(tails, 0.5) if tails else 0.0
+
+    def record_hedge_win(self) -> None:
+        with self._lock:
+            self.stats.hedge_wins += 1
+
+    def record_saved(self, seconds: float) -> None:
+        with self._lock:
+            self.stats.latency_saved += seconds
+            self.stats.saved.append(seconds)
+
+    def threshold(self, model: str) -> float:
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, _percentile(samples, self.percentile)))
+
+    def _allow(self, cost_estimate: int) -> bool:
+        with self._lock:
+            if (self.stats.hedged + 1) / self.stats.calls > self.max_rate:
+                return False
+            if self.max_tokens and self.stats.spent_tokens + cost_estimate > self.max_tokens:
+                return False
+            self.stats.hedged += 1
+            self.stats.spent_tokens += cost_estimate
+            return True
+
+    def run(
+        self,
+        call: Callable[[HedgeAttempt], Any],
+        model: str,
+        on_action: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_reason_chunk: Optional[Callable[[str], None]] = None,
+        cost_estimate: int = 0,
+    ) -> Tuple[Any, Optional[HedgeAttempt]]:
+        """Run `call(attempt)` and maybe a hedge; return (result, hedge attempt or None).
+
+        `call` must use attempt.model, attempt.on_action, attempt.on_reason_chunk,
+        attempt.first_signal and attempt.cancel. A result counts as valid if
+        `call` returns; exceptions (unparseable reply, HTTP error) only
+        propagate when no other attempt is still running. Losing attempts
+        have attempt.cancel set, which aborts their HTTP response; their
+        daemon threads then exit with HedgeCancelled.
+        """
+        with self._lock:
+            self.stats.calls += 1
+        race = _Race(self, on_action, on_reason_chunk)
+        primary = self._start(race, call, model)
+        hedge: Optional[HedgeAttempt] = None
+        if not primary.signalled.wait(self.threshold(model)) and race.results.empty():
+            if self._allow(cost_estimate):
+                hedge = self._start(race, call, self.hedge_model or model)
+            else:
+                with self._lock:
+                    self.stats.capped += 1
+
+        pending = len(race.attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            attempt, result, exc = race.results.get()
+            pending -= 1
+            if exc is None and race.claim(attempt):
+                return result, hedge
+            if exc is not None and not isinstance(exc, HedgeCancelled):
+                if race.winner is attempt:
+                    raise exc  # action already dispatched by this attempt
+                error = exc
+        assert error is not None
+        raise error
+
+    def _start(self, race: _Race, call: Callable[[HedgeAttempt], Any], model: str) -> HedgeAttempt:
+        attempt = HedgeAttempt(race, len(race.attempts), model)
+        race.attempts.append(attempt)
+
+        def worker() -> None:
+            try:
+                result = call(attempt)
+            except BaseException as exc:  # noqa: BLE001 - handed to the waiting caller
+                race.finished(attempt, completed=False)
+                attempt.signalled.set()
+                race.results.put((attempt, None, exc))
+            else:
+                attempt.first_signal()
+                race.finished(attempt, completed=True)
+                race.results.put((attempt, result, None))
+
+        threading.Thread(target=worker, name=f"hedge-{attempt.index}", daemon=True).start()
+        return attempt
@@ -0,0 +1,167 @@
+"""Incremental parser for the model's {"action": {...}, "reason": "..."} reply."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class StreamingReplyParser:
+    """Scan streamed text and surface the action as soon as it is complete.
+
+    feed() takes raw text deltas. It tracks string/escape state and brace
+    depth of the top-level object (anything before the first "{", such as a
+    ```json fence, is skipped):
+    - when the value of the top-level "action" key closes, it is decoded
+      with json.loads and returned by take_action() (once);
+    - characters of a top-level "reason" string value are decoded as they
+      arrive and returned by take_reason_delta().
+    """
+
+    def __init__(self) -> None:
+        self._buf: List[str] = []
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._key_chars: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        self._expect_value = False
+        self._value_key: Optional[str] = None
+        self._action_start: Optional[int] = None
+        self._in_reason = False
+        self._action: Optional[Dict[str, Any]] = None
+        self._action_taken = False
+        self._reason_pending: List[str] = []
+        self.done = False
+
+    def feed(self, chunk: str) -> None:
+        self._buf.append(chunk)
+        for ch in chunk:
+            self._step(ch)
+            self._pos += 1
+
+    def take_action(self) -> Optional[Dict[str, Any]]:
+        if self._action is None or self._action_taken:
+            return None
+        self._action_taken = True
+        return self._action
+
+    def take_reason_delta(self) -> str:
+        out = "".join(self._reason_pending)
+        self._reason_pending.clear()
+        return out
+
+    def _text(self, start: int, end: int) -> str:
+        return "".join(self._buf)[start:end]
+
+    def _step(self, ch: str) -> None:
+        if self.done:
+            return
+        if not self._started:
+            if ch == "{":
+                self._started = True
+                self._depth = 1
+            return
+
+        if self._in_string:
+            self._string_char(ch)
+            return
+
+        if ch == '"':
+            self._in_string = True
+            if self._depth == 1 and not self._expect_value:
+                self._key_chars = []
+            elif self._depth == 1 and self._expect_value:
+                self._expect_value = False
+                self._in_reason = self._value_key == "reason"
+            return
+        if ch in " \t\r\n":
+            return
+        if ch == ":" and self._depth == 1:
+            self._expect_value = True
+            self._value_key = self._last_key
+            return
+        if ch == "," and self._depth == 1:
+            self._expect_value = False
+            return
+        if ch in "{[":
+            if self._depth == 1 and self._expect_value:
+                self._expect_value = False
+                if self._value_key == "action" and ch == "{":
+                    self._action_start = self._pos
+            self._depth += 1
+            return
+        if ch in "}]":
+            self._depth -= 1
+            if self._depth == 1 and self._action_start is not None:
+                raw = self._text(self._action_start, self._pos + 1)
+                self._action_start = None
+                try:
+                    parsed = json.loads(raw)
+                except json.JSONDecodeError:
+                    parsed = None
+                if isinstance(parsed, dict) and self._action is None:
+                    self._action = parsed
+            elif self._depth == 0:
+                self.done = True
+            return
+        if self._depth == 1 and self._expect_value:
+            # Scalar (number/true/false/null) value at top level.
+            self._expect_value = False
+
+    def _string_char(self, ch: str) -> None:
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) == 4:
+                try:
+                    code = int(self._unicode, 16)
+                except ValueError:
+                    code = 0xFFFD
+                self._unicode = None
+                if 0xD800 <= code < 0xDC00:
+                    self._high_surrogate = code
+                    return
+                if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                    code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+                self._high_surrogate = None
+                self._string_text(chr(code))
+            return
+        if self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+            else:
+                self._string_text(_SIMPLE_ESCAPES.get(ch, ch))
+            return
+        if ch == "\\":
+            self._escape = True
+            return
+        if ch == '"':
+            self._in_string = False
+            if self._key_chars is not None:
+                self._last_key = "".join(self._key_chars)
+                self._key_chars = None
+            self._in_reason = False
+            return
+        self._string_text(ch)
+
+    def _string_text(self, text: str) -> None:
+        if self._key_chars is not None:
+            self._key_chars.append(text)
+        elif self._in_reason and self._depth == 1:
+            self._reason_pending.append(text)
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Clawblox runtime, for offline load and latency tests.
+
+Serves both API shapes the Python clients use:
+- local (`clawblox run`): GET /skill.md, POST /join?name=, GET /observe,
+  POST /input, POST /leave, authenticated with the X-Session header;
+- platform: /api/v1/agents/register, /api/v1/games[/{id}] and
+  /api/v1/games/{id}/{skill.md,join,observe,input,leave,map,chat,
+  chat/messages,chat/voice}, authenticated with any Bearer key.
+
+The world is synthetic: `--entities` dynamic parts (a `--moving` fraction
+orbiting), `--static-entities` anchored parts served by /map, a GameState
+folder and one player per session that walks toward its last MoveTo target.
+Observations are computed on request from the current tick
+(`--tick-rate`). Every response can be delayed by `--latency-ms` +/-
+`--jitter-ms`, and the documented rate limits (observe/input 10 req/s
+burst 20, chat 1 msg/s burst 3, per agent) answer 429 with Retry-After.
+Stdlib only.
+
+Usage:
+  python mock_server.py --port 8080 --entities 2000
+  uv run agent.py --api-base http://localhost:8080 --no-breakpoint-before-llm
+  python ../fall-guys/test_player.py --api-base http://localhost:8080/api/v1 --game-id mock
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import math
+import random
+import re
+import signal
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+GAME_ID = "00000000-0000-4000-8000-000000000001"
+WALK_SPEED = 16.0  # studs/s
+ENTITY_NAMES = ("Part", "Coin", "Brainrot", "Obstacle", "Platform")
+
+SKILL_MD = """---
+name: mock-game
+description: Synthetic Clawblox world served by mock_server.py
+---
+
+# Mock Game
+
+Walk around and collect coins. The world is synthetic and exists for
+client load and latency testing.
+
+## Inputs
+- `MoveTo` `{"position": [x, y, z]}` - walk toward a point
+- `Jump` - jump (emits an event)
+- `Collect` - increments the CarriedCount attribute
+
+## Observation
+`player.attributes`: CarriedCount, Score. Entities named Coin and Brainrot
+are collectible; GameState carries RoundTime and Phase.
+"""
+
+
+@dataclass
+class TokenBucket:
+    rate: float
+    burst: float
+    tokens: float = -1.0
+    updated: float = field(default_factory=time.monotonic)
+
+    def take(self) -> float:
+        """Consume one token; return 0 on success or seconds until one is available."""
+        now = time.monotonic()
+        if self.tokens < 0:
+            self.tokens = self.burst
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+@dataclass
+class Player:
+    id: str
+    name: str
+    position: List[float]
+    target: Optional[List[float]] = None
+    moved_at: float = field(default_factory=time.monotonic)
+    health: float = 100.0
+    attributes: Dict[str, Any] = field(default_factory=lambda: {"CarriedCount": 0, "Score": 0})
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    gameplay_bucket: TokenBucket = field(default_factory=lambda: TokenBucket(10.0, 20.0))
+    chat_bucket: TokenBucket = field(default_factory=lambda: TokenBucket(1.0, 3.0))
+
+    def update(self, now: float) -> None:
+        if self.target is not None:
+            dx = self.target[0] - self.position[0]
+            dz = self.target[2] - self.position[2]
+            dist = math.hypot(dx, dz)
+            step = WALK_SPEED * (now - self.moved_at)
+            if dist <= step:
+                self.position = [self.target[0], self.position[1], self.target[2]]
+                self.target = None
+            elif dist > 0:
+                self.position = [self.position[0] + dx / dist * step, self.position[1], self.position[2] + dz / dist * step]
+        self.moved_at = now
+
+
+class MockWorld:
+    def __init__(self, args: argparse.Namespace) -> None:
+        rng = random.Random(args.seed)
+        self.tick_rate = args.tick_rate
+        self.duration = args.duration
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.players: Dict[str, Player] = {}  # session token / api key -> player
+        self.chat: List[Dict[str, Any]] = []
+        self.stats: Counter = Counter()
+        self.entities = []
+        for i in range(args.entities):
+            self.entities.append({
+                "id": 1000 + i,
+                "name": ENTITY_NAMES[i % len(ENTITY_NAMES)],
+                "entity_type": "part",
+                "base": [rng.uniform(-200, 200), rng.uniform(0, 10), rng.uniform(-200, 200)],
+                "size": [rng.choice([1.0, 2.0, 4.0]), 1.0, rng.choice([1.0, 2.0, 4.0])],
+                "moving": rng.random() < args.moving,
+                "phase": rng.uniform(0, 2 * math.pi),
+                "anchored": False,
+            })
+        self.static = [
+            {
+                "id": 100000 + i,
+                "name": "Floor" if i == 0 else "Wall",
+                "entity_type": "part",
+                "position": [rng.uniform(-250, 250), 0.0, rng.uniform(-250, 250)],
+                "size": [rng.uniform(4, 40), rng.uniform(1, 12), rng.uniform(4, 40)],
+                "anchored": True,
+            }
+            for i in range(args.static_entities)
+        ]
+
+    def tick(self, now: float) -> int:
+        return int((now - self.started_at) * self.tick_rate)
+
+    def status(self, now: float) -> str:
+        if self.duration > 0 and now - self.started_at >= self.duration:
+            return "finished"
+        return "active" if self.players else "waiting"
+
+    def join(self, key: str, name: str) -> Player:
+        with self.lock:
+            player = self.players.get(key)
+            if player is None:
+                player = Player(id=str(uuid.uuid4()), name=name, position=[0.0, 3.0, 0.0])
+                self.players[key] = player
+                for other in self.players.values():
+                    if other is not player:
+                        other.events.append({"type": "PlayerJoined", "name": name})
+            return player
+
+    def leave(self, key: str) -> None:
+        with self.lock:
+            self.players.pop(key, None)
+
+    def observe(self, player: Player) -> Dict[str, Any]:
+        now = time.monotonic()
+        tick = self.tick(now)
+        t = tick / self.tick_rate
+        with self.lock:
+            for p in self.players.values():
+                p.update(now)
+            others = [
+                {"id": p.id, "position": [round(v, 2) for v in p.position], "health": p.health, "attributes": dict(p.attributes)}
+                for p in self.players.values()
+                if p is not player and math.dist(p.position, player.position) <= 100
+            ]
+            events, player.events = player.events, []
+            me = {
+                "id": player.id,
+                "position": [round(v, 2) for v in player.position],
+                "health": player.health,
+                "attributes": dict(player.attributes),
+            }
+        entities = []
+        for e in self.entities:
+            x, y, z = e["base"]
+            if e["moving"]:
+                x += 5.0 * math.cos(t + e["phase"])
+                z += 5.0 * math.sin(t + e["phase"])
+            entities.append({
+                "id": e["id"],
+                "name": e["name"],
+                "entity_type": e["entity_type"],
+                "position": [round(x, 2), round(y, 2), round(z, 2)],
+                "size": e["size"],
+                "anchored": e["anchored"],
+            })
+        entities.append({
+            "id": 99,
+            "name": "GameState",
+            "entity_type": "folder",
+            "position": [0.0, 0.0, 0.0],
+            "size": [0.0, 0.0, 0.0],
+            "anchored": True,
+            "attributes": {"RoundTime": int(now - self.started_at), "Phase": self.status(now)},
+        })
+        return {
+            "tick": tick,
+            "game_status": self.status(now),
+            "player": me,
+            "other_players": others,
+            "world": {"entities": entities},
+            "events": events,
+        }
+
+    def input(self, player: Player, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        kind = body.get("type")
+        data = body.get("data") or {}
+        with self.lock:
+            player.update(time.monotonic())
+            if kind == "MoveTo":
+                pos = data.get("position")
+                if not (isinstance(pos, list) and len(pos) >= 3):
+                    return 400, {"error": "MoveTo requires data.position [x, y, z]"}
+                player.target = [float(v) for v in pos[:3]]
+            elif kind == "Jump":
+                player.events.append({"type": "Jumped"})
+            elif kind == "Collect":
+                player.attributes["CarriedCount"] += 1
+            elif not isinstance(kind, str) or not kind:
+                return 400, {"error": "input requires a type"}
+        return 200, {"success": True, "message": "Input queued"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+    server: "MockServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def _reply(self, status: int, body: Any, content_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> None:
+        raw = body.encode("utf-8") if isinstance(body, str) else json.dumps(body, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(raw)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json_body(self) -> Dict[str, Any]:
+        raw = self._body()
+        try:
+            parsed = json.loads(raw) if raw else {}
+        except json.JSONDecodeError:
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    def _agent_key(self) -> Optional[str]:
+        auth = self.headers.get("Authorization", "")
+        if auth.startswith("Bearer "):
+            return auth[len("Bearer "):]
+        return self.headers.get("X-Session")
+
+    def _dispatch(self, method: str) -> None:
+        server = self.server
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        path = url.path.rstrip("/") or "/"
+        platform = re.match(r"^/api/v1/games/([^/]+)(/.*)?$", path)
+        if platform:
+            route = platform.group(2) or ""
+        elif path.startswith("/api/v1"):
+            route = path[len("/api/v1"):]
+        else:
+            route = path
+        world = server.world
+        world.stats[f"{method} {route or '/games/{id}'}"] += 1
+
+        if route == "/skill.md":
+            self._body()
+            return self._reply(200, SKILL_MD, "text/markdown")
+        if route == "/agents/register" and not platform:
+            self._body()
+            return self._reply(200, {"agent_id": str(uuid.uuid4()), "api_key": f"clawblox_{uuid.uuid4()}"})
+        if route == "/games" and not platform:
+            return self._reply(200, {"games": [self._game_info()]})
+        if platform and route == "":
+            return self._reply(200, self._game_info())
+        if route == "/map":
+            return self._reply(200, {"entities": world.static})
+        if route == "/chat/messages":
+            after = query.get("after", "")
+            limit = min(int(query.get("limit", 50)), 100)
+            with world.lock:
+                messages = [m for m in world.chat if m["created_at"] > after][-limit:]
+            return self._reply(200, {"messages": messages})
+
+        key = self._agent_key()
+        if route == "/join" and method == "POST":
+            self._body()
+            if platform:
+                if not key:
+                    return self._reply(401, {"error": "missing API key"})
+                world.join(key, query.get("name", "agent"))
+                return self._reply(200, {"success": True, "message": "Joined game"})
+            key = str(uuid.uuid4())
+            player = world.join(key, query.get("name", "agent"))
+            return self._reply(200, {"session": key, "player_id": player.id})
+
+        player = world.players.get(key or "")
+        if player is None:
+            self._body()
+            return self._reply(401, {"error": "unknown session; join first"})
+
+        if route in ("/observe", "/input"):
+            wait = player.gameplay_bucket.take()
+            if wait > 0:
+                self._body()
+                world.stats["429"] += 1
+                return self._reply(429, {"error": "rate limited"}, headers={"Retry-After": f"{wait:.3f}"})
+            if route == "/observe":
+                return self._reply(200, world.observe(player))
+            status, body = world.input(player, self._json_body())
+            return self._reply(status, body)
+        if route == "/leave" and method == "POST":
+            self._body()
+            world.leave(key or "")
+            return self._reply(200, {"success": True, "message": "Left game"})
+        if route in ("/chat", "/chat/voice") and method == "POST":
+            wait = player.chat_bucket.take()
+            if route == "/chat":
+                content = str(self._json_body().get("content", ""))
+            else:
+                raw = self._body()
+                match = re.search(rb'name="content"\r\n\r\n(.*?)\r\n', raw, re.DOTALL)
+                content = match.group(1).decode("utf-8", "replace") if match else ""
+            if wait > 0:
+                world.stats["429"] += 1
+                return self._reply(429, {"error": "rate limited"}, headers={"Retry-After": f"{wait:.3f}"})
+            if not 1 <= len(content) <= 500:
+                return self._reply(400, {"error": "content must be 1-500 characters"})
+            message = {
+                "id": str(uuid.uuid4()),
+                "agent_id": player.id,
+                "agent_name": player.name,
+                "content": content,
+                "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+            }
+            with world.lock:
+                world.chat.append(message)
+            return self._reply(200, {"id": message["id"], "created_at": message["created_at"]})
+        self._body()
+        return self._reply(404, {"error": f"no route for {method} {self.path}"})
+
+    def _game_info(self) -> Dict[str, Any]:
+        world = self.server.world
+        return {
+            "id": GAME_ID,
+            "name": "Mock Game",
+            "description": "Synthetic world for client testing",
+            "game_type": "mock",
+            "status": world.status(time.monotonic()),
+            "max_players": 64,
+            "player_count": len(world.players),
+            "is_running": True,
+            "published": False,
+        }
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], world: MockWorld, latency: float, jitter: float, verbose: bool) -> None:
+        super().__init__(address, Handler)
+        self.world = world
+        self.latency = latency
+        self.jitter = jitter
+        self.verbose = verbose
+
+
+def _stop(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local mock Clawblox runtime.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--entities", type=int, default=200, help="Dynamic entities in /observe")
+    parser.add_argument("--static-entities", type=int, default=50, help="Anchored entities served by /map")
+    parser.add_argument("--moving", type=float, default=0.05, help="Fraction of dynamic entities that move")
+    parser.add_argument("--tick-rate", type=float, default=60.0, help="Simulated server ticks per second")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added delay per response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the added delay")
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds until game_status=finished (0 = never)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    world = MockWorld(args)
+    server = MockServer((args.host, args.port), world, args.latency_ms / 1e3, args.jitter_ms / 1e3, args.verbose)
+    print(
+        f"Mock Clawblox runtime on http://{args.host}:{args.port} "
+        f"(platform: /api/v1/games/{GAME_ID}) entities={args.entities} tick_rate={args.tick_rate:g}"
+    )
+    # Background jobs ignore SIGINT; let `kill` stop the server cleanly too.
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Requests:")
+        for route, count in sorted(world.stats.items()):
+            print(f"  {route}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,602 @@
+"""Observation cleaning and diffing for the Clawblox agent loop."""
+
+from __future__ import annotations
+
+import itertools
+import json
+import math
+import operator
+from typing import AbstractSet, Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _rpos(pos: list, ndigits: int = 1) -> tuple:
+    """Round position to 1 decimal (by default) to filter physics jitter."""
+    return tuple(round(x, ndigits) for x in pos)
+
+
+# Attributes that are camera/rendering internals — not useful for decision making
+_IGNORED_ATTRIBUTES = frozenset({
+    "ViewOriginX", "ViewOriginY", "ViewOriginZ",
+    "ViewForwardX", "ViewForwardY", "ViewForwardZ",
+    "ViewFovDeg",
+    "RenderRole",
+    "ModelUrl",
+})
+
+# Entity names that mirror player.position — skip to avoid duplicate diffs
+_IGNORED_ENTITY_NAMES = frozenset({
+    "HumanoidRootPart",
+})
+
+
+def _diff_attributes(
+    prev_attrs: Dict[str, Any],
+    curr_attrs: Dict[str, Any],
+    label: str,
+    changes: List[str],
+) -> None:
+    for key in sorted(set(prev_attrs) | set(curr_attrs)):
+        if key in _IGNORED_ATTRIBUTES:
+            continue
+        pv = prev_attrs.get(key)
+        cv = curr_attrs.get(key)
+        if pv != cv:
+            changes.append(f"{label} {key}: {pv} -> {cv}")
+
+
+def _diff_player(
+    prev: Dict[str, Any],
+    curr: Dict[str, Any],
+    label: str,
+    changes: List[str],
+) -> None:
+    if not prev or not curr:
+        return
+    pp = _rpos(prev.get("position", [0, 0, 0]))
+    cp = _rpos(curr.get("position", [0, 0, 0]))
+    if pp != cp:
+        changes.append(f"{label} position: {pp} -> {cp}")
+    ph = prev.get("health")
+    ch = curr.get("health")
+    if ph is not None and ch is not None and round(ph, 1) != round(ch, 1):
+        changes.append(f"{label} health: {ph} -> {ch}")
+    _diff_attributes(
+        prev.get("attributes", {}),
+        curr.get("attributes", {}),
+        label,
+        changes,
+    )
+
+
+def _diff_entity(
+    prev: Dict[str, Any],
+    curr: Dict[str, Any],
+    changes: List[str],
+) -> None:
+    name = curr.get("name", curr.get("id", "?"))
+    pp = _rpos(prev.get("position", [0, 0, 0]))
+    cp = _rpos(curr.get("position", [0, 0, 0]))
+    if pp != cp:
+        changes.append(f"{name} position: {pp} -> {cp}")
+    prev_size = prev.get("size")
+    curr_size = curr.get("size")
+    if prev_size and curr_size and _rpos(prev_size) != _rpos(curr_size):
+        changes.append(f"{name} size: {_rpos(prev_size)} -> {_rpos(curr_size)}")
+    _diff_attributes(
+        prev.get("attributes", {}),
+        curr.get("attributes", {}),
+        name,
+        changes,
+    )
+
+
+def _without_ignored_attributes(obj: Dict[str, Any]) -> Dict[str, Any]:
+    attrs = obj.get("attributes")
+    if not isinstance(attrs, dict) or attrs.keys().isdisjoint(_IGNORED_ATTRIBUTES):
+        return obj
+    out = dict(obj)
+    out["attributes"] = {k: v for k, v in attrs.items() if k not in _IGNORED_ATTRIBUTES}
+    return out
+
+
+def clean_observation(obs: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip noisy/internal fields from a full observation before sending to LLM.
+
+    Unchanged sub-objects are shared with `obs`, not copied; treat the result
+    as read-only. To serialize, prefer serialize_payload(), which filters
+    while writing and never builds the cleaned dict at all.
+    """
+    out = {k: v for k, v in obs.items() if k != "tick"}
+    # Strip ignored attributes from player
+    if isinstance(out.get("player"), dict):
+        out["player"] = _without_ignored_attributes(out["player"])
+    # Strip ignored attributes from other players
+    if isinstance(out.get("other_players"), list):
+        out["other_players"] = [_without_ignored_attributes(p) for p in out["other_players"]]
+    # Strip ignored entities and ignored attributes from remaining entities
+    world = out.get("world")
+    if isinstance(world, dict) and "entities" in world:
+        out["world"] = dict(world)
+        out["world"]["entities"] = [
+            _without_ignored_attributes(e)
+            for e in world.get("entities", [])
+            if e.get("name") not in _IGNORED_ENTITY_NAMES
+        ]
+    return out
+
+
+# Compact form goes to the model; the inline form (default separators, one
+# line) is used for leaves and list items in the human-readable log.
+_COMPACT_ENCODER = json.JSONEncoder(ensure_ascii=True, separators=(",", ":"))
+_INLINE_ENCODER = json.JSONEncoder(ensure_ascii=True)
+_encode_key = json.encoder.encode_basestring_ascii  # type: ignore[attr-defined]
+_PRETTY_INDENT = "  "
+
+
+class _DualWriter:
+    """Accumulates compact and pretty JSON for the same traversal."""
+
+    __slots__ = ("compact", "pretty")
+
+    def __init__(self) -> None:
+        self.compact: List[str] = []
+        self.pretty: List[str] = []
+
+    def leaf(self, value: Any) -> None:
+        self.compact.append(_COMPACT_ENCODER.encode(value))
+        self.pretty.append(_INLINE_ENCODER.encode(value))
+
+    def inline_object(self, obj: Dict[str, Any]) -> None:
+        """Write `obj` on one line, dropping ignored attribute keys on the fly."""
+        attrs = obj.get("attributes")
+        if isinstance(attrs, dict) and not attrs.keys().isdisjoint(_IGNORED_ATTRIBUTES):
+            # Transient one-level view for the encoder; dropped right after.
+            obj = {
+                k: ({ak: av for ak, av in v.items() if ak not in _IGNORED_ATTRIBUTES} if k == "attributes" else v)
+                for k, v in obj.items()
+            }
+        self.leaf(obj)
+
+    def block(self, items: List[tuple[str, Any, Any]], level: int, opener: str, closer: str) -> None:
+        """Write a multi-line object/array of (key or "", emit(writer, value, level), value)."""
+        if not items:
+            self.compact.append(opener + closer)
+            self.pretty.append(opener + closer)
+            return
+        pad = "\n" + _PRETTY_INDENT * (level + 1)
+        self.compact.append(opener)
+        self.pretty.append(opener)
+        for i, (key, emit, value) in enumerate(items):
+            if i:
+                self.compact.append(",")
+                self.pretty.append(",")
+            self.pretty.append(pad)
+            if key:
+                k = _encode_key(key)
+                self.compact.append(k + ":")
+                self.pretty.append(k + ": ")
+            emit(self, value, level + 1)
+        self.compact.append(closer)
+        self.pretty.append("\n" + _PRETTY_INDENT * level + closer)
+
+
+def _emit_leaf(w: _DualWriter, value: Any, level: int) -> None:
+    w.leaf(value)
+
+
+def _emit_inline(w: _DualWriter, value: Any, level: int) -> None:
+    if isinstance(value, dict):
+        w.inline_object(value)
+    else:
+        w.leaf(value)
+
+
+def _emit_rows(w: _DualWriter, rows: List[Any], level: int) -> None:
+    w.block([("", _emit_inline, row) for row in rows], level, "[", "]")
+
+
+def _emit_entities(w: _DualWriter, entities: List[Any], level: int) -> None:
+    w.block(
+        [
+            ("", _emit_inline, e)
+            for e in entities
+            if not (isinstance(e, dict) and e.get("name") in _IGNORED_ENTITY_NAMES)
+        ],
+        level,
+        "[",
+        "]",
+    )
+
+
+def _emit_world(w: _DualWriter, world: Dict[str, Any], level: int) -> None:
+    w.block(
+        [
+            (str(k), _emit_entities if k == "entities" and isinstance(v, list) else _emit_leaf, v)
+            for k, v in world.items()
+        ],
+        level,
+        "{",
+        "}",
+    )
+
+
+# Per-key writers for the top level of an observation; other keys are leaves.
+_OBSERVATION_EMITTERS = {
+    "player": (dict, _emit_inline),
+    "other_players": (list, _emit_rows),
+    "world": (dict, _emit_world),
+}
+
+
+def _emit_observation(w: _DualWriter, obs: Dict[str, Any], level: int) -> None:
+    items: List[tuple[str, Any, Any]] = []
+    for key, value in obs.items():
+        if key == "tick":
+            continue
+        kind, emit = _OBSERVATION_EMITTERS.get(key, (object, _emit_leaf))
+        items.append((str(key), emit if isinstance(value, kind) else _emit_leaf, value))
+    w.block(items, level, "{", "}")
+
+
+def _payload_emitter(key: str, value: Any) -> Any:
+    if key == "observation" and isinstance(value, dict):
+        return _emit_observation
+    if key == "newly_relevant" and isinstance(value, list):
+        return _emit_entities
+    return _emit_leaf
+
+
+def serialize_payload(payload: Dict[str, Any]) -> tuple[str, str]:
+    """Serialize an LLM user payload to (compact JSON, pretty JSON) in one walk.
+
+    An "observation" value is filtered while it is written, with the same
+    rules as clean_observation() (tick, ignored attributes and ignored
+    entities dropped), so no cleaned copy is ever built; "newly_relevant"
+    entity lists get the entity rules. The compact form is
+    sent to the model; the pretty form, one entity per line, goes to the log.
+    """
+    w = _DualWriter()
+    w.block(
+        [
+            (str(key), _payload_emitter(key, value), value)
+            for key, value in payload.items()
+        ],
+        0,
+        "{",
+        "}",
+    )
+    return "".join(w.compact), "".join(w.pretty)
+
+
+def _diff_status_and_players(
+    prev: Dict[str, Any],
+    curr: Dict[str, Any],
+    changes: List[str],
+) -> None:
+    # Game status
+    if prev.get("game_status") != curr.get("game_status"):
+        changes.append(
+            f"Game status: {prev.get('game_status')} -> {curr.get('game_status')}"
+        )
+
+    # Player
+    _diff_player(prev.get("player", {}), curr.get("player", {}), "You", changes)
+
+    # Other players (keyed by id)
+    prev_others = {p["id"]: p for p in prev.get("other_players", [])}
+    curr_others = {p["id"]: p for p in curr.get("other_players", [])}
+
+    for pid in sorted(set(prev_others) - set(curr_others)):
+        changes.append(f"Player {pid} left")
+    for pid in sorted(set(curr_others) - set(prev_others)):
+        p = curr_others[pid]
+        pos = _rpos(p.get("position", [0, 0, 0]))
+        changes.append(f"Player {pid} appeared at {pos}")
+    for pid in sorted(set(prev_others) & set(curr_others)):
+        _diff_player(prev_others[pid], curr_others[pid], f"Player {pid}", changes)
+
+
+def _diff_membership(
+    prev_ents: Dict[Any, Dict[str, Any]],
+    curr_ents: Dict[Any, Dict[str, Any]],
+    changes: List[str],
+    was_shown: Optional[AbstractSet[Any]] = None,
+    shown: Optional[AbstractSet[Any]] = None,
+) -> None:
+    for eid in sorted(prev_ents.keys() - curr_ents.keys(), key=str):
+        e = prev_ents[eid]
+        if e.get("name") in _IGNORED_ENTITY_NAMES or (was_shown is not None and eid not in was_shown):
+            continue
+        changes.append(f"{e.get('name', eid)} removed")
+    for eid in sorted(curr_ents.keys() - prev_ents.keys(), key=str):
+        e = curr_ents[eid]
+        if e.get("name") in _IGNORED_ENTITY_NAMES or (shown is not None and eid not in shown):
+            continue
+        pos = _rpos(e.get("position", [0, 0, 0]))
+        changes.append(f"{e.get('name', eid)} appeared at {pos}")
+
+
+def _format_changes(curr: Dict[str, Any], changes: List[str]) -> str:
+    # Events (ephemeral — forward all new ones)
+    for event in curr.get("events", []):
+        changes.append(f"Event: {event}")
+
+    if not changes:
+        return "No changes."
+    return "State changes:\n" + "\n".join(f"- {c}" for c in changes)
+
+
+def _player_label(change: str) -> Optional[str]:
+    # Labels written by _diff_player: "You ..." and "Player <id> ...".
+    if change.startswith("You "):
+        return "You"
+    if change.startswith("Player ") and not change.endswith(" left") and " appeared at " not in change:
+        return " ".join(change.split(" ", 2)[:2])
+    return None
+
+
+def format_grouped_changes(
+    curr: Dict[str, Any],
+    changes: List[str],
+    spans: List[tuple[str, int, int]],
+) -> str:
+    """Fold per-change lines into one line per entity/player.
+
+    `spans` marks (label, start, end) ranges of `changes` that belong to one
+    entity; their "<name> " prefixes are dropped and the changes joined
+    with "; ". Consecutive player lines are folded the same way.
+    """
+    owner = {}
+    for label, start, end in spans:
+        for i in range(start, end):
+            owner[i] = (label, start)
+    lines: List[str] = []
+    current: Optional[tuple[Any, str]] = None
+    parts: List[str] = []
+
+    def flush() -> None:
+        if current is not None:
+            lines.append(f"{current[1]}: " + "; ".join(parts))
+
+    for i, change in enumerate(changes):
+        if i in owner:
+            label, start = owner[i]
+            key: Any = ("entity", start)
+            prefix_len = len(label.rsplit("#", 1)[0]) + 1
+        else:
+            label = _player_label(change)
+            key = ("player", label)
+            prefix_len = len(label) + 1 if label else 0
+        if label is None:
+            flush()
+            current, parts = None, []
+            lines.append(change)
+            continue
+        if current is None or current[0] != key:
+            flush()
+            current, parts = (key, label), []
+        parts.append(change[prefix_len:].replace(": ", " ", 1))
+    flush()
+    for event in curr.get("events", []):
+        lines.append(f"Event: {event}")
+    if not lines:
+        return "No changes."
+    return "State changes (grouped by entity):\n" + "\n".join(f"- {line}" for line in lines)
+
+
+def diff_observations(prev: Dict[str, Any], curr: Dict[str, Any]) -> str:
+    """Compute human-readable diff between two /observe snapshots."""
+    changes: List[str] = []
+    _diff_status_and_players(prev, curr, changes)
+
+    # Entities
+    prev_ents = {e["id"]: e for e in prev.get("world", {}).get("entities", [])}
+    curr_ents = {e["id"]: e for e in curr.get("world", {}).get("entities", [])}
+
+    _diff_membership(prev_ents, curr_ents, changes)
+    for eid in sorted(prev_ents.keys() & curr_ents.keys(), key=str):
+        if curr_ents[eid].get("name") in _IGNORED_ENTITY_NAMES:
+            continue
+        _diff_entity(prev_ents[eid], curr_ents[eid], changes)
+
+    return _format_changes(curr, changes)
+
+
+_ZERO3 = (0.0, 0.0, 0.0)
+_NAN3 = (np.nan, np.nan, np.nan)
+_NO_ATTRIBUTES: Dict[str, Any] = {}
+
+# C-level accessors, so building an index does not run Python code per entity.
+_get_id = operator.itemgetter("id")
+_get_position = operator.methodcaller("get", "position", _ZERO3)
+_get_size = operator.methodcaller("get", "size")
+_get_attributes = operator.methodcaller("get", "attributes", _NO_ATTRIBUTES)
+
+
+def _rows3(values: List[Any]) -> np.ndarray:
+    """Stack 3-vectors into an (n, 3) float64 array; ValueError unless every row has 3 items."""
+    if any(n != 3 for n in set(map(len, values))):
+        raise ValueError("entity vector without 3 components")
+    flat = np.fromiter(itertools.chain.from_iterable(values), dtype=np.float64, count=3 * len(values))
+    return flat.reshape(len(values), 3)
+
+
+class EntityIndex:
+    """One snapshot of world entities, indexed by id.
+
+    Positions and sizes live in contiguous (n, 3) float64 arrays so that a
+    whole snapshot can be compared against the previous one in a single
+    vectorized pass. Missing sizes are stored as NaN rows. `attributes`
+    holds each row's attribute dict for a C-level elementwise comparison.
+    """
+
+    def __init__(self, entities: List[Dict[str, Any]], previous: Optional["EntityIndex"] = None):
+        n = len(entities)
+        self.entities = entities
+        self.ids = list(map(_get_id, entities))
+        if previous is not None and previous.ids == self.ids:
+            # Same entities in the same order as last time (the common case): reuse its id -> row map.
+            self.rows: Dict[Any, int] = previous.rows
+        else:
+            # Last occurrence wins, like the dict comprehension in diff_observations.
+            self.rows = dict(zip(self.ids, range(n)))
+        self.positions = _rows3(list(map(_get_position, entities)))
+        self.sizes = _rows3([s or _NAN3 for s in map(_get_size, entities)])
+        self.attributes = list(map(_get_attributes, entities))
+
+
+class ObservationDiffer:
+    """Stateful, indexed replacement for calling diff_observations each step.
+
+    - reset(obs) stores a baseline; diff(obs) diffs against the stored
+      snapshot and then replaces it.
+    - The previous snapshot's index is kept between calls. Rows are matched
+      by id and positions, sizes and attribute dicts compared in whole-array
+      passes; Python code only runs for the rows that changed.
+    - With epsilon == 0 (default) a row is a candidate when any coordinate
+      changed at all, and the 1-decimal rounding of diff_observations decides
+      what is reported, so the text is identical. With epsilon > 0 a change
+      is reported when any coordinate moved by more than epsilon, printed
+      with enough decimals for that change to be visible.
+    - `shown` restricts the report to the entity ids the model is shown
+      (e.g. the RelevanceCompressor's kept set) while still diffing the full
+      observation: an entity leaving or re-entering the shown set is not a
+      removal or an appearance, and is not reported as one.
+    """
+
+    def __init__(self, epsilon: float = 0.0):
+        self.epsilon = max(0.0, epsilon)
+        # Rounding to 10**-ndigits <= epsilon keeps any move > epsilon visible.
+        self._ndigits = max(1, math.ceil(-math.log10(self.epsilon))) if self.epsilon > 0 else 1
+        self._prev_obs: Optional[Dict[str, Any]] = None
+        self._prev_index: Optional[EntityIndex] = None
+        self._prev_shown: Optional[AbstractSet[Any]] = None
+
+    def reset(self, obs: Dict[str, Any], shown: Optional[AbstractSet[Any]] = None) -> None:
+        self._prev_obs = obs
+        self._prev_shown = shown
+        try:
+            self._prev_index = self._index(obs)
+        except (KeyError, TypeError, ValueError):
+            self._prev_index = None
+
+    def diff(
+        self,
+        obs: Dict[str, Any],
+        grouped: bool = False,
+        shown: Optional[AbstractSet[Any]] = None,
+    ) -> str:
+        """Diff against the stored snapshot.
+
+        With `grouped`, the changes of each entity/player are folded into one
+        line (see format_grouped_changes) instead of one line per change.
+        With `shown`, only entities in it (or, for removals, in the previous
+        call's `shown`) are reported.
+        """
+        if self._prev_obs is None:
+            self.reset(obs, shown)
+            return "No changes."
+        was_shown = self._prev_shown
+        try:
+            prev_index = self._prev_index or self._index(self._prev_obs)
+            index = self._index(obs, prev_index)
+        except (KeyError, TypeError, ValueError):
+            # Malformed/ragged entity data: fall back to the reference diff.
+            text = diff_observations(self._prev_obs, obs)
+            self._prev_obs, self._prev_index, self._prev_shown = obs, None, shown
+            return text
+        changes: List[str] = []
+        spans: Optional[List[tuple[str, int, int]]] = [] if grouped else None
+        _diff_status_and_players(self._prev_obs, obs, changes)
+        self._diff_entities(prev_index, index, changes, spans, was_shown, shown)
+        self._prev_obs, self._prev_index, self._prev_shown = obs, index, shown
+        if spans is not None:
+            return format_grouped_changes(obs, changes, spans)
+        return _format_changes(obs, changes)
+
+    @staticmethod
+    def _index(obs: Dict[str, Any], previous: Optional[EntityIndex] = None) -> EntityIndex:
+        return EntityIndex(obs.get("world", {}).get("entities", []), previous)
+
+    def _changed_rows(self, prev: np.ndarray, curr: np.ndarray) -> np.ndarray:
+        if self.epsilon > 0:
+            with np.errstate(invalid="ignore"):
+                return (np.abs(curr - prev) > self.epsilon).any(axis=1)
+        return (curr != prev).any(axis=1)
+
+    def _diff_entities(
+        self,
+        prev: EntityIndex,
+        curr: EntityIndex,
+        changes: List[str],
+        spans: Optional[List[tuple[str, int, int]]] = None,
+        was_shown: Optional[AbstractSet[Any]] = None,
+        shown: Optional[AbstractSet[Any]] = None,
+    ) -> None:
+        prev_rows, curr_rows = prev.rows, curr.rows
+        same_layout = prev.ids == curr.ids and len(curr_rows) == len(curr.ids)
+        if same_layout:
+            common = curr.ids
+            p_rows: List[int] = list(range(len(common)))
+            c_rows = p_rows
+            p_idx = c_idx = slice(None)
+            attr_changed = np.fromiter(
+                map(operator.ne, prev.attributes, curr.attributes), dtype=bool, count=len(common)
+            )
+        else:
+            # Only the entities that left or appeared are looked up for _diff_membership.
+            removed = {eid: prev.entities[prev_rows[eid]] for eid in prev_rows.keys() - curr_rows.keys()}
+            added = {eid: curr.entities[curr_rows[eid]] for eid in curr_rows.keys() - prev_rows.keys()}
+            _diff_membership(removed, added, changes, was_shown, shown)
+            keys = list(curr_rows)
+            c_all = np.fromiter(curr_rows.values(), dtype=np.intp, count=len(keys))
+            p_all = np.fromiter(map(prev_rows.get, keys, itertools.repeat(-1)), dtype=np.intp, count=len(keys))
+            kept = p_all >= 0
+            p_idx, c_idx = p_all[kept], c_all[kept]
+            common = list(itertools.compress(keys, kept.tolist()))
+            p_rows, c_rows = p_idx.tolist(), c_idx.tolist()
+            attr_changed = np.fromiter(
+                map(operator.ne, map(prev.attributes.__getitem__, p_rows), map(curr.attributes.__getitem__, c_rows)),
+                dtype=bool,
+                count=len(common),
+            )
+
+        if not common:
+            return
+        moved = self._changed_rows(prev.positions[p_idx], curr.positions[c_idx])
+        prev_sizes, curr_sizes = prev.sizes[p_idx], curr.sizes[c_idx]
+        both_sized = ~(np.isnan(prev_sizes).any(axis=1) | np.isnan(curr_sizes).any(axis=1))
+        resized = both_sized & self._changed_rows(prev_sizes, curr_sizes)
+
+        candidates: List[tuple[Any, int]] = []
+        for k in np.flatnonzero(moved | resized | attr_changed).tolist():
+            eid = common[k]
+            if shown is not None and eid not in shown:
+                continue
+            if curr.entities[c_rows[k]].get("name") not in _IGNORED_ENTITY_NAMES:
+                candidates.append((eid, k))
+        candidates.sort(key=lambda item: str(item[0]))
+
+        ndigits = self._ndigits
+        for eid, k in candidates:
+            pe = prev.entities[p_rows[k]]
+            ce = curr.entities[c_rows[k]]
+            start = len(changes)
+            name = ce.get("name", ce.get("id", "?"))
+            if self.epsilon == 0:
+                _diff_entity(pe, ce, changes)
+            else:
+                if moved[k]:
+                    pp = _rpos(pe.get("position", [0, 0, 0]), ndigits)
+                    cp = _rpos(ce.get("position", [0, 0, 0]), ndigits)
+                    if pp != cp:
+                        changes.append(f"{name} position: {pp} -> {cp}")
+                if resized[k]:
+                    ps, cs = _rpos(pe["size"], ndigits), _rpos(ce["size"], ndigits)
+                    if ps != cs:
+                        changes.append(f"{name} size: {ps} -> {cs}")
+                _diff_attributes(pe.get("attributes", {}), ce.get("attributes", {}), name, changes)
+            if spans is not None and len(changes) > start:
+                spans.append((f"{name}#{eid}", start, len(changes)))
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from ticks import TickTracker
+from tracing import _percentile
+
+
+ACTIVE_GAME_STATUSES = frozenset({"active", "running", "in_progress"})
+_AGE_WINDOW = 1000  # obs ages kept for the p95 in PipelineStats
+
+
+@dataclass
+class Snapshot:
+    seq: int
+    obs: Dict[str, Any]
+    received_at: float  # time.monotonic() when the /observe response arrived
+    tick: Optional[int] = None
+    tick_age: float = 0.0  # estimated staleness of the tick when it arrived (TickTracker)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.monotonic() if now is None else now) - self.received_at
+
+
+@dataclass
+class ActOutcome:
+    step: int
+    action: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    latency: float = 0.0
+
+
+class ObservationPoller:
+    """Background thread that keeps the freshest /observe snapshot available.
+
+    - Polls `observe_fn` every `interval` seconds (deadline-based, no drift).
+    - latest() returns the newest snapshot, optionally waiting for one newer
+      than a given sequence number.
+    - Errors are kept and surfaced by latest() only if no snapshot arrives.
+    - With a `tracker`, a response whose tick hasn't advanced is dropped
+      (no new seq) and the next poll is timed for when a fresh tick is due.
+    """
+
+    def __init__(
+        self,
+        observe_fn: Callable[[], Dict[str, Any]],
+        interval: float,
+        tracker: Optional[TickTracker] = None,
+    ):
+        self._observe_fn = observe_fn
+        self.interval = max(0.0, interval)
+        self.tracker = tracker
+        self._cond = threading.Condition()
+        self._snapshot: Optional[Snapshot] = None
+        self._last_error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.polls = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="agent-observe")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def latest(self, min_seq: int = 0, timeout: float = 30.0) -> Snapshot:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._snapshot is None or self._snapshot.seq < min_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    if self._snapshot is not None:
+                        return self._snapshot
+                    raise RuntimeError(f"no observation received (last error: {self._last_error})")
+                self._cond.wait(timeout=remaining)
+            return self._snapshot
+
+    def _run(self) -> None:
+        next_poll = time.monotonic()
+        seq = 0
+        while not self._stop.is_set():
+            stale = False
+            sent_at = time.monotonic()
+            try:
+                obs = self._observe_fn()
+            except Exception as exc:
+                self.errors += 1
+                with self._cond:
+                    self._last_error = exc
+            else:
+                received_at = time.monotonic()
+                sample = self.tracker.update(obs, sent_at, received_at) if self.tracker is not None else None
+                if sample is not None and not sample.fresh:
+                    stale = True
+                else:
+                    seq += 1
+                    snap = Snapshot(
+                        seq=seq,
+                        obs=obs,
+                        received_at=received_at,
+                        tick=sample.tick if sample else None,
+                        tick_age=sample.age if sample else 0.0,
+                    )
+                    with self._cond:
+                        self._snapshot = snap
+                        self._cond.notify_all()
+            self.polls += 1
+            if stale and self.tracker is not None:
+                # Re-poll when the next tick should be out rather than a full interval later.
+                now = time.monotonic()
+                due = self.tracker.next_fresh_at()
+                retry = max(1.0 / self.tracker.rate(), (due - now) if due is not None else 0.0)
+                next_poll = now + min(retry, self.interval)
+            else:
+                next_poll += self.interval
+            delay = next_poll - time.monotonic()
+            if delay < 0:
+                # Fell behind (slow observe); re-anchor instead of bursting.
+                next_poll = time.monotonic()
+                delay = 0.0
+            self._stop.wait(delay)
+
+
+class ActionDispatcher:
+    """Fires /input calls on a worker thread so the decision loop never waits on them.
+
+    Completed outcomes are collected with drain(); the caller logs them and
+    feeds errors back into the next prompt.
+    """
+
+    def __init__(self, act_fn: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        self._act_fn = act_fn
+        self._pending: queue.Queue = queue.Queue()
+        self._done: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="agent-act")
+        self._thread.start()
+
+    def submit(self, step: int, action: Dict[str, Any]) -> None:
+        self._pending.put((step, action))
+
+    def drain(self) -> List[ActOutcome]:
+        out: List[ActOutcome] = []
+        while True:
+            try:
+                out.append(self._done.get_nowait())
+            except queue.Empty:
+                return out
+
+    def close(self, timeout: float = 5.0) -> List[ActOutcome]:
+        """Stop after in-flight actions are sent and return their outcomes."""
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        return self.drain()
+
+    def _run(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            step, action = item
+            t0 = time.monotonic()
+            try:
+                result = self._act_fn(action)
+                outcome = ActOutcome(step=step, action=action, result=result)
+            except Exception as exc:
+                outcome = ActOutcome(step=step, action=action, error=str(exc))
+            outcome.latency = time.monotonic() - t0
+            self._done.put(outcome)
+
+
+class DeadlineTicker:
+    """Fixed-rate tick: wait() sleeps until the next deadline, not for a fixed delay.
+
+    Time spent thinking counts against the period, so a slow step is followed
+    immediately by the next one instead of an extra sleep.
+    """
+
+    def __init__(self, period: float):
+        self.period = max(0.0, period)
+        self._next = time.monotonic() + self.period
+        self.missed = 0
+
+    def wait(self) -> float:
+        now = time.monotonic()
+        delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+            self._next += self.period
+        else:
+            self.missed += 1
+            self._next = now + self.period
+        return max(0.0, delay)
+
+
+def stale_action_reason(
+    decided_obs: Dict[str, Any],
+    fresh_obs: Dict[str, Any],
+) -> Optional[str]:
+    """Return why an action decided on `decided_obs` should not be sent, if any."""
+    status = str(fresh_obs.get("game_status", "")).lower()
+    if status and status not in ACTIVE_GAME_STATUSES:
+        return f"game status is now {status}"
+    prev_health = (decided_obs.get("player") or {}).get("health")
+    health = (fresh_obs.get("player") or {}).get("health")
+    if isinstance(health, (int, float)) and health <= 0:
+        if not isinstance(prev_health, (int, float)) or prev_health > 0:
+            return "player died while the action was being decided"
+    return None
+
+
+@dataclass
+class PipelineStats:
+    started_at: float = field(default_factory=time.monotonic)
+    steps: int = 0
+    skipped_actions: int = 0
+    obs_ages: Deque[float] = field(default_factory=lambda: deque(maxlen=_AGE_WINDOW))
+    obs_age_total: float = 0.0
+    obs_age_max: float = 0.0
+
+    def record_step(self, obs_age: float) -> None:
+        """Count a step whose observation was `obs_age` old when handed to the decider."""
+        self.steps += 1
+        self.obs_ages.append(obs_age)
+        self.obs_age_total += obs_age
+        self.obs_age_max = max(self.obs_age_max, obs_age)
+
+    def steps_per_sec(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.steps / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        if not self.obs_ages:
+            return "no steps"
+        mean = self.obs_age_total / self.steps
+        p95 = _percentile(self.obs_ages, 0.95)
+        return (
+            f"{self.steps} steps at {self.steps_per_sec():.2f} steps/s; "
+            f"obs age at hand-off mean={mean:.2f}s p95={p95:.2f}s max={self.obs_age_max:.2f}s; "
+            f"skipped stale actions={self.skipped_actions}"
+        )
@@ -0,0 +1,198 @@
+"""Short multi-step action plans executed locally between LLM calls."""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+PLAN_PROMPT_ADDENDUM = """
+You may chain several actions in one reply to avoid waiting for another
+model call. Add an optional "until" to the action and an optional "then"
+list of further steps; they are executed locally in order:
+{
+  "action": {"type": "MoveTo", "data": {"position": [10, 0, 5]}},
+  "until": {"near": [10, 0, 5], "within": 4},
+  "then": [
+    {"action": {"type": "Jump"}, "wait": 0.5},
+    {"action": {"type": "Collect"}, "until": {"attribute": "CarriedCount", "changes": true}}
+  ],
+  "reason": "<brief>"
+}
+Conditions: {"near": [x, y, z], "within": studs} (horizontal distance of your
+player), {"attribute": name, "changes": true} or {"attribute": name, "equals": value}
+on your player, or on the first entity with that name via "entity": name.
+"wait": seconds to wait after sending. "timeout": seconds before the step
+fails (default 10). You are called again when the plan completes, fails,
+or something important happens (status change, damage, players join/leave, events).
+""".strip()
+
+DEFAULT_STEP_TIMEOUT = 10.0
+
+
+@dataclass
+class PlanStep:
+    action: Dict[str, Any]
+    until: Optional[Dict[str, Any]] = None
+    wait: float = 0.0
+    timeout: float = DEFAULT_STEP_TIMEOUT
+
+
+def _step_from_dict(raw: Dict[str, Any]) -> Optional[PlanStep]:
+    action = raw.get("action")
+    if not isinstance(action, dict) or "type" not in action:
+        return None
+    until = raw.get("until")
+    wait = raw.get("wait", 0.0)
+    timeout = raw.get("timeout", DEFAULT_STEP_TIMEOUT)
+    return PlanStep(
+        action=action,
+        until=until if isinstance(until, dict) else None,
+        wait=float(wait) if isinstance(wait, (int, float)) else 0.0,
+        timeout=float(timeout) if isinstance(timeout, (int, float)) else DEFAULT_STEP_TIMEOUT,
+    )
+
+
+def parse_plan(parsed: Dict[str, Any], max_steps: int) -> List[PlanStep]:
+    """Turn a decoded reply into plan steps; the first step is the top-level action."""
+    first = _step_from_dict(parsed)
+    if first is None:
+        return []
+    steps = [first]
+    then = parsed.get("then")
+    if isinstance(then, list):
+        for raw in then:
+            if len(steps) >= max_steps:
+                break
+            step = _step_from_dict(raw) if isinstance(raw, dict) else None
+            if step is None:
+                break
+            steps.append(step)
+    return steps
+
+
+def _attribute(obs: Dict[str, Any], cond: Dict[str, Any]) -> Any:
+    entity_name = cond.get("entity")
+    if entity_name:
+        for e in obs.get("world", {}).get("entities", []):
+            if e.get("name") == entity_name:
+                return e.get("attributes", {}).get(cond.get("attribute"))
+        return None
+    return obs.get("player", {}).get("attributes", {}).get(cond.get("attribute"))
+
+
+def condition_met(cond: Dict[str, Any], obs: Dict[str, Any], start_obs: Dict[str, Any]) -> bool:
+    if "near" in cond:
+        target = cond.get("near")
+        pos = obs.get("player", {}).get("position")
+        if not (isinstance(target, list) and len(target) >= 3 and isinstance(pos, list) and len(pos) >= 3):
+            return True
+        within = cond.get("within", 3.0)
+        return math.hypot(pos[0] - target[0], pos[2] - target[2]) <= float(within)
+    if "attribute" in cond:
+        value = _attribute(obs, cond)
+        if "equals" in cond:
+            return value == cond["equals"]
+        return value != _attribute(start_obs, cond)
+    # Unknown condition: don't block on it.
+    return True
+
+
+def significant_events(prev: Dict[str, Any], curr: Dict[str, Any]) -> Optional[str]:
+    """Cheap per-tick check for changes that should interrupt a running plan."""
+    if prev.get("game_status") != curr.get("game_status"):
+        return f"game status {prev.get('game_status')} -> {curr.get('game_status')}"
+    ph = prev.get("player", {}).get("health")
+    ch = curr.get("player", {}).get("health")
+    if isinstance(ph, (int, float)) and isinstance(ch, (int, float)) and ch < ph:
+        return f"health dropped {ph} -> {ch}"
+    prev_ids = {p.get("id") for p in prev.get("other_players", [])}
+    curr_ids = {p.get("id") for p in curr.get("other_players", [])}
+    if prev_ids != curr_ids:
+        return "players joined or left"
+    events = curr.get("events")
+    if events:
+        return f"event: {events[0]}"
+    return None
+
+
+@dataclass
+class PlanExecutor:
+    """Runs plan steps against fresh observations.
+
+    start() is called after the first step's action was sent. advance()
+    is called once per tick and returns the next action to send (if a step
+    just started). `active` turns False when the plan completes or fails;
+    `outcome` then describes why, for the next prompt.
+    """
+
+    steps: List[PlanStep]
+    index: int = 0
+    step_started_at: float = 0.0
+    step_start_obs: Dict[str, Any] = field(default_factory=dict)
+    active: bool = False
+    outcome: Optional[str] = None
+
+    def start(self, obs: Dict[str, Any], now: Optional[float] = None) -> None:
+        self.index = 0
+        self.step_started_at = time.monotonic() if now is None else now
+        self.step_start_obs = obs
+        self.active = bool(self.steps)
+        self.outcome = None
+
+    def abort(self, reason: str) -> None:
+        if self.active:
+            self.active = False
+            self.outcome = f"interrupted at step {self.index + 1}/{len(self.steps)}: {reason}"
+
+    def advance(self, obs: Dict[str, Any], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if not self.active:
+            return None
+        now = time.monotonic() if now is None else now
+        step = self.steps[self.index]
+        elapsed = now - self.step_started_at
+        if step.until is not None:
+            done = condition_met(step.until, obs, self.step_start_obs)
+        else:
+            done = elapsed >= step.wait
+        if not done:
+            if elapsed >= step.timeout:
+                self.active = False
+                self.outcome = (
+                    f"failed at step {self.index + 1}/{len(self.steps)}: "
+                    f"{step.action.get('type')} timed out after {step.timeout:.0f}s"
+                )
+            return None
+        self.index += 1
+        if self.index >= len(self.steps):
+            self.active = False
+            self.outcome = f"completed {len(self.steps)} step(s)"
+            return None
+        self.step_started_at = now
+        self.step_start_obs = obs
+        return self.steps[self.index].action
+
+    def fail(self, reason: str) -> None:
+        if self.active:
+            self.active = False
+            self.outcome = f"failed at step {self.index + 1}/{len(self.steps)}: {reason}"
+
+
+@dataclass
+class PlanStats:
+    started_at: float = field(default_factory=time.monotonic)
+    llm_calls: int = 0
+    local_steps: int = 0
+    plan_actions: int = 0
+
+    def llm_calls_per_minute(self) -> float:
+        minutes = (time.monotonic() - self.started_at) / 60.0
+        return self.llm_calls / minutes if minutes > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"llm_calls={self.llm_calls} ({self.llm_calls_per_minute():.1f}/min) "
+            f"local_ticks={self.local_steps} plan_actions={self.plan_actions}"
+        )
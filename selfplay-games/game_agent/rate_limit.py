@@ -0,0 +1,249 @@
+"""Client-side token buckets for the documented Clawblox agent rate limits.
+
+docs/agent-api.md: gameplay (observe, input) 10 req/s per agent with a
+burst of 20; chat 1 msg/s with a burst of 3. One `RateLimiter` per agent
+identity; it is shared by every thread (and event loop) that talks for
+that agent.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+GAMEPLAY = "gameplay"
+CHAT = "chat"
+DOCUMENTED_LIMITS: Dict[str, Tuple[float, float]] = {
+    GAMEPLAY: (10.0, 20.0),
+    CHAT: (1.0, 3.0),
+}
+
+# Lower value = served first when several callers wait on the same bucket.
+INPUT = 0
+OBSERVE = 1
+POLL = 2
+
+
+def endpoint_class(path: str) -> Optional[str]:
+    """Bucket for an API path, or None for unmetered endpoints (join, skill.md, map...)."""
+    path = path.split("?", 1)[0].rstrip("/")
+    if path.endswith("/chat") or path.endswith("/chat/voice"):
+        return CHAT
+    if path.endswith("/observe") or path.endswith("/input") or path.endswith("/chat/messages"):
+        return GAMEPLAY
+    return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None  # HTTP-date form; fall back to exponential backoff
+
+
+@dataclass
+class LimiterStats:
+    granted: Dict[str, int] = field(default_factory=dict)
+    waited: Dict[str, float] = field(default_factory=dict)
+    throttled: Dict[str, int] = field(default_factory=dict)
+
+    def record_grant(self, bucket: str, waited: float) -> None:
+        self.granted[bucket] = self.granted.get(bucket, 0) + 1
+        self.waited[bucket] = self.waited.get(bucket, 0.0) + waited
+
+    def summary(self) -> str:
+        parts = []
+        for bucket in sorted(self.granted):
+            n = self.granted[bucket]
+            parts.append(
+                f"{bucket}: {n} requests, waited {self.waited[bucket]:.1f}s "
+                f"(mean {self.waited[bucket] / n * 1000:.0f}ms), 429s {self.throttled.get(bucket, 0)}"
+            )
+        return "; ".join(parts) or "no requests"
+
+
+@dataclass
+class _Bucket:
+    nominal_rate: float
+    burst: float
+    rate: float = 0.0
+    tokens: float = 0.0
+    updated: float = field(default_factory=time.monotonic)
+    blocked_until: float = 0.0
+    backoff: float = 0.0
+    waiting: List[Tuple[int, int]] = field(default_factory=list)  # heap of (priority, seq)
+
+    def __post_init__(self) -> None:
+        self.rate = self.nominal_rate
+        self.tokens = self.burst
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """Thread-safe, asyncio-aware token buckets, one per endpoint class.
+
+    - Waiters on a bucket are served in priority order (INPUT before
+      OBSERVE before POLL), FIFO within a priority.
+    - Lower-priority callers also leave `reserve` tokens in the bucket, so
+      an input issued while observes are draining the budget goes out
+      immediately instead of queueing behind them.
+    - On HTTP 429 the bucket pauses for Retry-After (or an exponential
+      backoff), empties, and halves its rate; each success then raises the
+      rate back toward the documented one by `recovery` of it.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        reserve: float = 2.0,
+        min_rate_fraction: float = 0.2,
+        recovery: float = 0.05,
+        max_backoff: float = 8.0,
+    ) -> None:
+        self.reserve = reserve
+        self.min_rate_fraction = min_rate_fraction
+        self.recovery = recovery
+        self.max_backoff = max_backoff
+        self.stats = LimiterStats()
+        self._buckets = {
+            name: _Bucket(rate, burst) for name, (rate, burst) in (limits or DOCUMENTED_LIMITS).items()
+        }
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _enqueue(self, bucket: _Bucket, priority: int) -> Tuple[int, int]:
+        ticket = (priority, next(self._seq))
+        heapq.heappush(bucket.waiting, ticket)
+        return ticket
+
+    def _dequeue(self, bucket: _Bucket, ticket: Tuple[int, int]) -> None:
+        if bucket.waiting and bucket.waiting[0] == ticket:
+            heapq.heappop(bucket.waiting)
+        else:
+            bucket.waiting.remove(ticket)
+            heapq.heapify(bucket.waiting)
+
+    def _try_take(self, bucket: _Bucket, ticket: Tuple[int, int]) -> float:
+        """Take a token for `ticket` (0.0) or return seconds to wait before retrying."""
+        now = time.monotonic()
+        bucket.refill(now)
+        if now < bucket.blocked_until:
+            return bucket.blocked_until - now
+        need = 1.0 if ticket[0] == INPUT else 1.0 + self.reserve
+        if bucket.waiting[0] != ticket:
+            return need / bucket.rate
+        if bucket.tokens >= need:
+            bucket.tokens -= 1.0
+            heapq.heappop(bucket.waiting)
+            return 0.0
+        return (need - bucket.tokens) / bucket.rate
+
+    def acquire(self, name: str, priority: int = INPUT, timeout: Optional[float] = None) -> float:
+        """Block until a `name` token is available; return seconds waited.
+
+        Raises TimeoutError if `timeout` elapses first. Unknown bucket names
+        are unmetered.
+        """
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return 0.0
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(bucket, priority)
+            while True:
+                wait = self._try_take(bucket, ticket)
+                if wait <= 0:
+                    waited = time.monotonic() - started
+                    self.stats.record_grant(name, waited)
+                    self._cond.notify_all()
+                    return waited
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._dequeue(bucket, ticket)
+                        self._cond.notify_all()
+                        raise TimeoutError(f"rate limiter: no {name} token within {timeout:.1f}s")
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    async def acquire_async(self, name: str, priority: int = INPUT) -> float:
+        """acquire() for coroutines: sleeps on the event loop instead of blocking it."""
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return 0.0
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(bucket, priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_take(bucket, ticket)
+                    if wait <= 0:
+                        waited = time.monotonic() - started
+                        self.stats.record_grant(name, waited)
+                        self._cond.notify_all()
+                        return waited
+                # Re-check at least every 50ms: a token may be freed up by a
+                # sync caller giving up, and we can't wait on the Condition here.
+                await asyncio.sleep(min(wait, 0.05))
+        except asyncio.CancelledError:
+            with self._cond:
+                if ticket in bucket.waiting:
+                    self._dequeue(bucket, ticket)
+                self._cond.notify_all()
+            raise
+
+    def on_response(self, name: str, status: int, retry_after: Optional[str] = None) -> None:
+        """Feed back the HTTP status of a metered request (AIMD on 429)."""
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return
+        with self._cond:
+            if status == 429:
+                self.stats.throttled[name] = self.stats.throttled.get(name, 0) + 1
+                bucket.backoff = min(self.max_backoff, bucket.backoff * 2 if bucket.backoff else 0.5)
+                delay = parse_retry_after(retry_after)
+                now = time.monotonic()
+                bucket.blocked_until = max(bucket.blocked_until, now + (delay if delay is not None else bucket.backoff))
+                bucket.refill(now)
+                bucket.tokens = 0.0
+                bucket.rate = max(bucket.nominal_rate * self.min_rate_fraction, bucket.rate / 2)
+            elif status < 400:
+                bucket.backoff = 0.0
+                bucket.rate = min(bucket.nominal_rate, bucket.rate + bucket.nominal_rate * self.recovery)
+            self._cond.notify_all()
+
+    def current_rate(self, name: str) -> float:
+        bucket = self._buckets.get(name)
+        return bucket.rate if bucket is not None else float("inf")
+
+
+def send_limited(
+    limiter: RateLimiter,
+    name: str,
+    priority: int,
+    send: Callable[[], Any],
+    max_retries: int = 5,
+) -> Any:
+    """Call `send()` under the limiter, retrying on 429 so requests aren't dropped.
+
+    `send` returns a response with `status_code` and `headers` (requests.Response);
+    the last response is returned, whatever its status.
+    """
+    for attempt in range(max_retries + 1):
+        limiter.acquire(name, priority)
+        resp = send()
+        limiter.on_response(name, resp.status_code, resp.headers.get("Retry-After"))
+        if resp.status_code != 429 or attempt == max_retries:
+            return resp
+    return resp
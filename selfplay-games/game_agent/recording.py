@@ -0,0 +1,60 @@
+"""Compressed observe/LLM/input traces for offline replay.
+
+A trace is gzip-compressed JSONL, one record per line:
+  {"k": kind, "step": n, "t": seconds since recording started, "d": data}
+with kinds "meta" (first record), "obs" (raw /observe response used for
+a step), "llm" (raw model text plus model/latency) and "act" (the action
+sent and the /input result or error). gzip streams, so read_trace()
+yields records one at a time and multi-hour traces never need to fit in
+memory.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+TRACE_VERSION = 1
+
+
+class TraceRecorder:
+    """Append records to a gzip JSONL trace; safe to call from worker threads."""
+
+    def __init__(self, path: Path, meta: Optional[Dict[str, Any]] = None, compresslevel: int = 6) -> None:
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._f = gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel)
+        self.record("meta", None, {"version": TRACE_VERSION, **(meta or {})})
+
+    def record(self, kind: str, step: Optional[int], data: Any) -> None:
+        line = json.dumps(
+            {"k": kind, "step": step, "t": round(time.monotonic() - self._started, 6), "d": data},
+            ensure_ascii=True,
+            separators=(",", ":"),
+        )
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.write(line + "\n")
+            self.records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+
+def read_trace(path: Path) -> Iterator[Dict[str, Any]]:
+    """Stream records from a trace (gzip or plain JSONL)."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,161 @@
+"""Relevance-based observation compression: keep the top-K entities, summarize the rest."""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+from observation import _IGNORED_ENTITY_NAMES
+
+_DIRECTIONS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+_TERM = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+
+def skill_terms(skill_md: str) -> FrozenSet[str]:
+    """Identifiers mentioned in SKILL.md; entity names/attributes found here are salient."""
+    return frozenset(_TERM.findall(skill_md))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for compact JSON; good enough for before/after ratios.
+    return (len(text) + 3) // 4
+
+
+def _direction(dx: float, dz: float) -> str:
+    # N is +z, E is +x, relative to the player.
+    angle = math.degrees(math.atan2(dx, dz)) % 360.0
+    return _DIRECTIONS[int((angle + 22.5) // 45.0) % 8]
+
+
+@dataclass
+class CompressionStats:
+    steps: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    def record(self, before: int, after: int) -> None:
+        self.steps += 1
+        self.tokens_before += before
+        self.tokens_after += after
+
+    def summary(self) -> str:
+        if not self.steps:
+            return "no steps"
+        saved = 1.0 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0
+        return (
+            f"~{self.tokens_before / self.steps:.0f} -> ~{self.tokens_after / self.steps:.0f} "
+            f"tokens/step over {self.steps} sampled steps ({saved:.0%} saved)"
+        )
+
+
+class RelevanceCompressor:
+    """Rank entities and keep the `top_k` most relevant ones.
+
+    score = distance term (1 at the player, 0 at `radius`)
+          + recency term (1 on the step an entity changed, halving every
+            `recency_half_life` steps)
+          + salience (name or attribute keys mentioned in SKILL.md)
+          + a small bonus for entities kept last step, so the kept set
+            doesn't churn when scores are close.
+    Entities beyond `radius` are never kept. Folders (e.g. GameState) and
+    entities without a position are always kept. Everything else is
+    summarized as counts per name and compass direction from the player.
+    """
+
+    def __init__(
+        self,
+        top_k: int = 40,
+        radius: float = 150.0,
+        skill_md: str = "",
+        recency_half_life: float = 5.0,
+        sticky_bonus: float = 0.15,
+    ) -> None:
+        self.top_k = top_k
+        self.radius = radius
+        self.terms = skill_terms(skill_md)
+        self.recency_decay = math.log(2) / max(recency_half_life, 1e-6)
+        self.sticky_bonus = sticky_bonus
+        self.stats = CompressionStats()
+        self._step = 0
+        self._last_state: Dict[Any, Tuple[Any, Any]] = {}
+        self._changed_at: Dict[Any, int] = {}
+        self._kept: FrozenSet[Any] = frozenset()
+        self._salience: Dict[str, float] = {}
+
+    def _name_salience(self, name: Any) -> float:
+        key = str(name)
+        value = self._salience.get(key)
+        if value is None:
+            value = self._salience[key] = 1.0 if key in self.terms else 0.0
+        return value
+
+    def compress(self, obs: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Return (observation with only the kept entities, summary of the rest)."""
+        self._step += 1
+        entities = obs.get("world", {}).get("entities", [])
+        pos = obs.get("player", {}).get("position")
+        px, pz = (pos[0], pos[2]) if isinstance(pos, list) and len(pos) >= 3 else (0.0, 0.0)
+
+        always: set = set()
+        scored: List[Tuple[float, int, Dict[str, Any], float, float]] = []
+        seen = {}
+        for i, e in enumerate(entities):
+            if e.get("name") in _IGNORED_ENTITY_NAMES:
+                continue
+            eid = e.get("id")
+            epos = e.get("position")
+            attrs = e.get("attributes")
+            state = (tuple(epos) if isinstance(epos, list) else None, attrs)
+            seen[eid] = state
+            if self._last_state.get(eid) != state:
+                self._changed_at[eid] = self._step
+            if e.get("entity_type") == "folder" or not (isinstance(epos, list) and len(epos) >= 3):
+                always.add(i)
+                continue
+            dx, dz = epos[0] - px, epos[2] - pz
+            dist = math.hypot(dx, dz)
+            if dist > self.radius:
+                scored.append((-1.0, i, e, dx, dz))
+                continue
+            score = 1.0 - dist / self.radius
+            score += math.exp(-self.recency_decay * (self._step - self._changed_at.get(eid, self._step)))
+            score += self._name_salience(e.get("name"))
+            if isinstance(attrs, dict) and any(k in self.terms for k in attrs):
+                score += 0.5
+            if eid in self._kept:
+                score += self.sticky_bonus
+            scored.append((score, i, e, dx, dz))
+        for eid in self._last_state.keys() - seen.keys():
+            self._changed_at.pop(eid, None)
+        self._last_state = seen
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        in_range = [item for item in scored if item[0] >= 0.0]
+        keep = in_range[: self.top_k]
+        rest = in_range[self.top_k :] + [item for item in scored if item[0] < 0.0]
+        kept_indices = {item[1] for item in keep} | always
+        self._kept = frozenset(item[2].get("id") for item in keep)
+
+        groups: Dict[str, Dict[str, Any]] = {}
+        for _, _, e, dx, dz in rest:
+            name = str(e.get("name", "?"))
+            group = groups.get(name)
+            if group is None:
+                group = groups[name] = {"name": name, "count": 0, "nearest": math.inf, "directions": {}}
+            group["count"] += 1
+            group["nearest"] = min(group["nearest"], math.hypot(dx, dz))
+            d = _direction(dx, dz)
+            group["directions"][d] = group["directions"].get(d, 0) + 1
+        summary = sorted(groups.values(), key=lambda g: -g["count"])
+        for group in summary:
+            group["nearest"] = round(group["nearest"], 1)
+
+        # Keep the server's entity order so diffs stay stable.
+        kept_entities = [e for i, e in enumerate(entities) if i in kept_indices]
+        world = dict(obs.get("world", {}))
+        world["entities"] = kept_entities
+        compressed = dict(obs)
+        compressed["world"] = world
+        return compressed, summary
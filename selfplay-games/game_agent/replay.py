@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Replay a recorded trace (agent.py --record) through the agent's stages offline.
+
+Streams the trace record by record, so multi-hour traces run in constant
+memory. For each recorded step the observation goes through
+clean_observation, diff_observations (reference) and ObservationDiffer,
+and serialize_payload; each recorded model reply is answered by a fake
+Anthropic client and goes through decide_action (and so
+_parse_decision_text), blocking or, with --stream, as streamed deltas
+through the incremental reply parser.
+Prints per-stage throughput and any differ/reference mismatches.
+
+Usage:
+  uv run replay.py run.trace.jsonl.gz
+  uv run replay.py run.trace.jsonl.gz --stream
+  uv run replay.py run.trace.jsonl.gz --diff-epsilon 0.05 --show-mismatches 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, Optional
+
+from agent import decide_action
+from observation import ObservationDiffer, clean_observation, diff_observations, serialize_payload
+from recording import read_trace
+
+
+# Size of the fake text deltas in --stream mode (roughly one SSE delta).
+_STREAM_DELTA_CHARS = 12
+
+
+class _ReplayStream:
+    def __init__(self, reply: Dict[str, Any]):
+        self._reply = reply
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        text = self._reply.get("text", "")
+        for i in range(0, len(text), _STREAM_DELTA_CHARS):
+            yield text[i : i + _STREAM_DELTA_CHARS]
+
+    def close(self) -> None:
+        pass
+
+    def get_final_message(self) -> Any:
+        return SimpleNamespace(usage=self._reply.get("usage"))
+
+
+class _ReplayMessages:
+    """Answers messages.create/messages.stream with the current recorded reply."""
+
+    def __init__(self) -> None:
+        self.reply: Dict[str, Any] = {}
+
+    def create(self, **params: Any) -> Any:
+        block = SimpleNamespace(type="text", text=self.reply.get("text", ""))
+        return SimpleNamespace(content=[block], usage=self.reply.get("usage"))
+
+    @contextmanager
+    def stream(self, **params: Any) -> Iterator[_ReplayStream]:
+        yield _ReplayStream(self.reply)
+
+
+class ReplayClient:
+    """Stand-in for the Anthropic client that replays recorded replies."""
+
+    def __init__(self) -> None:
+        self.messages = _ReplayMessages()
+
+
+@dataclass
+class StageTimer:
+    count: int = 0
+    seconds: float = 0.0
+
+    def add(self, started: float) -> None:
+        self.seconds += time.perf_counter() - started
+        self.count += 1
+
+    def row(self, name: str) -> str:
+        per_item = self.seconds / self.count * 1e6 if self.count else 0.0
+        rate = self.count / self.seconds if self.seconds > 0 else float("inf")
+        return f"{name:<12} n={self.count:<7} total={self.seconds:8.3f}s per_item={per_item:9.1f}us rate={rate:10.0f}/s"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay an agent trace offline and time each stage.")
+    parser.add_argument("trace", type=Path, help="Trace written by agent.py --record")
+    parser.add_argument("--diff-epsilon", type=float, default=0.0, help="ObservationDiffer epsilon (0 = exact)")
+    parser.add_argument("--show-mismatches", type=int, default=0, help="Print the first N differ mismatches")
+    parser.add_argument("--stream", action="store_true", help="Replay replies as streamed deltas")
+    args = parser.parse_args()
+
+    stages = {name: StageTimer() for name in ("read", "clean", "diff_ref", "diff", "serialize", "decide")}
+    client = ReplayClient()
+    user_content = ""
+    differ = ObservationDiffer(epsilon=args.diff_epsilon)
+    prev_obs: Optional[Dict[str, Any]] = None
+    mismatches = 0
+    invalid_replies = 0
+    acts = act_errors = 0
+    meta: Dict[str, Any] = {}
+
+    records = read_trace(args.trace)
+    t_start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        record = next(records, None)
+        if record is None:
+            break
+        stages["read"].add(t0)
+        kind, data = record.get("k"), record.get("d")
+
+        if kind == "meta":
+            meta = data or {}
+        elif kind == "obs":
+            t0 = time.perf_counter()
+            clean_observation(data)
+            stages["clean"].add(t0)
+            if prev_obs is None:
+                t0 = time.perf_counter()
+                differ.reset(data)
+                stages["diff"].add(t0)
+                payload: Dict[str, Any] = {"observation": data, "last_action_error": None}
+            else:
+                t0 = time.perf_counter()
+                reference = diff_observations(prev_obs, data)
+                stages["diff_ref"].add(t0)
+                t0 = time.perf_counter()
+                diff = differ.diff(data)
+                stages["diff"].add(t0)
+                if args.diff_epsilon == 0 and diff != reference:
+                    mismatches += 1
+                    if mismatches <= args.show_mismatches:
+                        print(f"--- mismatch at step {record.get('step')}\nreference:\n{reference}\ndiffer:\n{diff}")
+                payload = {"state_changes": diff, "last_action_error": None}
+            t0 = time.perf_counter()
+            user_content, _ = serialize_payload(payload)
+            stages["serialize"].add(t0)
+            prev_obs = data
+        elif kind == "llm":
+            client.messages.reply = data
+            model = data.get("model") or meta.get("model") or ""
+            t0 = time.perf_counter()
+            try:
+                decide_action(client, "", model, "", "", user_content, stream=args.stream)
+            except (ValueError, RuntimeError):
+                invalid_replies += 1
+            stages["decide"].add(t0)
+        elif kind == "act":
+            acts += 1
+            if data.get("error"):
+                act_errors += 1
+    elapsed = time.perf_counter() - t_start
+
+    size_mb = args.trace.stat().st_size / 1e6
+    print(f"Trace: {args.trace} ({size_mb:.2f} MB on disk) model={meta.get('model')}")
+    for name, timer in stages.items():
+        print(f"  {timer.row(name)}")
+    print(
+        f"Replayed {stages['read'].count} records in {elapsed:.2f}s; "
+        f"differ mismatches={mismatches} invalid replies={invalid_replies} "
+        f"inputs={acts} input errors={act_errors}"
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+"""Fast-model / slow-model routing for agent decisions."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Tuple
+
+from tracing import _percentile
+
+
+CONFIDENCE_PROMPT_ADDENDUM = """
+Also include "confidence": a number from 0 to 1 for how sure you are that
+this action is right given what you know, e.g. {"action": {...}, "confidence": 0.8, "reason": "..."}.
+""".strip()
+
+ESCALATION_TRIGGERS: FrozenSet[str] = frozenset({
+    "first_step",
+    "status",
+    "health",
+    "new_entities",
+    "events",
+    "action_error",
+    "plan",
+    "low_confidence",
+})
+
+FAST_TIER = "fast"
+SLOW_TIER = "slow"
+_LATENCY_WINDOW = 1000  # per-tier latencies kept for the percentiles in TierStats
+
+
+def parse_triggers(spec: str) -> FrozenSet[str]:
+    if spec.strip().lower() == "all":
+        return ESCALATION_TRIGGERS
+    triggers = frozenset(t.strip() for t in spec.split(",") if t.strip())
+    unknown = triggers - ESCALATION_TRIGGERS
+    if unknown:
+        raise ValueError(f"Unknown escalation trigger(s): {', '.join(sorted(unknown))}")
+    return triggers
+
+
+@dataclass
+class TierStats:
+    calls: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+
+    def summary(self) -> str:
+        if not self.latencies:
+            return f"calls={self.calls}"
+        return (
+            f"calls={self.calls} p50={_percentile(self.latencies, 0.5):.2f}s "
+            f"p95={_percentile(self.latencies, 0.95):.2f}s"
+        )
+
+
+@dataclass
+class DecisionRouter:
+    """Pick the model tier for each step.
+
+    Routine steps go to `fast_model`; a step is escalated to `slow_model`
+    when one of the enabled triggers fires. After a fast-tier reply,
+    low_confidence() tells the caller to re-ask the slow model.
+    """
+
+    fast_model: str
+    slow_model: str
+    triggers: FrozenSet[str] = ESCALATION_TRIGGERS
+    min_confidence: float = 0.6
+    stats: Dict[str, TierStats] = field(
+        default_factory=lambda: {FAST_TIER: TierStats(), SLOW_TIER: TierStats()}
+    )
+    escalations: Dict[str, int] = field(default_factory=dict)
+
+    def model_for(self, tier: str) -> str:
+        return self.fast_model if tier == FAST_TIER else self.slow_model
+
+    def route(
+        self,
+        prev_obs: Optional[Dict[str, Any]],
+        obs: Dict[str, Any],
+        diff_text: Optional[str],
+        last_action_error: Optional[str],
+        plan_status: Optional[str] = None,
+    ) -> Tuple[str, List[str]]:
+        """Return (tier, reasons); reasons are the triggers that fired."""
+        fired: List[str] = []
+        if prev_obs is None:
+            fired.append("first_step")
+        else:
+            if prev_obs.get("game_status") != obs.get("game_status"):
+                fired.append("status")
+            ph = prev_obs.get("player", {}).get("health")
+            ch = obs.get("player", {}).get("health")
+            if isinstance(ph, (int, float)) and isinstance(ch, (int, float)) and ch < ph:
+                fired.append("health")
+        if diff_text and " appeared at " in diff_text:
+            fired.append("new_entities")
+        if diff_text and "- Event: " in diff_text:
+            fired.append("events")
+        if last_action_error:
+            fired.append("action_error")
+        if plan_status and not plan_status.startswith("completed"):
+            fired.append("plan")
+        fired = [t for t in fired if t in self.triggers]
+        for trigger in fired:
+            self.escalations[trigger] = self.escalations.get(trigger, 0) + 1
+        return (SLOW_TIER if fired else FAST_TIER), fired
+
+    def low_confidence(self, parsed: Dict[str, Any]) -> bool:
+        if "low_confidence" not in self.triggers:
+            return False
+        confidence = parsed.get("confidence")
+        if not isinstance(confidence, (int, float)):
+            return False
+        if float(confidence) < self.min_confidence:
+            self.escalations["low_confidence"] = self.escalations.get("low_confidence", 0) + 1
+            return True
+        return False
+
+    def record(self, tier: str, latency: float) -> None:
+        stats = self.stats[tier]
+        stats.calls += 1
+        stats.latencies.append(latency)
+
+    def summary(self) -> str:
+        escalations = ", ".join(f"{k}={v}" for k, v in sorted(self.escalations.items())) or "none"
+        return (
+            f"fast[{self.fast_model}] {self.stats[FAST_TIER].summary()}; "
+            f"slow[{self.slow_model}] {self.stats[SLOW_TIER].summary()}; "
+            f"escalations: {escalations}"
+        )
@@ -0,0 +1,6 @@
+"""The game_agent modules are flat scripts, not a package; put them on sys.path for the tests."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
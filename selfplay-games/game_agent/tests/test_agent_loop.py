@@ -0,0 +1,73 @@
+"""End to end: agent.run against an in-process mock_server, recorded and then replayed."""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from argparse import Namespace
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+import agent
+import replay
+from mock_server import MockServer, MockWorld
+from recording import read_trace
+
+REPLY = json.dumps({"action": {"type": "MoveTo", "data": {"position": [3, 0, 4]}}, "reason": "walk to the coin"})
+
+
+@pytest.fixture
+def mock_runtime() -> Iterator[MockServer]:
+    world = MockWorld(Namespace(entities=30, static_entities=5, moving=0.2, tick_rate=60.0, duration=0.0, seed=0))
+    server = MockServer(("127.0.0.1", 0), world, 0.0, 0.0, False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_run_records_a_trace_that_replays_cleanly(
+    tmp_path: Path, monkeypatch, capsys, mock_runtime: MockServer, stream: bool
+) -> None:
+    client = replay.ReplayClient()
+    client.messages.reply = {"text": REPLY}
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-ant-api-test")
+    monkeypatch.delenv("ANTHROPIC_OAUTH_TOKEN", raising=False)
+    monkeypatch.setattr(agent, "Anthropic", lambda **kw: client)
+    monkeypatch.setattr(agent, "sdk_http_client", lambda: None)
+
+    trace = tmp_path / "run.trace.jsonl.gz"
+    argv = [
+        "agent.py",
+        "--api-base", f"http://127.0.0.1:{mock_runtime.server_address[1]}",
+        "--no-breakpoint-before-llm",
+        "--no-anthropic-warmup",
+        "--max-steps", "5",
+        "--sleep", "0",
+        "--map",
+        "--map-cache-dir", str(tmp_path / "maps"),
+        "--record", str(trace),
+        "--conversation-log", str(tmp_path / "conversation.log"),
+    ] + (["--stream"] if stream else [])
+    monkeypatch.setattr(sys, "argv", argv)
+    assert agent.run(agent.parse_args()) == 0
+
+    records = list(read_trace(trace))
+    kinds = [r["k"] for r in records]
+    assert kinds[0] == "meta"
+    assert kinds.count("obs") == 5
+    assert kinds.count("llm") >= 1
+    assert kinds.count("act") >= 1
+    assert all(not r["d"].get("error") for r in records if r["k"] == "act")
+    assert mock_runtime.world.stats["POST /input"] >= 1
+    assert (tmp_path / "conversation.log").read_text().count("RUN_START") == 1
+    capsys.readouterr()
+
+    monkeypatch.setattr(sys, "argv", ["replay.py", str(trace)] + (["--stream"] if stream else []))
+    assert replay.main() == 0
+    out = capsys.readouterr().out
+    assert "differ mismatches=0 invalid replies=0" in out
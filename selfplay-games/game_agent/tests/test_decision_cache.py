@@ -0,0 +1,78 @@
+"""DecisionCache reuse limits and decision_signature normalisation."""
+
+from __future__ import annotations
+
+import decision_cache
+from decision_cache import DecisionCache, decision_signature
+
+WAIT = {"type": "Wait"}
+MOVE = {"type": "MoveTo", "data": {"position": [1, 0, 2]}}
+
+
+def _obs(x: float) -> dict:
+    return {"tick": 5, "player": {"position": [x, 0.0, 0.0], "attributes": {"ViewFovDeg": 70.0}}}
+
+
+def test_state_signature_ignores_jitter_below_the_quantum() -> None:
+    a = decision_signature("state", "", _obs(10.1), MOVE, quantum=1.0)
+    assert decision_signature("state", "", _obs(9.8), MOVE, quantum=1.0) == a
+    assert decision_signature("state", "", _obs(12.0), MOVE, quantum=1.0) != a
+    # The previous action is part of the situation.
+    assert decision_signature("state", "", _obs(10.1), WAIT, quantum=1.0) != a
+
+
+def test_diff_signature_uses_the_diff_text() -> None:
+    a = decision_signature("diff", "No changes.", _obs(1.0), MOVE)
+    assert decision_signature("diff", "No changes.", _obs(50.0), MOVE) == a
+    assert decision_signature("diff", "State changes:\n- x", _obs(1.0), MOVE) != a
+    assert decision_signature("state", "No changes.", _obs(1.0), MOVE) != a
+
+
+def test_hits_until_max_reuse() -> None:
+    cache = DecisionCache(ttl=60.0, max_reuse=2)
+    assert cache.lookup("k") is None
+    cache.store("k", MOVE)
+    assert cache.lookup("k") == MOVE
+    assert cache.lookup("k") == MOVE
+    assert cache.uses("k") == 2
+    assert cache.lookup("k") is None
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.expired) == (2, 2, 1)
+    assert cache.uses("k") == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(decision_cache.time, "monotonic", lambda: now[0])
+    cache = DecisionCache(ttl=10.0, max_reuse=100)
+    cache.store("k", MOVE)
+    now[0] += 10.0
+    assert cache.lookup("k") == MOVE
+    now[0] += 0.1
+    assert cache.lookup("k") is None
+    assert cache.stats.expired == 1
+
+
+def test_noop_action_and_returned_copies() -> None:
+    cache = DecisionCache(noop_action=WAIT)
+    cache.store("k", MOVE)
+    hit = cache.lookup("k")
+    assert hit == WAIT
+    hit["type"] = "Jump"
+    assert cache.lookup("k") == WAIT
+
+    plain = DecisionCache()
+    action = dict(MOVE)
+    plain.store("k", action)
+    action["type"] = "Jump"
+    assert plain.lookup("k") == MOVE
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = DecisionCache(max_entries=2)
+    cache.store("a", WAIT)
+    cache.store("b", MOVE)
+    cache.lookup("a")
+    cache.store("c", MOVE)
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") == WAIT
+    assert cache.lookup("c") == MOVE
@@ -0,0 +1,87 @@
+"""StreamingReplyParser on replies split into arbitrary deltas."""
+
+from __future__ import annotations
+
+import json
+import random
+from typing import List, Optional, Tuple
+
+import pytest
+
+from json_stream import StreamingReplyParser
+
+
+def _run(chunks: List[str]) -> Tuple[Optional[dict], str, Optional[int]]:
+    """(action, concatenated reason deltas, index of the chunk that completed the action)."""
+    parser = StreamingReplyParser()
+    action, at, reason = None, None, []
+    for i, chunk in enumerate(chunks):
+        parser.feed(chunk)
+        early = parser.take_action()
+        if early is not None:
+            assert action is None, "action surfaced twice"
+            action, at = early, i
+        reason.append(parser.take_reason_delta())
+    return action, "".join(reason), at
+
+
+def _split(text: str, rng: random.Random) -> List[str]:
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(1, 12))))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+REPLIES = [
+    {"action": {"type": "MoveTo", "data": {"position": [1.5, 0, -2]}}, "reason": "head for the coin"},
+    {"reason": "quotes \" and \\ and newlines\nand tabs\t", "action": {"type": "Wait"}},
+    {"action": {"type": "Chat", "data": {"text": "braces } { ] [ inside"}}, "reason": "café \U0001f600"},
+    {"meta": {"action": {"type": "Decoy"}, "reason": "nested"}, "action": {"type": "Jump"}, "reason": "ok"},
+    {"confidence": 0.8, "plan": [{"type": "Wait"}], "action": {"type": "Wait", "data": {}}, "reason": ""},
+]
+
+
+@pytest.mark.parametrize("reply", REPLIES)
+@pytest.mark.parametrize("seed", range(5))
+def test_any_chunking_gives_the_json_values(reply: dict, seed: int) -> None:
+    text = json.dumps(reply, ensure_ascii=seed % 2 == 0)
+    action, reason, _ = _run(_split(text, random.Random(seed)))
+    assert action == reply["action"]
+    assert reason == reply["reason"]
+
+
+def test_action_surfaces_before_the_reason_is_generated() -> None:
+    text = '{"action": {"type": "Jump"}, "reason": "because"}'
+    close = text.index("}")  # the action's closing brace
+    action, reason, at = _run([text[:close], text[close], text[close + 1:]])
+    assert action == {"type": "Jump"}
+    assert at == 1
+    assert reason == "because"
+
+
+def test_reason_is_streamed_incrementally() -> None:
+    parser = StreamingReplyParser()
+    parser.feed('{"reason": "hel')
+    assert parser.take_reason_delta() == "hel"
+    parser.feed('lo wor')
+    assert parser.take_reason_delta() == "lo wor"
+    assert parser.take_reason_delta() == ""
+    parser.feed('ld", "action": {"type": "Wait"}}')
+    assert parser.take_reason_delta() == "ld"
+    assert parser.take_action() == {"type": "Wait"}
+    assert parser.done
+
+
+def test_text_before_the_object_is_skipped() -> None:
+    action, reason, _ = _run(['```json\n{"action": {"type": "Wa', 'it"}, "reason": "x"}\n```'])
+    assert action == {"type": "Wait"}
+    assert reason == "x"
+
+
+def test_non_object_action_is_not_surfaced() -> None:
+    action, _, _ = _run(['{"action": "Wait", "reason": "r"}'])
+    assert action is None
+
+
+def test_escaped_surrogate_pair_split_across_deltas() -> None:
+    action, reason, _ = _run(['{"reason": "a\\ud8', '3d\\ude', '00b", "action": {"type": "Wait"}}'])
+    assert reason == "a\U0001f600b"
+    assert action == {"type": "Wait"}
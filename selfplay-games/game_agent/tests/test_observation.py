@@ -0,0 +1,152 @@
+"""ObservationDiffer against the reference diff_observations."""
+
+from __future__ import annotations
+
+import copy
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+from observation import ObservationDiffer, diff_observations
+
+
+def _obs(entities: List[Dict[str, Any]], **extra: Any) -> Dict[str, Any]:
+    obs = {
+        "tick": 1,
+        "game_status": "active",
+        "player": {"position": [0, 0, 0], "health": 100, "attributes": {}},
+        "other_players": [],
+        "world": {"entities": entities},
+        "events": [],
+    }
+    obs.update(extra)
+    return obs
+
+
+def _entity(rng: random.Random, i: int) -> Dict[str, Any]:
+    e: Dict[str, Any] = {
+        "id": i if rng.random() < 0.5 else f"e{i}",
+        "name": rng.choice(["Part", "Coin", "HumanoidRootPart", "Wall"]),
+        "position": [rng.uniform(-50, 50) for _ in range(3)],
+    }
+    if rng.random() < 0.7:
+        e["size"] = [rng.uniform(0, 5) for _ in range(3)]
+    if rng.random() < 0.5:
+        e["attributes"] = {"A": rng.randint(0, 2), "ViewFovDeg": 1}
+    return e
+
+
+def _mutate(rng: random.Random, obs: Dict[str, Any]) -> Dict[str, Any]:
+    out = copy.deepcopy(obs)
+    entities = out["world"]["entities"]
+    for e in entities:
+        r = rng.random()
+        if r < 0.2:
+            e["position"][0] += rng.choice([0.01, 0.04, 0.06, 1.0])
+        elif r < 0.3 and "size" in e:
+            e["size"][1] += 0.2
+        elif r < 0.4:
+            e.setdefault("attributes", {})["A"] = rng.randint(0, 3)
+    if rng.random() < 0.3 and entities:
+        entities.pop(rng.randrange(len(entities)))
+    if rng.random() < 0.3:
+        entities.append(_entity(rng, rng.randint(100, 200)))
+    if rng.random() < 0.2:
+        rng.shuffle(entities)
+    return out
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference_diff(seed: int) -> None:
+    rng = random.Random(seed)
+    entities: Dict[Any, Dict[str, Any]] = {}
+    for i in range(rng.randint(0, 30)):
+        e = _entity(rng, i)
+        entities.setdefault(e["id"], e)
+    prev = _obs(list(entities.values()))
+    differ = ObservationDiffer()
+    differ.reset(prev)
+    for _ in range(5):
+        curr = _mutate(rng, prev)
+        assert differ.diff(curr) == diff_observations(prev, curr)
+        prev = curr
+
+
+def test_first_diff_without_baseline_is_empty() -> None:
+    differ = ObservationDiffer()
+    assert differ.diff(_obs([{"id": 1, "name": "Part", "position": [0, 0, 0]}])) == "No changes."
+
+
+def test_membership_and_grouping() -> None:
+    differ = ObservationDiffer()
+    differ.reset(_obs([
+        {"id": 1, "name": "Coin", "position": [0, 0, 0]},
+        {"id": 2, "name": "Wall", "position": [5, 0, 0], "size": [1, 1, 1]},
+    ]))
+    text = differ.diff(
+        _obs([
+            {"id": 2, "name": "Wall", "position": [6, 0, 0], "size": [1, 2, 1], "attributes": {"Open": True}},
+            {"id": 3, "name": "Coin", "position": [1, 2, 3]},
+        ]),
+        grouped=True,
+    )
+    assert text.splitlines() == [
+        "State changes (grouped by entity):",
+        "- Coin removed",
+        "- Coin appeared at (1, 2, 3)",
+        "- Wall#2: position (5, 0, 0) -> (6, 0, 0); size (1, 1, 1) -> (1, 2, 1); Open None -> True",
+    ]
+
+
+def test_shown_set_hides_entities_leaving_the_view() -> None:
+    entities = [{"id": i, "name": f"Part{i}", "position": [i, 0, 0]} for i in range(3)]
+    differ = ObservationDiffer()
+    differ.reset(_obs(entities), shown={0, 1, 2})
+    moved = copy.deepcopy(entities)
+    moved[2]["position"] = [9, 0, 0]
+    # Entity 2 moved but is no longer shown: neither the move nor a removal is reported.
+    assert differ.diff(_obs(moved[:2] + [moved[2]]), shown={0, 1}) == "No changes."
+    # An entity that was never shown is not reported as removed.
+    assert differ.diff(_obs(moved[:2]), shown={0, 1}) == "No changes."
+
+
+def test_epsilon_filters_jitter_and_keeps_real_moves_visible() -> None:
+    differ = ObservationDiffer(epsilon=0.05)
+    differ.reset(_obs([{"id": 1, "name": "Ball", "position": [1.0, 0.0, 0.0]}]))
+    assert differ.diff(_obs([{"id": 1, "name": "Ball", "position": [1.04, 0.0, 0.0]}])) == "No changes."
+    # Only 0.06 from the baseline, which the default 1-decimal rounding would print as 1.0 -> 1.1.
+    text = differ.diff(_obs([{"id": 1, "name": "Ball", "position": [1.1, 0.0, 0.0]}]))
+    assert text == "State changes:\n- Ball position: (1.04, 0.0, 0.0) -> (1.1, 0.0, 0.0)"
+
+
+def test_epsilon_never_reports_an_unchanged_looking_value() -> None:
+    rng = random.Random(7)
+    differ = ObservationDiffer(epsilon=0.3)
+    prev = _obs([{"id": i, "name": "P", "position": [rng.uniform(-5, 5) for _ in range(3)]} for i in range(50)])
+    differ.reset(prev)
+    for _ in range(20):
+        curr = copy.deepcopy(prev)
+        for e in curr["world"]["entities"]:
+            e["position"] = [x + rng.uniform(-0.5, 0.5) for x in e["position"]]
+        for line in differ.diff(curr).splitlines()[1:]:
+            before, after = line.split(": ", 1)[1].split(" -> ")
+            assert before != after, line
+        prev = curr
+
+
+def test_ragged_positions_fall_back_to_reference() -> None:
+    prev = _obs([{"id": 1, "name": "Part", "position": [0, 0, 0]}])
+    curr = _obs([{"id": 1, "name": "Part", "position": [0, 1]}])
+    differ = ObservationDiffer()
+    differ.reset(prev)
+    assert differ.diff(curr) == diff_observations(prev, curr)
+
+
+def test_row_index_is_reused_for_an_unchanged_layout() -> None:
+    differ = ObservationDiffer()
+    entities = [{"id": i, "name": "Part", "position": [i, 0, 0]} for i in range(4)]
+    differ.reset(_obs(entities))
+    rows = differ._prev_index.rows
+    differ.diff(_obs(copy.deepcopy(entities)))
+    assert differ._prev_index.rows is rows
@@ -0,0 +1,130 @@
+"""RateLimiter pacing, priorities and 429 handling."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from rate_limit import (
+    CHAT,
+    GAMEPLAY,
+    INPUT,
+    OBSERVE,
+    RateLimiter,
+    endpoint_class,
+    parse_retry_after,
+    send_limited,
+)
+
+
+@pytest.mark.parametrize(
+    "path,bucket",
+    [
+        ("/observe", GAMEPLAY),
+        ("/api/v1/games/g/input?x=1", GAMEPLAY),
+        ("/api/v1/games/g/chat/messages", GAMEPLAY),
+        ("/api/v1/games/g/chat", CHAT),
+        ("/api/v1/games/g/chat/voice/", CHAT),
+        ("/join", None),
+        ("/api/v1/games/g/map", None),
+    ],
+)
+def test_endpoint_class(path: str, bucket: str) -> None:
+    assert endpoint_class(path) == bucket
+
+
+def test_parse_retry_after() -> None:
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+    assert parse_retry_after(None) is None
+
+
+def test_burst_then_nominal_rate() -> None:
+    limiter = RateLimiter({"g": (100.0, 5.0)}, reserve=0.0)
+    started = time.monotonic()
+    for _ in range(5):
+        assert limiter.acquire("g") < 0.01
+    for _ in range(10):
+        limiter.acquire("g")
+    assert time.monotonic() - started >= 0.09
+    assert limiter.stats.granted == {"g": 15}
+
+
+def test_unknown_bucket_is_unmetered() -> None:
+    limiter = RateLimiter({"g": (1.0, 1.0)})
+    assert limiter.acquire("other") == 0.0
+    assert limiter.stats.granted == {}
+
+
+def test_lower_priority_leaves_a_reserve_for_inputs() -> None:
+    limiter = RateLimiter({"g": (1.0, 3.0)}, reserve=2.0)
+    limiter.acquire("g", OBSERVE)
+    # Two tokens left: an observe needs 1 + reserve, an input only 1.
+    with pytest.raises(TimeoutError):
+        limiter.acquire("g", OBSERVE, timeout=0.05)
+    assert limiter.acquire("g", INPUT, timeout=0.05) < 0.05
+    # The timed-out observe no longer holds a place in the queue.
+    assert limiter.acquire("g", INPUT, timeout=0.05) < 0.05
+
+
+def test_429_pauses_and_halves_the_rate_then_recovers() -> None:
+    limiter = RateLimiter({"g": (100.0, 10.0)}, recovery=0.25)
+    limiter.on_response("g", 429, "0.1")
+    assert limiter.current_rate("g") == 50.0
+    started = time.monotonic()
+    limiter.acquire("g")
+    assert time.monotonic() - started >= 0.09
+    assert limiter.stats.throttled == {"g": 1}
+    limiter.on_response("g", 200)
+    assert limiter.current_rate("g") == 75.0
+    limiter.on_response("g", 200)
+    limiter.on_response("g", 200)
+    assert limiter.current_rate("g") == 100.0
+
+
+def test_429_rate_never_drops_below_the_floor() -> None:
+    limiter = RateLimiter({"g": (10.0, 1.0)}, min_rate_fraction=0.2)
+    for _ in range(10):
+        limiter.on_response("g", 429, "0")
+    assert limiter.current_rate("g") == 2.0
+
+
+def test_acquire_async_paces_coroutines() -> None:
+    limiter = RateLimiter({"g": (100.0, 2.0)}, reserve=0.0)
+
+    async def run() -> float:
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire_async("g") for _ in range(6)))
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.035
+    assert limiter.stats.granted == {"g": 6}
+
+
+def test_send_limited_retries_429() -> None:
+    limiter = RateLimiter({"g": (1000.0, 10.0)}, reserve=0.0)
+    statuses = iter([429, 429, 200])
+    calls = []
+
+    def send() -> SimpleNamespace:
+        calls.append(1)
+        return SimpleNamespace(status_code=next(statuses), headers={"Retry-After": "0"})
+
+    assert send_limited(limiter, "g", INPUT, send).status_code == 200
+    assert len(calls) == 3
+
+
+def test_send_limited_gives_up_after_max_retries() -> None:
+    limiter = RateLimiter({"g": (1000.0, 10.0)}, reserve=0.0)
+    calls = []
+
+    def send() -> SimpleNamespace:
+        calls.append(1)
+        return SimpleNamespace(status_code=429, headers={"Retry-After": "0"})
+
+    assert send_limited(limiter, "g", INPUT, send, max_retries=2).status_code == 429
+    assert len(calls) == 3
@@ -0,0 +1,109 @@
+"""TraceRecorder/read_trace round trips and replay.py over a synthetic trace."""
+
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+import replay
+from agent import decide_action
+from recording import TRACE_VERSION, TraceRecorder, read_trace
+
+
+def _obs(x: float) -> dict:
+    return {
+        "tick": int(x * 10),
+        "game_status": "active",
+        "player": {"position": [x, 0.0, 0.0], "health": 100},
+        "world": {"entities": [{"id": 1, "name": "Coin", "position": [5.0, 0.0, x]}]},
+    }
+
+
+REPLY = '{"action": {"type": "MoveTo", "data": {"position": [5, 0, 1]}}, "reason": "grab the coin"}'
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    recorder = TraceRecorder(tmp_path / "run.trace.jsonl.gz", meta={"model": "m"})
+    recorder.record("obs", 1, _obs(1.0))
+    recorder.record("act", 1, {"action": {"type": "Wait"}, "error": None})
+    recorder.close()
+    recorder.close()
+    recorder.record("obs", 2, _obs(2.0))  # ignored after close
+
+    records = list(read_trace(recorder.path))
+    assert [r["k"] for r in records] == ["meta", "obs", "act"]
+    assert records[0]["d"] == {"version": TRACE_VERSION, "model": "m"}
+    assert records[1]["step"] == 1 and records[1]["d"] == _obs(1.0)
+    assert all(r["t"] >= 0 for r in records)
+    assert recorder.records == 3
+
+
+def test_plain_jsonl_traces_are_read_too(tmp_path: Path) -> None:
+    path = tmp_path / "run.trace.jsonl"
+    path.write_text('{"k": "meta", "step": null, "t": 0, "d": {}}\n\n{"k": "obs", "step": 1, "t": 0.1, "d": {}}\n')
+    assert [r["k"] for r in read_trace(path)] == ["meta", "obs"]
+
+
+def test_concurrent_writers_produce_whole_lines(tmp_path: Path) -> None:
+    recorder = TraceRecorder(tmp_path / "t.jsonl.gz")
+
+    def write(worker: int) -> None:
+        for i in range(200):
+            recorder.record("act", i, {"worker": worker, "pad": "x" * 100})
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    recorder.close()
+    acts = [r for r in read_trace(recorder.path) if r["k"] == "act"]
+    assert len(acts) == 800
+    assert {r["d"]["worker"] for r in acts} == {0, 1, 2, 3}
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_replay_client_feeds_decide_action(stream: bool) -> None:
+    client = replay.ReplayClient()
+    client.messages.reply = {"text": REPLY, "usage": {"input_tokens": 12, "output_tokens": 7}}
+    decision = decide_action(client, "", "m", "", "", "{}", stream=stream)
+    assert decision.action == {"type": "MoveTo", "data": {"position": [5, 0, 1]}}
+    assert decision.reason == "grab the coin"
+    assert decision.usage.get("input_tokens") == 12
+    if stream:
+        assert decision.ttft is not None and decision.action_latency is not None
+
+
+def _write_trace(path: Path, replies: list) -> None:
+    recorder = TraceRecorder(path, meta={"model": "m"})
+    for step, reply in enumerate(replies, 1):
+        recorder.record("obs", step, _obs(float(step)))
+        recorder.record("llm", step, {"model": "m", "text": reply, "latency": 0.1, "usage": {}})
+        recorder.record("act", step, {"action": {"type": "Wait"}, "error": None if step % 2 else "HTTP 429"})
+    recorder.close()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_replay_main_reports_stages(tmp_path: Path, monkeypatch, capsys, stream: bool) -> None:
+    path = tmp_path / "run.trace.jsonl.gz"
+    _write_trace(path, [REPLY, REPLY, "not json at all", REPLY])
+    monkeypatch.setattr(sys, "argv", ["replay.py", str(path)] + (["--stream"] if stream else []))
+    assert replay.main() == 0
+    out = capsys.readouterr().out
+    assert "Replayed 13 records" in out
+    assert "differ mismatches=0 invalid replies=1 inputs=4 input errors=2" in out
+    decide_row = next(line for line in out.splitlines() if line.strip().startswith("decide"))
+    assert "n=4 " in decide_row
+
+
+def test_replay_main_fails_on_differ_mismatch(tmp_path: Path, monkeypatch, capsys) -> None:
+    path = tmp_path / "run.trace.jsonl.gz"
+    _write_trace(path, [REPLY, REPLY])
+    monkeypatch.setattr(replay.ObservationDiffer, "diff", lambda self, obs, **kw: "bogus")
+    monkeypatch.setattr(sys, "argv", ["replay.py", str(path), "--show-mismatches", "1"])
+    assert replay.main() == 1
+    assert "--- mismatch at step 2" in capsys.readouterr().out
+
@@ -0,0 +1,103 @@
+"""TickTracker freshness classification, rate/offset estimation and resets."""
+
+from __future__ import annotations
+
+import pytest
+
+from ticks import TickStats, TickTracker
+
+T0 = 1000.0  # our monotonic clock when the server was at tick 0
+RATE = 30.0
+
+
+def feed(tracker: TickTracker, ticks, latency: float = 0.01, start: float = 0.0):
+    """Observe each tick as if the server produced it at T0 + tick / RATE."""
+    samples = []
+    for tick in ticks:
+        produced = T0 + start + tick / RATE
+        samples.append(tracker.update({"tick": tick}, produced - latency, produced + latency))
+    return samples
+
+
+def test_fresh_wasted_and_skipped() -> None:
+    tracker = TickTracker()
+    samples = feed(tracker, [1, 1, 2, 5, 5, 6])
+    assert [s.fresh for s in samples] == [True, False, True, True, False, True]
+    assert [s.advanced for s in samples] == [0, 0, 1, 3, 0, 1]
+    assert tracker.last_tick == 6
+    stats = tracker.stats
+    assert (stats.observes, stats.fresh, stats.wasted, stats.skipped_ticks) == (6, 4, 2, 2)
+
+
+def test_untagged_observations_count_as_fresh() -> None:
+    tracker = TickTracker()
+    for obs in ({}, {"tick": None}, {"tick": True}, ["not", "a", "dict"]):
+        sample = tracker.update(obs, 0.0, 0.1)
+        assert sample.tick is None and sample.fresh and sample.age == 0.0
+    assert (tracker.stats.untagged, tracker.stats.fresh) == (4, 4)
+    assert tracker.last_tick is None
+
+
+def test_nominal_rate_until_min_span() -> None:
+    tracker = TickTracker(nominal_rate=60.0, min_span=2.0)
+    feed(tracker, range(0, 30, 3))  # one second of history
+    assert tracker.rate() == 60.0
+    assert tracker.clock_offset() is None
+    assert tracker.next_fresh_at() == pytest.approx(T0 + 27 / RATE + 0.01 + 1 / 60.0)
+    assert all(age == 0.0 for age in tracker.stats.ages) and not tracker.stats.ages
+
+
+def test_measures_rate_and_clock_offset() -> None:
+    tracker = TickTracker(min_span=2.0)
+    # Sparse polling: a sample every half second with symmetric jitter-free latency.
+    feed(tracker, range(0, 15 * 30, 15))
+    assert tracker.rate() == pytest.approx(RATE)
+    # The least-delayed reply arrived `latency` after the tick was produced.
+    assert tracker.clock_offset() == pytest.approx(T0 + 0.01)
+    assert tracker.tick_time(60) == pytest.approx(T0 + 2.0 + 0.01)
+    assert tracker.age(60, now=T0 + 3.0) == pytest.approx(1.0 - 0.01)
+    assert tracker.age(None) == 0.0
+    assert tracker.next_fresh_at() == pytest.approx(T0 + 0.01 + (435 + 1) / RATE)
+
+
+def test_ages_measure_delay_beyond_best_round_trip() -> None:
+    tracker = TickTracker(min_span=2.0)
+    feed(tracker, range(0, 90, 15))
+    punctual = feed(tracker, [90, 105])
+    assert [s.age for s in punctual] == pytest.approx([0.0, 0.0])
+    # A reply delayed by an extra 0.25s; it is also the newest sample, so it
+    # nudges the measured rate and the age comes out a little lower.
+    late = tracker.update({"tick": 120}, T0 + 4.0 - 0.01, T0 + 4.0 + 0.26)
+    assert late.fresh
+    assert 0.15 < late.age <= 0.25
+    assert tracker.stats.ages[-1] == late.age
+
+
+def test_tick_going_backwards_resets_the_clock_model() -> None:
+    tracker = TickTracker(min_span=2.0)
+    feed(tracker, range(0, 150, 15))
+    assert tracker.clock_offset() is not None
+    sample = tracker.update({"tick": 3}, T0 + 20.0, T0 + 20.01)
+    assert sample.fresh and sample.advanced == 0
+    assert tracker.stats.resets == 1
+    assert tracker.last_tick == 3
+    assert tracker.clock_offset() is None
+    assert tracker.rate() == tracker.nominal_rate
+
+
+def test_sample_window_is_bounded() -> None:
+    tracker = TickTracker(window=10, min_span=0.1)
+    feed(tracker, range(0, 3000, 15))
+    assert len(tracker._samples) == 10
+    assert tracker.rate() == pytest.approx(RATE)
+
+
+def test_summary() -> None:
+    assert TickStats().summary() == "no observes"
+    tracker = TickTracker(min_span=2.0)
+    feed(tracker, [0, 0, 15, 30, 30, 45, 60, 75])
+    text = tracker.summary()
+    assert text.startswith("8 observes: 6 fresh, 2 wasted (25%)")
+    assert "mean 15.0 ticks between fresh observes" in text
+    assert "tick rate ~30.0/s" in text
+    assert "obs age p50=0ms" in text
@@ -0,0 +1,78 @@
+"""Table wire format rendering and WireFormatStats."""
+
+from __future__ import annotations
+
+from wire_format import ENTITY_COLUMNS, WireFormatStats, format_observation_table, format_payload_table
+
+OBS = {
+    "tick": 42,
+    "game_status": "active",
+    "player": {"id": "me", "position": [1.234, 0.0, -2.5], "health": 100, "attributes": {"Coins": 3, "ViewFovDeg": 70}},
+    "other_players": [{"id": "p2", "position": [3, 4, 5], "health": 50.5, "attributes": {}}],
+    "world": {
+        "entities": [
+            {"id": 7, "name": "Coin", "position": [1.0, 2.0, 3.0], "size": [0.5, 0.5, 0.5], "anchored": True},
+            {"id": 8, "name": "HumanoidRootPart", "position": [0, 0, 0]},
+            {"id": 9, "name": "Sign|board", "position": [0, 1, 0], "attributes": {"Text": "a;b", "RenderRole": "x"}},
+        ]
+    },
+    "events": [],
+}
+
+
+def test_observation_table() -> None:
+    assert format_observation_table(OBS).splitlines() == [
+        "game_status: active",
+        "you (id|x|y|z|health|attrs): me|1.23|0|-2.5|100|Coins=3",
+        "other_players (id|x|y|z|health|attrs): 1",
+        "p2|3|4|5|50.5|",
+        f"entities ({ENTITY_COLUMNS}): 2",
+        "7|Coin|1|2|3|0.5|0.5|0.5|anchored=1",
+        "9|Sign/board|0|1|0||||Text=a,b",
+        "events: []",
+    ]
+
+
+def test_payload_table_sections() -> None:
+    text = format_payload_table({
+        "state_changes": "State changes (grouped by entity):\n- Coin#7: position (1, 2, 3) -> (1, 2, 4)",
+        "other_entities": [{"name": "Coin", "count": 12, "nearest": 30.456, "directions": {"N": 8, "E": 4}}],
+        "newly_relevant": [{"id": 3, "name": "Door", "position": [1, 1, 1]}],
+        "last_action_error": None,
+        "instruction": "Reply with JSON.",
+    })
+    assert text.splitlines() == [
+        "state_changes:",
+        "State changes (grouped by entity):",
+        "- Coin#7: position (1, 2, 3) -> (1, 2, 4)",
+        "other_entities (name|count|nearest|directions):",
+        "Coin|12|30.46|N:8,E:4",
+        f"newly_relevant ({ENTITY_COLUMNS}): 1",
+        "3|Door|1|1|1||||",
+        "last_action_error: none",
+        "Reply with JSON.",
+    ]
+
+
+def test_observation_payload_is_rendered_as_a_table() -> None:
+    text = format_payload_table({"observation": OBS, "last_action_error": "blocked"})
+    assert text.startswith("observation:\ngame_status: active\n")
+    assert text.endswith("\nlast_action_error: blocked")
+
+
+def test_stats_summary() -> None:
+    stats = WireFormatStats("table")
+    assert "ttft n/a" in stats.summary()
+    stats.record({"input_tokens": 100, "cache_read_input_tokens": 900}, 0.5)
+    stats.record({"input_tokens": 200, "cache_creation_input_tokens": 800}, None)
+    stats.invalid += 2
+    assert stats.summary() == "format=table replies=4 valid=50% prompt_tokens mean=1000 ttft p50=0.50s"
+
+
+def test_stats_keep_a_bounded_ttft_window() -> None:
+    stats = WireFormatStats("json")
+    for i in range(5000):
+        stats.record({"input_tokens": 1}, i / 1000)
+    assert len(stats.ttfts) == 1000
+    assert stats.input_tokens == 5000
+    assert "ttft p50=4.50s" in stats.summary()
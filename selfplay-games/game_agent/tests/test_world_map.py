@@ -0,0 +1,170 @@
+"""WorldMap queries against brute force, MoveTo validation and the /map cache."""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from world_map import (
+    MapPart,
+    WorldMap,
+    _segment_enters,
+    attach_map,
+    load_map,
+    map_entities,
+    validated_move,
+)
+
+FLOOR = {"id": 1, "name": "Floor", "position": [0, -0.5, 0], "size": [100, 1, 100]}
+WALL = {"id": 2, "name": "Wall", "position": [10, 5, 0], "size": [2, 10, 20]}
+STEP = {"id": 3, "name": "Step", "position": [-10, 0.5, 0], "size": [4, 1, 4]}
+PAYLOAD = {"entities": [FLOOR, WALL, STEP, {"id": 4, "name": "Folder"}]}
+
+
+@pytest.fixture
+def world() -> WorldMap:
+    return WorldMap.from_payload(PAYLOAD, cell=8.0)
+
+
+def test_map_entities_accepts_every_payload_shape() -> None:
+    assert map_entities(PAYLOAD) == PAYLOAD["entities"]
+    assert map_entities({"world": PAYLOAD}) == PAYLOAD["entities"]
+    assert map_entities([FLOOR, "junk"]) == [FLOOR]
+    assert map_entities("nope") == []
+
+
+def test_parts_without_a_box_are_skipped(world: WorldMap) -> None:
+    assert len(world) == 3
+    assert world.parts[1] == MapPart(2, "Wall", (9.0, 0.0, -10.0), (11.0, 10.0, 10.0))
+
+
+def test_ground_queries(world: WorldMap) -> None:
+    assert [p.id for p in world.parts_at(10, 0)] == [2, 1]
+    assert world.ground_at(10, 0, below=0.0).id == 1
+    assert world.ground_at(-10, 0).id == 3
+    assert world.ground_at(80, 80) is None
+
+
+def test_move_target_checks(world: WorldMap) -> None:
+    assert world.check_move_target([0, 0, 0]) is None
+    assert world.check_move_target([-10, 0, 0]) is None  # a 1-unit step is walkable
+    assert world.check_move_target([10, 0, 0]) == "inside Wall#2"
+    assert world.check_move_target([80, 0, 80]) == "no ground under target"
+    assert WorldMap([]).check_move_target([80, 0, 80]) is None
+
+
+def test_validated_target_snaps_out_of_the_wall(world: WorldMap) -> None:
+    target, problem = world.validated_target([10, 0, 0], snap_radius=3.0, from_y=0.0)
+    assert problem == "inside Wall#2"
+    assert world.check_move_target(target, 0.0) is None
+    assert abs(target[0] - 10) <= 3.0
+    # Nothing valid within reach: the original target is kept.
+    assert world.validated_target([80, 0, 80], snap_radius=2.0) == ([80, 0, 80], "no ground under target")
+
+
+def test_validated_move_only_touches_move_to(world: WorldMap) -> None:
+    data = {"position": [10, 0, 0], "speed": 2}
+    checked, problem = validated_move(world, "MoveTo", data, snap_radius=3.0, from_y=0.0)
+    assert problem == "inside Wall#2"
+    assert checked["speed"] == 2 and checked["position"] != data["position"]
+    assert data == {"position": [10, 0, 0], "speed": 2}
+    ok = {"position": [0, 0, 0]}
+    assert validated_move(world, "MoveTo", ok, snap_radius=3.0) == (ok, None)
+    assert validated_move(world, "Jump", data, snap_radius=3.0) == (data, None)
+    assert validated_move(None, "MoveTo", data, snap_radius=3.0) == (data, None)
+    assert validated_move(world, "MoveTo", None, snap_radius=3.0) == (None, None)
+
+
+def test_line_of_sight(world: WorldMap) -> None:
+    assert world.line_of_sight([0, 1, 0], [20, 1, 0]).id == 2
+    assert world.line_of_sight([0, 12, 0], [20, 12, 0]) is None  # over the wall
+    assert world.line_of_sight([-40, 0, 30], [40, 0, 30]) is None  # grazing the floor top
+    assert world.line_of_sight([0, 1, 0], [20, 1, 0], ignore={2}) is None
+
+
+def _random_world(seed: int) -> WorldMap:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(60):
+        lo = [rng.uniform(-60, 60), rng.uniform(-5, 5), rng.uniform(-60, 60)]
+        size = [rng.uniform(0.5, 20), rng.uniform(0.5, 10), rng.uniform(0.5, 20)]
+        parts.append(MapPart(i, "P", tuple(lo), tuple(a + s for a, s in zip(lo, size))))
+    return WorldMap(parts, cell=7.0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grid_queries_match_brute_force(seed: int) -> None:
+    world = _random_world(seed)
+    rng = random.Random(seed + 100)
+    for _ in range(50):
+        x, z, r = rng.uniform(-70, 70), rng.uniform(-70, 70), rng.uniform(0, 25)
+        assert {p.id for _, p in world.near(x, z, r)} == {p.id for p in world.parts if p.distance_xz(x, z) <= r}
+        assert {p.id for p in world.parts_at(x, z)} == {p.id for p in world.parts if p.contains_xz(x, z)}
+        a = [x, rng.uniform(-5, 5), z]
+        b = [rng.uniform(-70, 70), rng.uniform(-5, 5), rng.uniform(-70, 70)]
+        d = tuple(bv - av for av, bv in zip(a, b))
+        hits = [(t, p.id) for p in world.parts if (t := _segment_enters(p, tuple(a), d)) is not None]
+        blocker = world.line_of_sight(a, b)
+        assert (blocker.id if blocker else None) == (min(hits)[1] if hits else None)
+
+
+def test_describe_around(world: WorldMap) -> None:
+    text = world.describe_around([0, 0, 0], radius=12.0)
+    assert text.splitlines() == [
+        "standing on Floor#1 (top y=0.0)",
+        "Wall#2 center=(10,0) size=2x20 y=0.0..10.0",
+        "Step#3 center=(-10,0) size=4x4 y=0.0..1.0",
+    ]
+
+
+def test_load_map_caches_by_content(tmp_path: Path) -> None:
+    raw = json.dumps(PAYLOAD).encode()
+    first = load_map("http://srv:1/game", lambda: raw, cache_dir=tmp_path)
+    assert first.source == "fetched" and len(first.world_map) == 3
+    assert first.path.parent.parent == tmp_path
+    # Same content, different formatting: served as cache.
+    again = load_map("http://srv:1/game", lambda: json.dumps(PAYLOAD, indent=2).encode(), cache_dir=tmp_path)
+    assert (again.source, again.content_hash) == ("cache", first.content_hash)
+    # The server restarted into another game under the same key.
+    changed = load_map("http://srv:1/game", lambda: json.dumps({"entities": [FLOOR]}).encode(), cache_dir=tmp_path)
+    assert changed.source == "fetched" and changed.content_hash != first.content_hash
+    assert (first.path.parent / "LATEST").read_text() == changed.content_hash
+    assert load_map("http://srv:1/game", lambda: raw, cache_dir=tmp_path).source == "fetched"
+
+
+@pytest.fixture
+def map_server() -> Iterator[str]:
+    body = json.dumps(PAYLOAD).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            status = 200 if self.path == "/map" else 404
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body) if status == 200 else 0))
+            self.end_headers()
+            if status == 200:
+                self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_attach_map(tmp_path: Path, map_server: str) -> None:
+    logged: List[str] = []
+    world = attach_map(f"{map_server}/map", "local", logged.append, cache_dir=tmp_path)
+    assert world is not None and len(world) == 3
+    assert attach_map(f"{map_server}/missing", "local", logged.append, cache_dir=tmp_path) is None
+    assert logged[0] == "3 static parts (fetched)"
+    assert logged[1].startswith("unavailable: HTTP Error 404")
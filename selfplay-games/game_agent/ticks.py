@@ -0,0 +1,191 @@
+"""Tick tracking for /observe: dedupe repeated ticks, estimate server tick rate and clock offset."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from tracing import _percentile
+
+NOMINAL_TICK_RATE = 60.0
+_AGE_WINDOW = 1000  # fresh-observation ages kept for the percentiles in TickStats
+
+
+@dataclass
+class TickSample:
+    tick: Optional[int]
+    fresh: bool  # tick advanced since the last fresh observation (or no tick at all)
+    advanced: int  # ticks since the last fresh observation
+    received_at: float  # time.monotonic() when the response arrived
+    age: float  # estimated seconds between the server producing this tick and received_at
+
+
+@dataclass
+class TickStats:
+    observes: int = 0
+    fresh: int = 0
+    wasted: int = 0  # same (or older) tick as the last fresh observation
+    untagged: int = 0  # responses without a tick
+    skipped_ticks: int = 0  # ticks that advanced between two fresh observations, minus one each
+    resets: int = 0  # tick went backwards (server restart, round reset)
+    ages: Deque[float] = field(default_factory=lambda: deque(maxlen=_AGE_WINDOW))
+
+    def summary(self, rate: Optional[float] = None, uptime: Optional[float] = None) -> str:
+        if not self.observes:
+            return "no observes"
+        parts = [
+            f"{self.observes} observes: {self.fresh} fresh, {self.wasted} wasted "
+            f"({self.wasted / self.observes:.0%})"
+        ]
+        if self.untagged:
+            parts.append(f"{self.untagged} without tick")
+        if self.resets:
+            parts.append(f"{self.resets} tick resets")
+        if self.fresh > 1:
+            parts.append(f"mean {1 + self.skipped_ticks / (self.fresh - 1):.1f} ticks between fresh observes")
+        if rate is not None:
+            parts.append(f"tick rate ~{rate:.1f}/s")
+        if uptime is not None:
+            parts.append(f"server at tick 0 {uptime:.1f}s before we started")
+        if self.ages:
+            parts.append(f"obs age p50={_percentile(self.ages, 0.5) * 1000:.0f}ms p95={_percentile(self.ages, 0.95) * 1000:.0f}ms")
+        return ", ".join(parts)
+
+
+class TickTracker:
+    """Follows the `tick` field of /observe responses. Thread-safe.
+
+    - update() classifies each response as fresh (tick advanced) or wasted,
+      so callers can skip diffing, logging and the LLM for repeats.
+    - The server clock is modelled as tick = rate * (t - t0) on our
+      time.monotonic(). Each response pins its tick to somewhere between
+      sending the request and receiving the reply; the lower envelope of
+      (t_received - tick / rate) over a sliding window is the least-delayed
+      estimate of t0, and the rate is the slope between the oldest and newest
+      samples of that window. Until `min_span` seconds of history exist,
+      pacing uses the nominal 60/s and ages are reported as 0.
+    - Ages are relative to that least-delayed response, so they measure
+      staleness beyond the best observed round trip, not absolute age.
+    - A tick lower than the last fresh one means the server restarted or
+      reset the round: the clock model starts over and the response counts
+      as fresh.
+    - age() is how long ago (in our clock) the server produced a tick;
+      next_fresh_at() is when a new tick should be observable, for pollers
+      that want to wait for fresh state instead of sleeping blindly.
+    """
+
+    def __init__(self, nominal_rate: float = NOMINAL_TICK_RATE, window: int = 120, min_span: float = 2.0):
+        self.nominal_rate = nominal_rate
+        self.min_span = min_span
+        self.stats = TickStats()
+        self._samples: Deque[Tuple[float, float, int]] = deque(maxlen=window)  # (sent_at, received_at, tick)
+        self._last_fresh_tick: Optional[int] = None
+        self._last_fresh_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._created = time.monotonic()
+
+    @property
+    def last_tick(self) -> Optional[int]:
+        return self._last_fresh_tick
+
+    def rate(self) -> float:
+        with self._lock:
+            return self._rate_locked()
+
+    def _rate_locked(self) -> float:
+        measured = self._measured_rate_locked()
+        return measured if measured is not None else self.nominal_rate
+
+    def _measured_rate_locked(self) -> Optional[float]:
+        if len(self._samples) < 2:
+            return None
+        s0, s1 = self._samples[0], self._samples[-1]
+        span = s1[1] - s0[1]
+        dticks = s1[2] - s0[2]
+        if span < self.min_span or dticks <= 0:
+            return None
+        # Midpoints of the request windows cancel most of the latency bias.
+        mid_span = (s1[0] + s1[1]) / 2 - (s0[0] + s0[1]) / 2
+        return dticks / mid_span if mid_span > 0 else None
+
+    def _t0_locked(self, rate: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        # The tick existed no later than the reply arrived; the smallest
+        # received_at - tick/rate is the tightest bound on when tick 0 was.
+        return min(received - tick / rate for _, received, tick in self._samples)
+
+    def clock_offset(self) -> Optional[float]:
+        """Estimated time.monotonic() at which the server was at tick 0 (None until the rate is measured)."""
+        with self._lock:
+            rate = self._measured_rate_locked()
+            return None if rate is None else self._t0_locked(rate)
+
+    def tick_time(self, tick: int) -> Optional[float]:
+        """Estimated time.monotonic() at which the server produced `tick`."""
+        with self._lock:
+            rate = self._measured_rate_locked()
+            t0 = None if rate is None else self._t0_locked(rate)
+        return None if t0 is None or rate is None else t0 + tick / rate
+
+    def age(self, tick: Optional[int], now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        if tick is None:
+            return 0.0
+        produced = self.tick_time(tick)
+        return max(0.0, now - produced) if produced is not None else 0.0
+
+    def next_fresh_at(self) -> Optional[float]:
+        """When a tick newer than the last fresh one should be observable, if known."""
+        with self._lock:
+            if self._last_fresh_at is None or self._last_fresh_tick is None:
+                return None
+            rate = self._measured_rate_locked()
+            if rate is None:
+                return self._last_fresh_at + 1.0 / self.nominal_rate
+            t0 = self._t0_locked(rate)
+            assert t0 is not None
+            # t0 is the least-delayed arrival estimate, so this is when the
+            # next tick arrives with the best round trip seen so far.
+            return max(self._last_fresh_at, t0 + (self._last_fresh_tick + 1) / rate)
+
+    def update(self, obs: Dict[str, Any], sent_at: float, received_at: float) -> TickSample:
+        tick = obs.get("tick") if isinstance(obs, dict) else None
+        with self._lock:
+            self.stats.observes += 1
+            if not isinstance(tick, int) or isinstance(tick, bool):
+                self.stats.untagged += 1
+                self.stats.fresh += 1
+                return TickSample(None, True, 0, received_at, 0.0)
+            last = self._last_fresh_tick
+            if last is not None and tick < last:
+                self.stats.resets += 1
+                self._samples.clear()
+                self._last_fresh_tick = None
+                self._last_fresh_at = None
+                last = None
+            self._samples.append((sent_at, received_at, tick))
+            fresh = last is None or tick > last
+            advanced = 0 if last is None else max(0, tick - last)
+            if fresh:
+                self.stats.fresh += 1
+                if last is not None:
+                    self.stats.skipped_ticks += advanced - 1
+                self._last_fresh_tick = tick
+                self._last_fresh_at = received_at
+            else:
+                self.stats.wasted += 1
+            # A wrong rate skews every age, so report 0 until it is measured.
+            rate = self._measured_rate_locked()
+            t0 = None if rate is None else self._t0_locked(rate)
+            age = max(0.0, received_at - (t0 + tick / rate)) if t0 is not None and rate is not None else 0.0
+            if fresh and rate is not None:
+                self.stats.ages.append(age)
+        return TickSample(tick, fresh, advanced, received_at, age)
+
+    def summary(self) -> str:
+        t0 = self.clock_offset()
+        return self.stats.summary(self.rate(), None if t0 is None else self._created - t0)
@@ -0,0 +1,149 @@
+"""Span-based latency tracing for the agent loop."""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, TextIO
+
+QUANTILES = (0.5, 0.95, 0.99)
+PROMETHEUS_METRIC = "clawblox_agent_stage_latency_seconds"
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (q in [0, 1]); `values` must be non-empty."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Tracer:
+    """Record (step, stage, start, end) spans.
+
+    Every span goes to a rolling per-stage window (the last `window`
+    durations) used for p50/p95/p99, and, when `trace_path` is set, to a
+    JSONL trace with monotonic timestamps. With `prometheus_path`, the
+    percentiles are also exported as a Prometheus textfile at most every
+    `export_interval` seconds and on close(). Safe to use from the
+    pipeline worker threads.
+    """
+
+    def __init__(
+        self,
+        trace_path: Optional[Path] = None,
+        window: int = 1000,
+        prometheus_path: Optional[Path] = None,
+        export_interval: float = 10.0,
+    ) -> None:
+        self.window = window
+        self.prometheus_path = prometheus_path
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        self._durations: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, List[float]] = {}  # stage -> [count, sum]
+        self._trace: Optional[TextIO] = None
+        if trace_path is not None:
+            self._trace = trace_path.open("w", encoding="utf-8")
+        self._last_export = time.monotonic()
+        # Set by the SIGUSR1 handler; the next record() prints the summary.
+        self._summary_requested = threading.Event()
+
+    @contextmanager
+    def span(self, stage: str, step: Optional[int], **attrs: Any) -> Iterator[Dict[str, Any]]:
+        """Time the enclosed block. Attributes added to the yielded dict are traced too."""
+        start = time.monotonic()
+        try:
+            yield attrs
+        finally:
+            self.record(stage, step, start, time.monotonic(), **attrs)
+
+    def record(self, stage: str, step: Optional[int], start: float, end: float, **attrs: Any) -> None:
+        duration = end - start
+        line = None
+        if self._trace is not None:
+            span = {"step": step, "stage": stage, "start": round(start, 6), "end": round(end, 6), "dur": round(duration, 6)}
+            span.update(attrs)
+            line = json.dumps(span, ensure_ascii=True, default=str)
+        with self._lock:
+            window = self._durations.get(stage)
+            if window is None:
+                window = self._durations[stage] = deque(maxlen=self.window)
+                self._totals[stage] = [0, 0.0]
+            window.append(duration)
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += duration
+            if line is not None and self._trace is not None:
+                self._trace.write(line + "\n")
+        if self.prometheus_path is not None and end - self._last_export >= self.export_interval:
+            self.export_prometheus()
+        if self._summary_requested.is_set():
+            self._summary_requested.clear()
+            self.print_summary(file=sys.stderr)
+
+    def _snapshot(self) -> Dict[str, tuple]:
+        with self._lock:
+            return {
+                stage: (sorted(window), self._totals[stage][0], self._totals[stage][1])
+                for stage, window in self._durations.items()
+            }
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for stage, (ordered, count, _) in self._snapshot().items():
+            if not ordered:
+                continue
+            p50, p95, p99 = (_percentile(ordered, q) * 1e3 for q in QUANTILES)
+            lines.append(f"{stage:<14} n={count:<6} p50={p50:9.1f}ms p95={p95:9.1f}ms p99={p99:9.1f}ms")
+        return lines
+
+    def print_summary(self, file: TextIO = sys.stdout) -> None:
+        print(f"Stage latency (last {self.window} spans per stage):", file=file)
+        for line in self.summary_lines():
+            print(f"  {line}", file=file)
+
+    def export_prometheus(self) -> None:
+        if self.prometheus_path is None:
+            return
+        self._last_export = time.monotonic()
+        out = [
+            f"# HELP {PROMETHEUS_METRIC} Agent loop stage latency.",
+            f"# TYPE {PROMETHEUS_METRIC} summary",
+        ]
+        for stage, (ordered, count, total) in self._snapshot().items():
+            for q in QUANTILES:
+                value = _percentile(ordered, q) if ordered else float("nan")
+                out.append(f'{PROMETHEUS_METRIC}{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            out.append(f'{PROMETHEUS_METRIC}_sum{{stage="{stage}"}} {total:.6f}')
+            out.append(f'{PROMETHEUS_METRIC}_count{{stage="{stage}"}} {count}')
+        # Write-then-rename so the node exporter never reads a partial file.
+        tmp = self.prometheus_path.with_name(self.prometheus_path.name + ".tmp")
+        tmp.write_text("\n".join(out) + "\n", encoding="utf-8")
+        os.replace(tmp, self.prometheus_path)
+
+    def install_signal_handler(self) -> None:
+        """Print the histogram summary after the next span following SIGUSR1 (where available).
+
+        The handler only sets a flag: it runs on the main thread, possibly
+        inside record() while _lock is held, so it must not take the lock.
+        """
+        if not hasattr(signal, "SIGUSR1"):
+            return
+
+        def _handler(signum: int, frame: Any) -> None:
+            self._summary_requested.set()
+
+        signal.signal(signal.SIGUSR1, _handler)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+        self.export_prometheus()
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import http.client
+import queue
+import select
+import socket
+import threading
+import urllib.parse
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+# Errors that mean a pooled keep-alive connection was closed by the peer
+# between requests. A request is retried once on a fresh connection if it
+# failed before it was sent, or if it is idempotent (_RETRY_AFTER_SEND).
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+# Methods that may be re-sent after the server might already have seen them.
+# POST /input is not: a resent action could be applied twice.
+_RETRY_AFTER_SEND = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class TransportError(RuntimeError):
+    """Network-level failure (connect, send or receive)."""
+
+
+@dataclass
+class HTTPResponse:
+    status: int
+    body: bytes
+    headers: Dict[str, str]
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+@dataclass
+class TransportStats:
+    connections_opened: int = 0
+    requests_served: int = 0
+    stale_retries: int = 0
+
+    def reuse_ratio(self) -> float:
+        if self.requests_served == 0:
+            return 0.0
+        return 1.0 - (self.connections_opened / self.requests_served)
+
+    def summary(self) -> str:
+        return (
+            f"{self.requests_served} requests over {self.connections_opened} connections "
+            f"(reuse {self.reuse_ratio():.0%}, stale retries {self.stale_retries})"
+        )
+
+
+class _HostPool:
+    def __init__(self, max_connections: int):
+        self.idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max_connections)
+
+
+def _idle_socket_alive(conn: http.client.HTTPConnection) -> bool:
+    # An idle keep-alive socket should have nothing to read; readable
+    # means the server sent EOF (or garbage) while it sat in the pool.
+    if conn.sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return False
+    return not readable
+
+
+class KeepAliveTransport:
+    """Thread-safe HTTP/1.1 client that keeps connections open between requests.
+
+    - Connections are pooled per (scheme, host, port); by default one per host.
+    - A request checks out an idle connection (or opens one), and returns it
+      to the pool once the response body has been fully read.
+    - An idle connection is probed before reuse and dropped if the peer
+      already closed it. If a reused connection still fails, the request is
+      retried once on a fresh connection when it failed while sending, or
+      when the method is idempotent; a POST that may have reached the
+      server is never sent twice.
+    - `stats` counts connections opened vs. requests served, to verify reuse.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_connections_per_host: int = 1,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.stats = TransportStats()
+        self._pools: Dict[Tuple[str, str, int], _HostPool] = {}
+        self._lock = threading.Lock()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> HTTPResponse:
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme or "http"
+        if scheme not in ("http", "https"):
+            raise TransportError(f"Unsupported URL scheme: {url}")
+        host = parsed.hostname or "localhost"
+        port = parsed.port or (443 if scheme == "https" else 80)
+        target = parsed.path or "/"
+        if parsed.query:
+            target = f"{target}?{parsed.query}"
+
+        key = (scheme, host, port)
+        pool = self._pool(key)
+        pool.slots.acquire()
+        try:
+            return self._request_with_retry(key, pool, method, target, body, headers or {}, timeout)
+        finally:
+            pool.slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            while True:
+                try:
+                    conn = pool.idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+
+    def _pool(self, key: Tuple[str, str, int]) -> _HostPool:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = _HostPool(self.max_connections_per_host)
+                self._pools[key] = pool
+            return pool
+
+    def _open(self, key: Tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        conn: http.client.HTTPConnection
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=self.connect_timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.connect_timeout)
+        try:
+            conn.connect()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise TransportError(f"connect to {host}:{port} failed: {e}") from e
+        if conn.sock is not None:
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn.sock.settimeout(self.read_timeout)
+        with self._lock:
+            self.stats.connections_opened += 1
+        return conn
+
+    def _checkout(self, key: Tuple[str, str, int], pool: _HostPool) -> Tuple[http.client.HTTPConnection, bool]:
+        while True:
+            try:
+                conn = pool.idle.get_nowait()
+            except queue.Empty:
+                return self._open(key), False
+            if _idle_socket_alive(conn):
+                return conn, True
+            conn.close()
+
+    def _request_with_retry(
+        self,
+        key: Tuple[str, str, int],
+        pool: _HostPool,
+        method: str,
+        target: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+        timeout: Optional[float],
+    ) -> HTTPResponse:
+        conn, reused = self._checkout(key, pool)
+        while True:
+            sent = False
+            try:
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout if timeout is not None else self.read_timeout)
+                conn.request(method, target, body=body, headers=headers)
+                sent = True
+                resp = conn.getresponse()
+                payload = resp.read()
+            except _STALE_CONNECTION_ERRORS as e:
+                conn.close()
+                if not reused or (sent and method.upper() not in _RETRY_AFTER_SEND):
+                    raise TransportError(f"{method} {target}: {e}") from e
+                with self._lock:
+                    self.stats.stale_retries += 1
+                conn, reused = self._open(key), False
+                continue
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise TransportError(f"{method} {target}: {e}") from e
+            break
+
+        with self._lock:
+            self.stats.requests_served += 1
+        if resp.will_close:
+            conn.close()
+        else:
+            pool.idle.put(conn)
+        return HTTPResponse(
+            status=resp.status,
+            body=payload,
+            headers={k.lower(): v for k, v in resp.getheaders()},
+        )
@@ -0,0 +1,257 @@
+"""Content-addressed cache of synthesized speech, shared by every TTS caller.
+
+Audio is keyed by sha256 of (text, voice_id, model_id, output_format,
+voice_settings), so a line synthesized once by any script is reused by the
+others. Entries live on disk under ~/.clawblox/tts (LRU by last use, capped
+at `max_bytes`) with a small in-memory tier for the hottest lines. PCM
+entries are memory-mapped rather than read, so a hit can go straight to a
+playback buffer or an upload without a copy.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+DEFAULT_CACHE_DIR = Path.home() / ".clawblox" / "tts"
+
+AudioData = Union[bytes, memoryview]
+
+
+def tts_key(
+    text: str,
+    voice_id: str,
+    model_id: str,
+    output_format: str,
+    voice_settings: Optional[Any] = None,
+) -> str:
+    """Cache key for one synthesis request; whitespace runs in `text` don't matter."""
+    if voice_settings is not None and not isinstance(voice_settings, dict):
+        # elevenlabs.VoiceSettings is a pydantic model
+        voice_settings = voice_settings.model_dump(exclude_none=True)
+    canonical = json.dumps(
+        {
+            "text": " ".join(text.split()),
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "output_format": output_format,
+            "voice_settings": voice_settings,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _extension(output_format: str) -> str:
+    # "mp3_44100_128" -> "mp3", "pcm_16000" -> "pcm"
+    return output_format.split("_", 1)[0] or "bin"
+
+
+@dataclass
+class TtsCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    bytes_served: int = 0  # audio returned from the cache instead of synthesized
+
+    def summary(self) -> str:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        if not lookups:
+            return "no lookups"
+        hits = self.memory_hits + self.disk_hits
+        return (
+            f"{hits}/{lookups} hits ({hits / lookups:.0%}; memory {self.memory_hits}, disk {self.disk_hits}), "
+            f"{self.stores} stored, {self.evictions} evicted, {self.bytes_served / 1024:.0f} KiB served"
+        )
+
+
+@dataclass
+class TtsAudio:
+    data: AudioData  # memoryview over an mmap for PCM hits, bytes otherwise
+    key: str
+    source: str  # "memory", "disk" or "synthesized"
+
+
+class TtsCache:
+    """Disk LRU + in-memory hot tier. Thread-safe; several processes may share `cache_dir`.
+
+    - Files are <dir>/<key[:2]>/<key>.<ext>, written via a temp file and
+      os.replace, so readers never see partial audio.
+    - A hit touches the file's mtime; when the directory grows past
+      `max_bytes`, the least recently used files are removed. Other
+      processes' writes are picked up on the next rescan (`rescan_every`).
+    - The memory tier keeps up to `memory_bytes` of recent entries.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        max_bytes: int = 256 * 1024 * 1024,
+        memory_bytes: int = 16 * 1024 * 1024,
+        rescan_every: float = 300.0,
+    ):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.rescan_every = rescan_every
+        self.stats = TtsCacheStats()
+        self._memory: "OrderedDict[str, AudioData]" = OrderedDict()
+        self._memory_size = 0
+        self._index: Dict[Path, Tuple[float, int]] = {}  # path -> (last use, size)
+        self._disk_size = 0
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str, output_format: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.{_extension(output_format)}"
+
+    def get(self, key: str, output_format: str) -> Optional[TtsAudio]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                self.stats.bytes_served += len(data)
+                return TtsAudio(data, key, "memory")
+        path = self.path_for(key, output_format)
+        try:
+            data = self._read(path, output_format)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # ValueError: mmap of an empty file (a writer crashed mid-way on another OS)
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        with self._lock:
+            self.stats.disk_hits += 1
+            self.stats.bytes_served += len(data)
+            if path not in self._index:
+                self._disk_size += len(data)  # written by another process since the last scan
+            self._index[path] = (time.time(), len(data))
+            self._remember(key, data)
+        return TtsAudio(data, key, "disk")
+
+    def put(self, key: str, output_format: str, audio: AudioData) -> TtsAudio:
+        """Store synthesized audio and return it as it will be served from now on."""
+        path = self.path_for(key, output_format)
+        if len(audio):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(audio)
+            os.replace(tmp, path)
+            data = self._read(path, output_format)
+        else:
+            data = bytes(audio)
+        with self._lock:
+            self.stats.stores += 1
+            if len(audio):
+                old = self._index.get(path)
+                self._disk_size += len(audio) - (old[1] if old else 0)
+                self._index[path] = (time.time(), len(audio))
+                self._remember(key, data)
+            self._evict_locked()
+        return TtsAudio(data, key, "synthesized")
+
+    def synthesize(
+        self,
+        synth: Callable[[], Iterable[bytes]],
+        text: str,
+        voice_id: str,
+        model_id: str,
+        output_format: str,
+        voice_settings: Optional[Any] = None,
+    ) -> TtsAudio:
+        """Return cached audio for the request, calling `synth()` (chunks) only on a miss."""
+        key = tts_key(text, voice_id, model_id, output_format, voice_settings)
+        cached = self.get(key, output_format)
+        if cached is not None:
+            return cached
+        return self.put(key, output_format, b"".join(synth()))
+
+    def convert(self, client: Any, **kwargs: Any) -> TtsAudio:
+        """Drop-in for `client.text_to_speech.convert(**kwargs)` that returns the whole clip."""
+        return self.synthesize(
+            lambda: client.text_to_speech.convert(**kwargs),
+            kwargs["text"],
+            kwargs["voice_id"],
+            kwargs.get("model_id") or "",
+            kwargs.get("output_format") or "",
+            kwargs.get("voice_settings"),
+        )
+
+    @staticmethod
+    def _read(path: Path, output_format: str) -> AudioData:
+        if _extension(output_format) != "pcm":
+            return path.read_bytes()
+        with open(path, "rb") as f:
+            # The mapping stays valid after the file is closed (or evicted).
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _remember(self, key: str, data: AudioData) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_size -= len(dropped)
+
+    def _scan_locked(self) -> None:
+        self._index.clear()
+        self._disk_size = 0
+        if self.cache_dir.is_dir():
+            for sub in os.scandir(self.cache_dir):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(".tmp") or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    self._index[Path(entry.path)] = (st.st_mtime, st.st_size)
+                    self._disk_size += st.st_size
+        self._scanned_at = time.monotonic()
+
+    def _evict_locked(self) -> None:
+        if not self._scanned_at or time.monotonic() - self._scanned_at > self.rescan_every:
+            self._scan_locked()
+        if self._disk_size <= self.max_bytes:
+            return
+        for path, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._disk_size <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # e.g. still mapped on Windows; try again next time
+            del self._index[path]
+            self._disk_size -= size
+            self.stats.evictions += 1
+
+
+_shared_cache: Optional[TtsCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> TtsCache:
+    """Process-wide cache in DEFAULT_CACHE_DIR (or $TTS_CACHE_DIR)."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = TtsCache(Path(os.environ.get("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR))
+        return _shared_cache
@@ -0,0 +1,250 @@
+"""Pre-warmed WebSockets for the ElevenLabs multi-stream-input endpoint.
+
+Opening a TTS socket costs a TLS + WebSocket handshake: a few hundred ms on
+a good link, seconds on a bad one. `TtsSocketPool` keeps `spares` open
+sockets per endpoint (voice, model, output format), so the caller that
+needs one takes a socket that is already connected. A maintenance thread:
+
+- replaces spares that the server closed (ElevenLabs drops sockets that
+  see no text for `inactivity_timeout` seconds) or that stopped answering
+  keepalive pings;
+- retires spares `refresh_margin` seconds before the server's idle
+  timeout, opening the replacement before closing the old socket;
+- tops the pool back up after every acquire.
+
+A socket handed out by acquire() belongs to the caller; pass it to
+discard() when it is no longer wanted.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+import websockets.sync.client
+from websockets.protocol import State
+
+DEFAULT_BASE_URL = "wss://api.elevenlabs.io"
+# Longest idle period ElevenLabs allows before closing a socket (seconds).
+DEFAULT_INACTIVITY_TIMEOUT = 180
+
+# How often the maintenance thread looks at its spares when nothing wakes it.
+_CHECK_EVERY = 1.0
+# Background reconnect backoff after a failed handshake (seconds).
+_RETRY_MIN = 1.0
+_RETRY_MAX = 30.0
+
+ClientConnection = websockets.sync.client.ClientConnection
+
+
+@dataclass(frozen=True)
+class TtsEndpoint:
+    voice_id: str
+    model_id: str
+    output_format: str
+
+    def uri(self, base_url: str = DEFAULT_BASE_URL, inactivity_timeout: int = DEFAULT_INACTIVITY_TIMEOUT) -> str:
+        return (
+            f"{base_url}/v1/text-to-speech/{self.voice_id}/multi-stream-input"
+            f"?model_id={self.model_id}&output_format={self.output_format}"
+            f"&inactivity_timeout={inactivity_timeout}"
+        )
+
+
+@dataclass
+class TtsPoolStats:
+    warm: int = 0  # acquires served by a spare
+    cold: int = 0  # acquires that had to handshake inline
+    handshakes: int = 0
+    handshake_seconds: float = 0.0
+    closed: int = 0  # spares found closed (server idle timeout, failed keepalive)
+    refreshed: int = 0  # spares retired ahead of the server's idle timeout
+    failures: int = 0  # background handshakes that failed
+
+    def summary(self) -> str:
+        acquires = self.warm + self.cold
+        if not acquires:
+            return "no acquires"
+        avg = self.handshake_seconds / self.handshakes if self.handshakes else 0.0
+        return (
+            f"{self.warm}/{acquires} warm, {self.handshakes} handshakes (avg {avg:.2f}s), "
+            f"{self.closed} closed by server, {self.refreshed} refreshed, {self.failures} failed"
+        )
+
+
+@dataclass
+class _Spare:
+    ws: ClientConnection
+    opened_at: float
+
+
+def is_open(ws: ClientConnection) -> bool:
+    return ws.state is State.OPEN
+
+
+def _quiet_close(ws: ClientConnection) -> None:
+    try:
+        ws.close()
+    except Exception:
+        pass
+
+
+class TtsSocketPool:
+    """Warm spare sockets per TtsEndpoint, maintained by a background thread. Thread-safe."""
+
+    def __init__(
+        self,
+        api_key: str,
+        spares: int = 1,
+        base_url: str = DEFAULT_BASE_URL,
+        inactivity_timeout: int = DEFAULT_INACTIVITY_TIMEOUT,
+        refresh_margin: float = 30.0,
+        ping_interval: float = 10.0,
+        ping_timeout: float = 10.0,
+        open_timeout: float = 15.0,
+    ):
+        self.api_key = api_key
+        self.spares = spares
+        self.base_url = base_url
+        self.inactivity_timeout = inactivity_timeout
+        self.refresh_after = max(1.0, inactivity_timeout - refresh_margin)
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.open_timeout = open_timeout
+        self.stats = TtsPoolStats()
+        self._spares: Dict[TtsEndpoint, List[_Spare]] = defaultdict(list)
+        self._wanted: Set[TtsEndpoint] = set()
+        self._retry_at: Dict[TtsEndpoint, float] = {}
+        self._backoff: Dict[TtsEndpoint, float] = {}
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def prewarm(self, endpoint: TtsEndpoint) -> None:
+        """Start keeping spares for `endpoint` (returns immediately)."""
+        with self._cond:
+            if self._closed:
+                return
+            self._wanted.add(endpoint)
+            self._dirty = True
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._maintain, daemon=True, name="tts-pool")
+                self._thread.start()
+
+    def acquire(self, endpoint: TtsEndpoint) -> ClientConnection:
+        """An open socket for `endpoint`: a spare if one is ready, else a fresh handshake."""
+        self.prewarm(endpoint)
+        with self._cond:
+            spares = self._spares[endpoint]
+            while spares:
+                spare = spares.pop()  # newest first
+                if is_open(spare.ws):
+                    self.stats.warm += 1
+                    self._dirty = True
+                    self._cond.notify()
+                    return spare.ws
+                self._note_closed_locked(endpoint, spare.ws)
+            self.stats.cold += 1
+        return self._connect(endpoint)
+
+    def discard(self, ws: ClientConnection) -> None:
+        """Close a socket obtained from acquire()."""
+        _quiet_close(ws)
+
+    def is_stale(self, active_at: float) -> bool:
+        """Whether a socket last used at `active_at` (monotonic) is near the server's idle timeout."""
+        return time.monotonic() - active_at > self.refresh_after
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            spares = [s for lst in self._spares.values() for s in lst]
+            self._spares.clear()
+            self._cond.notify()
+            thread = self._thread
+        for spare in spares:
+            _quiet_close(spare.ws)
+        if thread is not None:
+            thread.join(timeout=1)
+
+    def _connect(self, endpoint: TtsEndpoint) -> ClientConnection:
+        t0 = time.monotonic()
+        ws = websockets.sync.client.connect(
+            endpoint.uri(self.base_url, self.inactivity_timeout),
+            additional_headers={"xi-api-key": self.api_key},
+            max_size=16 * 1024 * 1024,
+            open_timeout=self.open_timeout,
+            close_timeout=3,
+            ping_interval=self.ping_interval,
+            ping_timeout=self.ping_timeout,
+        )
+        with self._cond:
+            self.stats.handshakes += 1
+            self.stats.handshake_seconds += time.monotonic() - t0
+        return ws
+
+    def _note_closed_locked(self, endpoint: TtsEndpoint, ws: ClientConnection) -> None:
+        self.stats.closed += 1
+        reason = f" {ws.close_reason}" if ws.close_reason else ""
+        print(f"[tts-pool] spare for {endpoint.voice_id} closed (code {ws.close_code}{reason})")
+
+    # -- maintenance thread --------------------------------------------------
+
+    def _maintain(self) -> None:
+        while True:
+            with self._cond:
+                if not self._dirty and not self._closed:
+                    self._cond.wait(timeout=_CHECK_EVERY)
+                self._dirty = False
+                if self._closed:
+                    return
+                now = time.monotonic()
+                needed: Dict[TtsEndpoint, int] = {}
+                for endpoint in self._wanted:
+                    spares = self._spares[endpoint]
+                    for spare in [s for s in spares if not is_open(s.ws)]:
+                        spares.remove(spare)
+                        self._note_closed_locked(endpoint, spare.ws)
+                    fresh = sum(1 for s in spares if now - s.opened_at < self.refresh_after)
+                    if fresh < self.spares and now >= self._retry_at.get(endpoint, 0.0):
+                        needed[endpoint] = self.spares - fresh
+            for endpoint, count in needed.items():
+                for _ in range(count):
+                    if not self._replenish(endpoint):
+                        break
+
+    def _replenish(self, endpoint: TtsEndpoint) -> bool:
+        try:
+            ws = self._connect(endpoint)
+        except Exception as exc:
+            with self._cond:
+                self.stats.failures += 1
+                backoff = min(_RETRY_MAX, self._backoff.get(endpoint, _RETRY_MIN / 2) * 2)
+                self._backoff[endpoint] = backoff
+                self._retry_at[endpoint] = time.monotonic() + backoff
+            print(f"[tts-pool] connect failed for {endpoint.voice_id}: {exc} (retry in {backoff:.0f}s)")
+            return False
+        now = time.monotonic()
+        stale: Optional[_Spare] = None
+        with self._cond:
+            self._backoff.pop(endpoint, None)
+            self._retry_at.pop(endpoint, None)
+            if self._closed:
+                stale = _Spare(ws, now)
+            else:
+                spares = self._spares[endpoint]
+                spares.append(_Spare(ws, now))
+                # The replacement is up; now retire the oldest spare past its refresh age.
+                old = [s for s in spares if now - s.opened_at >= self.refresh_after]
+                if old:
+                    stale = min(old, key=lambda s: s.opened_at)
+                    spares.remove(stale)
+                    self.stats.refreshed += 1
+        if stale is not None:
+            _quiet_close(stale.ws)
+        return True
@@ -0,0 +1,148 @@
+"""Compact tabular prompt format, as an alternative to JSON payloads."""
+
+from __future__ import annotations
+
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from observation import _IGNORED_ATTRIBUTES, _IGNORED_ENTITY_NAMES
+from tracing import _percentile
+
+WIRE_FORMATS = ("json", "table")
+
+TABLE_PROMPT_ADDENDUM = """
+Observations arrive as compact text instead of JSON. Each table starts with
+a header naming its "|"-separated columns and the row count, e.g.
+"entities (id|name|x|y|z|sx|sy|sz|extra): 42", followed by one row per item;
+"extra" and "attrs" hold k=v pairs separated by ";". Changes are listed one
+line per entity as "Name#id: change; change". Still reply with the JSON object only.
+""".strip()
+
+ENTITY_COLUMNS = "id|name|x|y|z|sx|sy|sz|extra"
+PLAYER_COLUMNS = "id|x|y|z|health|attrs"
+_ENTITY_CORE = frozenset({"id", "name", "position", "size", "attributes"})
+_TTFT_WINDOW = 1000  # TTFTs kept for the p50 in WireFormatStats
+
+
+def _num(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".") or "0"
+    return str(value)
+
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return _num(value)
+    if isinstance(value, str):
+        return value.replace("|", "/").replace(";", ",").replace("\n", " ")
+    return json.dumps(value, ensure_ascii=True, separators=(",", ":"))
+
+
+def _xyz(value: Any) -> List[str]:
+    if isinstance(value, list) and len(value) >= 3:
+        return [_num(v) for v in value[:3]]
+    return ["", "", ""]
+
+
+def _attrs(attrs: Any) -> str:
+    if not isinstance(attrs, dict):
+        return ""
+    return ";".join(f"{k}={_scalar(v)}" for k, v in attrs.items() if k not in _IGNORED_ATTRIBUTES)
+
+
+def _player_row(p: Dict[str, Any]) -> str:
+    return "|".join([str(p.get("id", "")), *_xyz(p.get("position")), _scalar(p.get("health", "")), _attrs(p.get("attributes"))])
+
+
+def _entity_row(e: Dict[str, Any]) -> str:
+    extra = [f"{k}={_scalar(v)}" for k, v in e.items() if k not in _ENTITY_CORE]
+    attrs = _attrs(e.get("attributes"))
+    if attrs:
+        extra.append(attrs)
+    return "|".join([str(e.get("id", "")), _scalar(e.get("name", "")), *_xyz(e.get("position")), *_xyz(e.get("size")), ";".join(extra)])
+
+
+def format_observation_table(obs: Dict[str, Any]) -> str:
+    """Observation as a schema header plus one row per entity.
+
+    Same filtering as clean_observation (tick, ignored attributes and
+    entities dropped). Entity keys other than id/name/position/size/
+    attributes (entity_type, color, material, anchored, ...) go into the
+    `extra` column as k=v pairs, so nothing is lost.
+    """
+    lines = [f"game_status: {obs.get('game_status')}"]
+    player = obs.get("player")
+    if isinstance(player, dict):
+        lines.append(f"you ({PLAYER_COLUMNS}): {_player_row(player)}")
+    others = obs.get("other_players") or []
+    lines.append(f"other_players ({PLAYER_COLUMNS}): {len(others)}")
+    lines.extend(_player_row(p) for p in others if isinstance(p, dict))
+    entities = [
+        e for e in obs.get("world", {}).get("entities", [])
+        if isinstance(e, dict) and e.get("name") not in _IGNORED_ENTITY_NAMES
+    ]
+    lines.append(f"entities ({ENTITY_COLUMNS}): {len(entities)}")
+    lines.extend(_entity_row(e) for e in entities)
+    for key, value in obs.items():
+        if key not in ("tick", "game_status", "player", "other_players", "world"):
+            lines.append(f"{key}: {_scalar(value)}")
+    return "\n".join(lines)
+
+
+def format_payload_table(payload: Dict[str, Any]) -> str:
+    """Render a user payload (the dict run() would JSON-encode) as compact text."""
+    sections: List[str] = []
+    for key, value in payload.items():
+        if key == "observation" and isinstance(value, dict):
+            sections.append("observation:\n" + format_observation_table(value))
+        elif key == "other_entities" and isinstance(value, list):
+            rows = [
+                f"{g.get('name')}|{g.get('count')}|{_num(g.get('nearest'))}|"
+                + ",".join(f"{d}:{n}" for d, n in g.get("directions", {}).items())
+                for g in value
+            ]
+            sections.append("other_entities (name|count|nearest|directions):\n" + "\n".join(rows))
+        elif key == "newly_relevant" and isinstance(value, list):
+            rows = [_entity_row(e) for e in value if isinstance(e, dict) and e.get("name") not in _IGNORED_ENTITY_NAMES]
+            sections.append(f"newly_relevant ({ENTITY_COLUMNS}): {len(rows)}\n" + "\n".join(rows))
+        elif key == "instruction":
+            sections.append(str(value))
+        elif isinstance(value, str) and "\n" in value:
+            sections.append(f"{key}:\n{value}")
+        else:
+            sections.append(f"{key}: {'none' if value is None else _scalar(value)}")
+    return "\n".join(sections)
+
+
+@dataclass
+class WireFormatStats:
+    """Prompt tokens, TTFT and action validity for one wire format."""
+
+    wire_format: str
+    valid: int = 0
+    invalid: int = 0
+    input_tokens: int = 0  # summed over valid replies
+    ttfts: Deque[float] = field(default_factory=lambda: deque(maxlen=_TTFT_WINDOW))
+
+    def record(self, usage: Dict[str, int], ttft: Optional[float]) -> None:
+        self.valid += 1
+        prompt = usage.get("input_tokens", 0) + usage.get("cache_read_input_tokens", 0) + usage.get(
+            "cache_creation_input_tokens", 0
+        )
+        self.input_tokens += prompt
+        if ttft is not None:
+            self.ttfts.append(ttft)
+
+    def summary(self) -> str:
+        total = self.valid + self.invalid
+        validity = self.valid / total if total else 0.0
+        mean_tokens = self.input_tokens / self.valid if self.valid else 0.0
+        ttft = f"ttft p50={_percentile(self.ttfts, 0.5):.2f}s" if self.ttfts else "ttft n/a (non-streamed)"
+        return (
+            f"format={self.wire_format} replies={total} valid={validity:.0%} "
+            f"prompt_tokens mean={mean_tokens:.0f} {ttft}"
+        )
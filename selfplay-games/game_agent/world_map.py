@@ -0,0 +1,380 @@
+"""Static map geometry from GET /map: on-disk cache plus a uniform-grid spatial index.
+
+observe() only returns dynamic entities; anchored geometry (floors, walls,
+platforms) is served once per game by /map. `load_map` caches it under
+~/.clawblox/maps/<server>_<game>/<sha256>.json, checking every fetch
+against the cached hash; `WorldMap` indexes part AABBs on an XZ grid for
+point, radius and line-of-sight queries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_CACHE_DIR = Path.home() / ".clawblox" / "maps"
+
+_EPS = 1e-6
+
+
+@dataclass(frozen=True)
+class MapPart:
+    id: Any
+    name: str
+    lo: Tuple[float, float, float]
+    hi: Tuple[float, float, float]
+
+    @property
+    def top(self) -> float:
+        return self.hi[1]
+
+    def contains_xz(self, x: float, z: float) -> bool:
+        return self.lo[0] <= x <= self.hi[0] and self.lo[2] <= z <= self.hi[2]
+
+    def distance_xz(self, x: float, z: float) -> float:
+        dx = max(self.lo[0] - x, 0.0, x - self.hi[0])
+        dz = max(self.lo[2] - z, 0.0, z - self.hi[2])
+        return math.hypot(dx, dz)
+
+    def label(self) -> str:
+        return f"{self.name}#{self.id}"
+
+
+def _part_from_entity(e: Dict[str, Any]) -> Optional[MapPart]:
+    pos, size = e.get("position"), e.get("size")
+    if not (isinstance(pos, list) and isinstance(size, list) and len(pos) >= 3 and len(size) >= 3):
+        return None  # folders, models without a bounding box
+    # Rotation is ignored: the AABB of an unrotated part. Good enough for
+    # floors and walls, conservative-ish for rotated ramps.
+    half = [abs(float(s)) / 2 for s in size[:3]]
+    lo = tuple(float(p) - h for p, h in zip(pos[:3], half))
+    hi = tuple(float(p) + h for p, h in zip(pos[:3], half))
+    return MapPart(e.get("id"), str(e.get("name", "?")), lo, hi)  # type: ignore[arg-type]
+
+
+def map_entities(payload: Any) -> List[Dict[str, Any]]:
+    """Entities from a /map response ({"entities": [...]}, {"world": {...}} or a bare list)."""
+    if isinstance(payload, list):
+        return [e for e in payload if isinstance(e, dict)]
+    if isinstance(payload, dict):
+        if isinstance(payload.get("entities"), list):
+            return [e for e in payload["entities"] if isinstance(e, dict)]
+        world = payload.get("world")
+        if isinstance(world, dict):
+            return map_entities(world)
+    return []
+
+
+class WorldMap:
+    """Static parts bucketed by XZ footprint into `cell`-sized grid cells.
+
+    Each part is registered in every cell its footprint overlaps, so point
+    queries look at one cell and radius/segment queries at the cells they
+    cover. Heights are handled per part (AABB), not by the grid.
+    """
+
+    def __init__(self, parts: Sequence[MapPart], cell: float = 16.0):
+        self.parts = list(parts)
+        self.cell = cell
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for i, p in enumerate(self.parts):
+            for key in self._cells(p.lo[0], p.lo[2], p.hi[0], p.hi[2]):
+                self._grid.setdefault(key, []).append(i)
+
+    @classmethod
+    def from_payload(cls, payload: Any, cell: float = 16.0) -> "WorldMap":
+        parts = [p for p in (_part_from_entity(e) for e in map_entities(payload)) if p is not None]
+        return cls(parts, cell)
+
+    def __len__(self) -> int:
+        return len(self.parts)
+
+    def _cells(self, x0: float, z0: float, x1: float, z1: float) -> Iterable[Tuple[int, int]]:
+        c = self.cell
+        for gx in range(math.floor(x0 / c), math.floor(x1 / c) + 1):
+            for gz in range(math.floor(z0 / c), math.floor(z1 / c) + 1):
+                yield gx, gz
+
+    def _candidates(self, x0: float, z0: float, x1: float, z1: float) -> Set[int]:
+        out: Set[int] = set()
+        for key in self._cells(x0, z0, x1, z1):
+            out.update(self._grid.get(key, ()))
+        return out
+
+    def _segment_cells(self, ax: float, az: float, bx: float, bz: float) -> Iterable[Tuple[int, int]]:
+        """Grid cells crossed by the XZ segment a->b (Amanatides-Woo traversal)."""
+        c = self.cell
+        gx, gz = math.floor(ax / c), math.floor(az / c)
+        end = (math.floor(bx / c), math.floor(bz / c))
+        dx, dz = bx - ax, bz - az
+        step_x = 1 if dx > 0 else -1
+        step_z = 1 if dz > 0 else -1
+        t_dx = abs(c / dx) if dx else math.inf
+        t_dz = abs(c / dz) if dz else math.inf
+        t_x = ((gx + (step_x > 0)) * c - ax) / dx if dx else math.inf
+        t_z = ((gz + (step_z > 0)) * c - az) / dz if dz else math.inf
+        yield gx, gz
+        while (gx, gz) != end and min(t_x, t_z) <= 1.0:
+            if t_x < t_z:
+                gx, t_x = gx + step_x, t_x + t_dx
+            else:
+                gz, t_z = gz + step_z, t_z + t_dz
+            yield gx, gz
+
+    def parts_at(self, x: float, z: float) -> List[MapPart]:
+        """Parts whose footprint contains (x, z), highest top first."""
+        key = (math.floor(x / self.cell), math.floor(z / self.cell))
+        hits = [self.parts[i] for i in self._grid.get(key, ()) if self.parts[i].contains_xz(x, z)]
+        return sorted(hits, key=lambda p: -p.top)
+
+    def ground_at(self, x: float, z: float, below: Optional[float] = None) -> Optional[MapPart]:
+        """Highest part under (x, z) whose top is at or below `below` (any height if None)."""
+        for p in self.parts_at(x, z):
+            if below is None or p.top <= below + _EPS:
+                return p
+        return None
+
+    def near(self, x: float, z: float, radius: float) -> List[Tuple[float, MapPart]]:
+        """(footprint distance, part) for parts within `radius` of (x, z), nearest first."""
+        hits = []
+        for i in self._candidates(x - radius, z - radius, x + radius, z + radius):
+            d = self.parts[i].distance_xz(x, z)
+            if d <= radius:
+                hits.append((d, self.parts[i]))
+        hits.sort(key=lambda item: (item[0], -item[1].top))
+        return hits
+
+    def line_of_sight(
+        self,
+        a: Sequence[float],
+        b: Sequence[float],
+        ignore: Optional[Set[Any]] = None,
+    ) -> Optional[MapPart]:
+        """First part the segment a->b passes through, or None if the view is clear.
+
+        Segments that only touch a face (e.g. along the top of the floor)
+        don't count as blocked.
+        """
+        ax, ay, az = (float(v) for v in a[:3])
+        bx, by, bz = (float(v) for v in b[:3])
+        best: Optional[Tuple[float, MapPart]] = None
+        candidates: Set[int] = set()
+        for key in self._segment_cells(ax, az, bx, bz):
+            candidates.update(self._grid.get(key, ()))
+        for i in candidates:
+            p = self.parts[i]
+            if ignore and p.id in ignore:
+                continue
+            t = _segment_enters(p, (ax, ay, az), (bx - ax, by - ay, bz - az))
+            if t is not None and (best is None or t < best[0]):
+                best = (t, p)
+        return best[1] if best else None
+
+    def check_move_target(
+        self,
+        target: Sequence[float],
+        from_y: Optional[float] = None,
+        step_height: float = 2.0,
+    ) -> Optional[str]:
+        """Why a MoveTo target looks unreachable, or None if it looks fine.
+
+        Flags targets with no static ground under them and targets inside a
+        part that rises more than `step_height` above the ground there.
+        """
+        if not self.parts:
+            return None
+        x, z = float(target[0]), float(target[2])
+        here = self.parts_at(x, z)
+        if not here:
+            return "no ground under target"
+        ground_y = from_y if from_y is not None else here[-1].top
+        ground = self.ground_at(x, z, below=ground_y + step_height)
+        floor_y = ground.top if ground is not None else ground_y
+        for p in here:
+            if p is not ground and p.lo[1] < floor_y + step_height and p.top > floor_y + step_height:
+                return f"inside {p.label()}"
+        return None
+
+    def nearest_valid(
+        self,
+        target: Sequence[float],
+        radius: float,
+        from_y: Optional[float] = None,
+        step: float = 1.0,
+    ) -> Optional[List[float]]:
+        """Closest point within `radius` of target that passes check_move_target."""
+        x, z = float(target[0]), float(target[2])
+        rings = max(1, int(radius / step))
+        for r in range(1, rings + 1):
+            dist = r * step
+            n = max(8, int(2 * math.pi * dist / step))
+            for k in range(n):
+                angle = 2 * math.pi * k / n
+                cand = [x + dist * math.sin(angle), float(target[1]), z + dist * math.cos(angle)]
+                if self.check_move_target(cand, from_y) is None:
+                    return cand
+        return None
+
+    def validated_target(
+        self,
+        target: Sequence[float],
+        snap_radius: float,
+        from_y: Optional[float] = None,
+    ) -> Tuple[List[float], Optional[str]]:
+        """(target to send, problem found) for a MoveTo target.
+
+        A target that fails check_move_target is moved to the nearest valid
+        point within `snap_radius`; if there is none the original target is
+        kept, since the map only has static parts and the bot may be aiming
+        at a moving platform.
+        """
+        problem = self.check_move_target(target, from_y)
+        if problem is None:
+            return list(target), None
+        snapped = self.nearest_valid(target, snap_radius, from_y)
+        return (snapped if snapped is not None else list(target)), problem
+
+    def describe_around(self, position: Sequence[float], radius: float, limit: int = 8) -> str:
+        """Compact terrain context for the prompt: ground under the player and nearby static parts.
+
+        Parts are given by absolute center and extent rather than distance
+        from the player, so the text only changes when the set of nearby
+        parts does and callers can skip resending it.
+        """
+        x, y, z = (float(v) for v in position[:3])
+        lines = []
+        ground = self.ground_at(x, z, below=y + 0.5)
+        if ground is not None:
+            lines.append(f"standing on {ground.label()} (top y={ground.top:.1f})")
+        else:
+            lines.append("no static ground under you")
+        nearby = [p for _, p in self.near(x, z, radius) if p is not ground][:limit]
+        for p in sorted(nearby, key=lambda p: str(p.id)):
+            cx, cz = (p.lo[0] + p.hi[0]) / 2, (p.lo[2] + p.hi[2]) / 2
+            lines.append(
+                f"{p.label()} center=({cx:.0f},{cz:.0f}) size={p.hi[0] - p.lo[0]:.0f}x{p.hi[2] - p.lo[2]:.0f} "
+                f"y={p.lo[1]:.1f}..{p.top:.1f}"
+            )
+        return "\n".join(lines)
+
+
+def _segment_enters(p: MapPart, origin: Tuple[float, float, float], d: Tuple[float, float, float]) -> Optional[float]:
+    """Slab test: parameter t in [0, 1] where the segment enters the part's interior, if it does."""
+    t0, t1 = 0.0, 1.0
+    for axis in range(3):
+        lo, hi = p.lo[axis] + _EPS, p.hi[axis] - _EPS
+        o, v = origin[axis], d[axis]
+        if abs(v) < 1e-12:
+            if o <= lo or o >= hi:
+                return None
+            continue
+        ta, tb = (lo - o) / v, (hi - o) / v
+        if ta > tb:
+            ta, tb = tb, ta
+        t0, t1 = max(t0, ta), min(t1, tb)
+        if t0 >= t1:
+            return None
+    return t0
+
+
+@dataclass
+class MapLoad:
+    world_map: WorldMap
+    path: Path
+    content_hash: str
+    source: str  # "cache" (unchanged since last time) or "fetched"
+    seconds: float = 0.0
+
+
+def _game_dir(cache_dir: Path, game_key: str) -> Path:
+    return cache_dir / re.sub(r"[^A-Za-z0-9._-]+", "_", game_key).strip("_")[:120]
+
+
+def load_map(
+    game_key: str,
+    fetch: Callable[[], bytes],
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    cell: float = 16.0,
+) -> MapLoad:
+    """Return the map for `game_key` (the server plus the game id), checked against /map.
+
+    The cache holds <sha256>.json files per game plus a LATEST pointer.
+    /map is always fetched and hashed, since a server can restart into a
+    different game under the same key; when the hash matches LATEST the
+    map is reported as "cache" and nothing is written.
+    """
+    started = time.perf_counter()
+    game_dir = _game_dir(cache_dir, game_key)
+    latest = game_dir / "LATEST"
+    raw = fetch()
+    payload = json.loads(raw)
+    # Hash the canonical JSON so formatting differences don't create new entries.
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(canonical).hexdigest()
+    path = game_dir / f"{digest}.json"
+    world_map = WorldMap.from_payload(payload, cell)
+    if path.exists() and latest.exists() and latest.read_text().strip() == digest:
+        return MapLoad(world_map, path, digest, "cache", time.perf_counter() - started)
+
+    game_dir.mkdir(parents=True, exist_ok=True)
+    if not path.exists():
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(canonical)
+        os.replace(tmp, path)
+    tmp = latest.with_suffix(".tmp")
+    tmp.write_text(digest)
+    os.replace(tmp, latest)
+    return MapLoad(world_map, path, digest, "fetched", time.perf_counter() - started)
+
+
+def attach_map(
+    url: str,
+    game_key: str,
+    log: Callable[[str], None] = print,
+    timeout: float = 10.0,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+) -> Optional[WorldMap]:
+    """load_map for the /map at `url`, for scripts that only use it to check MoveTo targets.
+
+    Any failure is logged and returns None, which turns the checks off.
+    """
+
+    def fetch() -> bytes:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return resp.read()
+
+    try:
+        loaded = load_map(game_key, fetch, cache_dir=cache_dir)
+    except Exception as e:  # noqa: BLE001 - the map is optional
+        log(f"unavailable: {e}")
+        return None
+    log(f"{len(loaded.world_map)} static parts ({loaded.source})")
+    return loaded.world_map
+
+
+def validated_move(
+    world_map: Optional[WorldMap],
+    input_type: str,
+    data: Optional[Dict[str, Any]],
+    snap_radius: float,
+    from_y: Optional[float] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(input data to send, problem found) for an input; only MoveTo positions are checked.
+
+    When WorldMap.validated_target finds a problem the data is copied with
+    the snapped (or unchanged) target; otherwise `data` is returned as is.
+    """
+    if input_type != "MoveTo" or world_map is None or not data or "position" not in data:
+        return data, None
+    target, problem = world_map.validated_target(data["position"], snap_radius, from_y)
+    if problem is None:
+        return data, None
+    return {**data, "position": target}, problem